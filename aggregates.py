@@ -0,0 +1,419 @@
+"""Running analysis aggregates maintained across research runs.
+
+Each topic's aggregates live in one SQLite store as additive sums per UTC
+day of post creation: item, post, comment and score totals, sentiment
+counts, per-entity sentiment counts and per-subreddit sums, plus each day's
+highest-scoring posts. A run upserts only its own items' contributions into
+the days they touch, so its cost doesn't grow with the history. All-time and
+windowed figures are sums over the day rows in range.
+
+Per item only what dedup needs is kept: its key, its day and subreddit, and
+the two figures that change after collection (upvotes, comment count), so a
+re-collected item adds just the change in those. Sentiment and entities
+count as first collected.
+"""
+
+import heapq
+import sqlite3
+import time
+from pathlib import Path
+
+AGG_PATH = Path("output/aggregates.db")
+TOP_K = 10
+_TOP_KEEP = TOP_K * 2  # slack so a dropped score doesn't empty the top list
+SENTIMENTS = ("Positive", "Negative", "Neutral")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    topic        TEXT NOT NULL,
+    item_key     TEXT NOT NULL,         -- '<id>_<type>'
+    day          TEXT NOT NULL,
+    subreddit    TEXT NOT NULL,
+    score        INTEGER NOT NULL,
+    num_comments INTEGER NOT NULL,
+    PRIMARY KEY (topic, item_key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS totals (
+    topic          TEXT NOT NULL,
+    day            TEXT NOT NULL,
+    items          INTEGER NOT NULL,
+    total_posts    INTEGER NOT NULL,
+    total_comments INTEGER NOT NULL,
+    score_sum      INTEGER NOT NULL,
+    with_entities  INTEGER NOT NULL,
+    earliest       REAL,
+    latest         REAL,
+    PRIMARY KEY (topic, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sentiments (
+    topic     TEXT NOT NULL,
+    day       TEXT NOT NULL,
+    sentiment TEXT NOT NULL,
+    items     INTEGER NOT NULL,
+    PRIMARY KEY (topic, day, sentiment)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS entities (
+    topic     TEXT NOT NULL,
+    day       TEXT NOT NULL,
+    entity    TEXT NOT NULL,
+    sentiment TEXT NOT NULL,
+    items     INTEGER NOT NULL,
+    PRIMARY KEY (topic, day, entity, sentiment)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS subreddits (
+    topic        TEXT NOT NULL,
+    day          TEXT NOT NULL,
+    subreddit    TEXT NOT NULL,
+    posts        INTEGER NOT NULL,
+    score_sum    INTEGER NOT NULL,
+    comments_sum INTEGER NOT NULL,
+    PRIMARY KEY (topic, day, subreddit)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS top_posts (
+    topic        TEXT NOT NULL,
+    day          TEXT NOT NULL,
+    item_key     TEXT NOT NULL,
+    score        INTEGER NOT NULL,
+    title        TEXT,
+    subreddit    TEXT,
+    num_comments INTEGER,
+    url          TEXT,
+    sentiment    TEXT,
+    PRIMARY KEY (topic, day, item_key)
+) WITHOUT ROWID;
+"""
+
+
+def connect(path: Path = None) -> sqlite3.Connection:
+    """Open (and create if needed) the aggregates store."""
+    path = path or AGG_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _empty_bucket() -> dict:
+    return {
+        "entities": {},
+        "sentiment": {s: 0 for s in SENTIMENTS},
+        "subreddits": {},
+        "engagement": {"total_posts": 0, "total_comments": 0, "items": 0,
+                       "score_sum": 0, "with_entities": 0},
+        "earliest": None,
+        "latest": None,
+        "top_posts": [],
+    }
+
+
+def _entity_counts() -> dict:
+    return dict({s: 0 for s in SENTIMENTS}, total=0)
+
+
+def _contribution(row) -> dict:
+    """Reduce an analysed row to the fields the aggregates depend on."""
+    entities = row.get("entities_mentioned", "") or ""
+    created = float(row.get("created_utc", 0) or 0)
+    contrib = {
+        "type": row.get("type", "post"),
+        "subreddit": str(row.get("subreddit", "")),
+        "score": int(row.get("score", 0) or 0),
+        "num_comments": int(row.get("num_comments", 0) or 0),
+        "sentiment": str(row.get("sentiment", "Neutral")),
+        "entities": [e for e in entities.split(", ") if e],
+        "created_utc": created,
+        "day": time.strftime("%Y-%m-%d", time.gmtime(created)),
+    }
+    if contrib["type"] == "post":
+        contrib["title"] = str(row.get("title", ""))
+        contrib["url"] = str(row.get("url", ""))
+    return contrib
+
+
+def _apply(bucket: dict, key: str, c: dict, sign: int) -> None:
+    """Add (sign=1) or remove (sign=-1) one item's contribution to a bucket."""
+    eng = bucket["engagement"]
+    eng["items"] += sign
+    eng["score_sum"] += sign * c["score"]
+    if c["entities"]:
+        eng["with_entities"] += sign
+    bucket["sentiment"][c["sentiment"]] = bucket["sentiment"].get(c["sentiment"], 0) + sign
+
+    for entity in c["entities"]:
+        ent = bucket["entities"].setdefault(entity, _entity_counts())
+        ent[c["sentiment"]] += sign
+        ent["total"] += sign
+
+    if c["type"] == "post":
+        eng["total_posts"] += sign
+        sub = bucket["subreddits"].setdefault(c["subreddit"], {"posts": 0, "score_sum": 0, "comments_sum": 0})
+        sub["posts"] += sign
+        sub["score_sum"] += sign * c["score"]
+        sub["comments_sum"] += sign * c["num_comments"]
+
+        top = [t for t in bucket["top_posts"] if t[1] != key]
+        if sign > 0:
+            entry = [c["score"], key, c["title"], c["subreddit"], c["num_comments"], c["url"], c["sentiment"]]
+            if len(top) < _TOP_KEEP:
+                heapq.heappush(top, entry)
+            else:
+                heapq.heappushpop(top, entry)
+        heapq.heapify(top)
+        bucket["top_posts"] = top
+    else:
+        eng["total_comments"] += sign
+
+    # created_utc never changes for an item, so min/max only move on insert
+    if sign > 0 and c["created_utc"]:
+        if bucket["earliest"] is None or c["created_utc"] < bucket["earliest"]:
+            bucket["earliest"] = c["created_utc"]
+        if bucket["latest"] is None or c["created_utc"] > bucket["latest"]:
+            bucket["latest"] = c["created_utc"]
+
+
+def _known(slug: str, keys: list, conn: sqlite3.Connection) -> dict:
+    """{item_key: (day, subreddit, score, num_comments)} for the keys already counted."""
+    found = {}
+    for start in range(0, len(keys), 500):
+        batch = keys[start:start + 500]
+        found.update((key, tuple(rest)) for key, *rest in conn.execute(
+            f"""SELECT item_key, day, subreddit, score, num_comments FROM items
+                WHERE topic = ? AND item_key IN ({', '.join('?' * len(batch))})""",
+            (slug, *batch),
+        ))
+    return found
+
+
+def _adjust(bucket: dict, key: str, previous: tuple, c: dict) -> None:
+    """Add the change in a counted item's upvotes and comment count to a bucket of its day."""
+    _, subreddit, score, num_comments = previous
+    bucket["engagement"]["score_sum"] += c["score"] - score
+    if c["type"] == "post":
+        sub = bucket["subreddits"].setdefault(subreddit, {"posts": 0, "score_sum": 0, "comments_sum": 0})
+        sub["score_sum"] += c["score"] - score
+        sub["comments_sum"] += c["num_comments"] - num_comments
+        entry = [c["score"], key, c["title"], subreddit, c["num_comments"], c["url"], c["sentiment"]]
+        if len(bucket["top_posts"]) < _TOP_KEEP:
+            heapq.heappush(bucket["top_posts"], entry)
+        else:
+            heapq.heappushpop(bucket["top_posts"], entry)
+
+
+def _store(slug: str, day: str, bucket: dict, conn: sqlite3.Connection) -> None:
+    """Add one day's bucket to the stored sums and trim the day's top posts."""
+    eng = bucket["engagement"]
+    conn.execute(
+        """INSERT INTO totals VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT (topic, day) DO UPDATE SET
+               items = items + excluded.items,
+               total_posts = total_posts + excluded.total_posts,
+               total_comments = total_comments + excluded.total_comments,
+               score_sum = score_sum + excluded.score_sum,
+               with_entities = with_entities + excluded.with_entities,
+               earliest = min(coalesce(earliest, excluded.earliest), coalesce(excluded.earliest, earliest)),
+               latest = max(coalesce(latest, excluded.latest), coalesce(excluded.latest, latest))""",
+        (slug, day, eng["items"], eng["total_posts"], eng["total_comments"], eng["score_sum"],
+         eng["with_entities"], bucket["earliest"], bucket["latest"]),
+    )
+    conn.executemany(
+        """INSERT INTO sentiments VALUES (?, ?, ?, ?)
+           ON CONFLICT (topic, day, sentiment) DO UPDATE SET items = items + excluded.items""",
+        [(slug, day, s, n) for s, n in bucket["sentiment"].items() if n],
+    )
+    conn.executemany(
+        """INSERT INTO entities VALUES (?, ?, ?, ?, ?)
+           ON CONFLICT (topic, day, entity, sentiment) DO UPDATE SET items = items + excluded.items""",
+        [(slug, day, entity, s, n) for entity, counts in bucket["entities"].items()
+         for s, n in counts.items() if s != "total" and n],
+    )
+    conn.executemany(
+        """INSERT INTO subreddits VALUES (?, ?, ?, ?, ?, ?)
+           ON CONFLICT (topic, day, subreddit) DO UPDATE SET
+               posts = posts + excluded.posts,
+               score_sum = score_sum + excluded.score_sum,
+               comments_sum = comments_sum + excluded.comments_sum""",
+        [(slug, day, sub, v["posts"], v["score_sum"], v["comments_sum"]) for sub, v in bucket["subreddits"].items()],
+    )
+    if bucket["top_posts"]:
+        conn.executemany(
+            "INSERT OR REPLACE INTO top_posts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(slug, day, key, score, title, sub, comments, url, sentiment)
+             for score, key, title, sub, comments, url, sentiment in bucket["top_posts"]],
+        )
+        conn.execute(
+            """DELETE FROM top_posts WHERE topic = ? AND day = ? AND item_key NOT IN (
+                   SELECT item_key FROM top_posts WHERE topic = ? AND day = ? ORDER BY score DESC LIMIT ?)""",
+            (slug, day, slug, day, _TOP_KEEP),
+        )
+
+
+def update_aggregates(df, slug: str, conn: sqlite3.Connection = None) -> int:
+    """Fold a run's analysed DataFrame into the stored aggregates. Returns how many items changed them.
+
+    `df` may also be an iterable of DataFrame chunks (lean analysis mode).
+    New items add their whole contribution, already-counted items add only
+    the change in their upvotes and comment count, and unchanged items are
+    skipped.
+    """
+    own = conn is None
+    conn = conn or connect()
+
+    changed = 0
+    frames = [df] if hasattr(df, "to_dict") else df
+    with conn:
+        for frame in frames:
+            rows = {f"{row.get('id')}_{row.get('type', 'post')}": row for row in frame.to_dict("records")}
+            known = _known(slug, list(rows), conn)
+            days, new_items, updates = {}, [], []
+            for key, row in rows.items():
+                c = _contribution(row)
+                previous = known.get(key)
+                if previous is None:
+                    _apply(days.setdefault(c["day"], _empty_bucket()), key, c, 1)
+                    new_items.append((slug, key, c["day"], c["subreddit"], c["score"], c["num_comments"]))
+                elif previous[2:] != (c["score"], c["num_comments"]):
+                    _adjust(days.setdefault(previous[0], _empty_bucket()), key, previous, c)
+                    updates.append((c["score"], c["num_comments"], slug, key))
+                else:
+                    continue
+                changed += 1
+
+            conn.executemany("INSERT INTO items VALUES (?, ?, ?, ?, ?, ?)", new_items)
+            conn.executemany("UPDATE items SET score = ?, num_comments = ? WHERE topic = ? AND item_key = ?",
+                             updates)
+            for day, bucket in days.items():
+                _store(slug, day, bucket, conn)
+    if own:
+        conn.close()
+    print(f"✓ Aggregates updated ({changed} new or changed items)")
+    return changed
+
+
+def fold_rows(rows, bucket: dict = None) -> dict:
+    """Add analysed rows (dicts) to a bucket, starting a new one if none is given.
+
+    For one-pass summaries of data that never fits in memory at once, such as
+    the whole corpus store; pass the result to `summarize`.
+    """
+    bucket = bucket or _empty_bucket()
+    for row in rows:
+        _apply(bucket, f"{row.get('id')}_{row.get('type', 'post')}", _contribution(row), 1)
+    return bucket
+
+
+def merge_buckets(buckets: list) -> dict:
+    """Merge several buckets into one (used for windowed figures)."""
+    merged = _empty_bucket()
+    for b in buckets:
+        for k, v in b["engagement"].items():
+            merged["engagement"][k] += v
+        for s, v in b["sentiment"].items():
+            merged["sentiment"][s] = merged["sentiment"].get(s, 0) + v
+        for entity, counts in b["entities"].items():
+            ent = merged["entities"].setdefault(entity, _entity_counts())
+            for k, v in counts.items():
+                ent[k] += v
+        for sub, stats in b["subreddits"].items():
+            m = merged["subreddits"].setdefault(sub, {"posts": 0, "score_sum": 0, "comments_sum": 0})
+            for k, v in stats.items():
+                m[k] += v
+        for bound, pick in (("earliest", min), ("latest", max)):
+            if b[bound] is not None:
+                merged[bound] = b[bound] if merged[bound] is None else pick(merged[bound], b[bound])
+        merged["top_posts"] = heapq.nlargest(_TOP_KEEP, merged["top_posts"] + b["top_posts"])
+    return merged
+
+
+def _fmt_day(ts) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(ts)) if ts is not None else ""
+
+
+def summarize(bucket: dict) -> dict:
+    """Render a bucket in the same shape as `analyze_data`'s analysis dict."""
+    eng = bucket["engagement"]
+    subreddits = {
+        sub: {
+            "posts": s["posts"],
+            "avg_score": round(s["score_sum"] / s["posts"], 2),
+            "avg_comments": round(s["comments_sum"] / s["posts"], 2),
+        }
+        for sub, s in bucket["subreddits"].items() if s["posts"] > 0
+    }
+    subreddits = dict(sorted(subreddits.items(), key=lambda x: -x[1]["posts"]))
+    entity_sentiment = {e: dict(c) for e, c in bucket["entities"].items() if c["total"] > 0}
+
+    top_posts = [
+        {"title": t[2], "subreddit": t[3], "score": t[0], "num_comments": t[4], "url": t[5], "sentiment": t[6]}
+        for t in heapq.nlargest(TOP_K, bucket["top_posts"])
+    ]
+
+    return {
+        "entities": {e: c["total"] for e, c in entity_sentiment.items()},
+        "entity_sentiment": entity_sentiment,
+        "sentiment": {s: bucket["sentiment"].get(s, 0) for s in SENTIMENTS},
+        "subreddits": subreddits,
+        "top_posts": top_posts,
+        "engagement": {
+            "total_posts": eng["total_posts"],
+            "total_comments": eng["total_comments"],
+            "avg_score": round(eng["score_sum"] / eng["items"], 2) if eng["items"] else 0,
+            "total_score": eng["score_sum"],
+            "with_entities": eng["with_entities"],
+        },
+        "date_range": {"earliest": _fmt_day(bucket["earliest"]), "latest": _fmt_day(bucket["latest"])},
+    }
+
+
+def _stored_bucket(slug: str, since: str, conn: sqlite3.Connection) -> dict:
+    """A topic's stored sums over the days from `since` on, as one bucket."""
+    bucket = _empty_bucket()
+    params = (slug, since)
+    row = conn.execute(
+        """SELECT SUM(items), SUM(total_posts), SUM(total_comments), SUM(score_sum), SUM(with_entities),
+                  MIN(earliest), MAX(latest)
+           FROM totals WHERE topic = ? AND day >= ?""",
+        params,
+    ).fetchone()
+    names = ("items", "total_posts", "total_comments", "score_sum", "with_entities")
+    bucket["engagement"].update((name, value or 0) for name, value in zip(names, row))
+    bucket["earliest"], bucket["latest"] = row[5], row[6]
+
+    for sentiment, n in conn.execute(
+        "SELECT sentiment, SUM(items) FROM sentiments WHERE topic = ? AND day >= ? GROUP BY sentiment", params
+    ):
+        bucket["sentiment"][sentiment] = n
+    for entity, sentiment, n in conn.execute(
+        """SELECT entity, sentiment, SUM(items) FROM entities WHERE topic = ? AND day >= ?
+           GROUP BY entity, sentiment""",
+        params,
+    ):
+        counts = bucket["entities"].setdefault(entity, _entity_counts())
+        counts[sentiment] += n
+        counts["total"] += n
+    for sub, posts, score_sum, comments_sum in conn.execute(
+        """SELECT subreddit, SUM(posts), SUM(score_sum), SUM(comments_sum) FROM subreddits
+           WHERE topic = ? AND day >= ? GROUP BY subreddit""",
+        params,
+    ):
+        bucket["subreddits"][sub] = {"posts": posts, "score_sum": score_sum, "comments_sum": comments_sum}
+    bucket["top_posts"] = [list(r) for r in conn.execute(
+        """SELECT score, item_key, title, subreddit, num_comments, url, sentiment FROM top_posts
+           WHERE topic = ? AND day >= ? ORDER BY score DESC LIMIT ?""",
+        (*params, _TOP_KEEP),
+    )]
+    return bucket
+
+
+def history_summary(slug: str, window_days: int = 30, conn: sqlite3.Connection = None) -> dict:
+    """All-time and trailing-window summaries from a topic's stored aggregates."""
+    own = conn is None
+    conn = conn or connect()
+    cutoff = time.strftime("%Y-%m-%d", time.gmtime(time.time() - window_days * 86400))
+    history = {
+        "window_days": window_days,
+        "window": summarize(_stored_bucket(slug, cutoff, conn)),
+        "all_time": summarize(_stored_bucket(slug, "", conn)),
+    }
+    if own:
+        conn.close()
+    return history
@@ -0,0 +1,182 @@
+"""Best-effort backfill of a topic's recent history into the corpus store.
+
+Reddit search takes no date bounds, and a listing stops paging after about
+1000 results. Backfill walks each subreddit/term search of the config sorted
+by `new`, newest first, until it passes the start date or the listing ends,
+several searches at once under one shared RateBudget. How far back a search
+gets depends on how busy it is: a quiet one reaches the start date, a busy
+one stops at about its 1000th result. Searches that stopped short are listed
+at the end with the date they got back to.
+
+Posts are stored in batches of BATCH_POSTS as the walks go, with comments per
+the config, so an interrupted backfill keeps what it stored. A listing costs
+at most about ten requests, so a re-run simply walks it again and the corpus
+store adds only the items it doesn't have.
+
+Usage:
+    python3 backfill.py config.json --start 2025-01-01 [--workers 4] [--rate 90]
+    python3 backfill.py config.json --export corpus.xlsx     # whole corpus, constant memory
+"""
+
+import argparse
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pandas as pd
+
+import comment_fetch
+import corpus_store
+import run_metrics
+import seen_filter
+from rate_limit import DEFAULT_PER_MINUTE, LISTING_PAGE_SIZE, RateBudget
+from reddit_research import (
+    add_unique,
+    analyze_scored,
+    fetch_plan,
+    export_corpus_excel,
+    fetch_comments,
+    index_results,
+    init_reddit,
+    load_config,
+    post_record,
+    relevance_scorer,
+    select_comment_targets,
+    topic_slug,
+)
+from timeseries import record_mentions
+
+LISTING_CAP = 1000          # Reddit stops paging a listing after about this many results
+BATCH_POSTS = 250           # posts per stored batch
+
+
+def parse_date(value: str) -> int:
+    """YYYY-MM-DD (UTC midnight) to epoch seconds."""
+    return int(datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+
+
+def _with_comments(reddit, config: dict, posts: list, budget, scorer=None) -> list:
+    """A batch of posts plus their comments, per the config's limits and two-phase setting."""
+    records, seen_ids = list(posts), {p["id"] for p in posts}
+    comment_limit = config["limits"]["comments"]
+    if comment_limit > 0:
+        targets = select_comment_targets(posts, config, scorer) if config.get("two_phase") else posts
+        run_metrics.incr("comment_fetches_skipped", len(posts) - len(targets))
+        # On the shared comment pool, as in regular runs, not on the listing threads
+        add_unique(records, seen_ids, fetch_comments(reddit, targets, comment_limit, config.get("comment_workers", 4),
+                                                     budget, **comment_fetch.options(config)))
+    return records
+
+
+def walk_search(reddit, subreddit: str, term: str, since: int, budget, emit) -> tuple:
+    """Walk one search's `new` listing back to `since`, emitting its posts in batches of BATCH_POSTS.
+
+    `emit(subreddit, term, posts)` is called on this thread. Returns (created_utc
+    of the oldest post walked or None, whether the walk got back to `since`).
+    """
+    listing = iter(reddit.subreddit(subreddit).search(term, sort="new", limit=None))
+    batch, walked, oldest = [], 0, None
+    while True:
+        if walked % LISTING_PAGE_SIZE == 0:
+            budget.acquire(1)
+        submission = next(listing, None)
+        if submission is None:
+            # A listing that ended well short of the cap held every result
+            reached = walked < LISTING_CAP - LISTING_PAGE_SIZE
+            break
+        walked += 1
+        created = getattr(submission, "created_utc", 0)
+        if created < since:
+            reached = True
+            break
+        oldest = created
+        batch.append(post_record(submission, subreddit, term))
+        if len(batch) >= BATCH_POSTS:
+            emit(subreddit, term, batch)
+            batch = []
+    if batch:
+        emit(subreddit, term, batch)
+    return oldest, reached
+
+
+def backfill(config: dict, since: int, workers: int = 4, per_minute: float = DEFAULT_PER_MINUTE) -> int:
+    """Backfill a config's searches back to `since` (as far as listings reach). Returns items added."""
+    slug = topic_slug(config["topic"])
+    planned = sorted({(sub, term) for sub, term, _limit in fetch_plan(config)})
+    print(f"Walking {len(planned)} searches back to {_fmt(since)}")
+
+    run_metrics.reset()
+    reddit = init_reddit()
+    budget = RateBudget(per_minute)
+    scorer = relevance_scorer(config)  # one for the whole backfill
+    conn = corpus_store.connect()
+    batches = queue.Queue()
+    added = 0
+    short = []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(walk_search, reddit, sub, term, since, budget,
+                               lambda *batch: batches.put(batch)): (sub, term)
+                   for sub, term in planned}
+
+        # Batches are stored as the walks produce them; comments go to the shared comment pool
+        while True:
+            try:
+                sub, term, posts = batches.get(timeout=1)
+            except queue.Empty:
+                if all(future.done() for future in futures) and batches.empty():
+                    break
+                continue
+            records = _with_comments(reddit, config, posts, budget, scorer)
+            df, _analysis = analyze_scored(pd.DataFrame(records), config, scorer)
+            new = corpus_store.add_records(records, slug, conn, scored=df)
+            record_mentions(df, slug)
+            index_results(df, config, scorer)
+            added += new
+            print(f"  r/{sub} '{term}': {len(posts)} posts back to {_fmt(min(p['created_utc'] for p in posts))}, "
+                  f"{len(records)} items, {new} new")
+
+    for future, (sub, term) in futures.items():
+        try:
+            oldest, reached = future.result()
+        except Exception as e:
+            print(f"  r/{sub} '{term}': ERROR {e}")
+            continue
+        if not reached:
+            short.append((sub, term, oldest))
+
+    conn.close()
+    print(f"\nAdded {added} items to {corpus_store.CORPUS_PATH} "
+          f"({int(run_metrics.get('api_requests'))} API requests)")
+    if short:
+        print(f"⚠️  {len(short)} searches stopped at Reddit's ~{LISTING_CAP}-result listing limit "
+              f"before {_fmt(since)}:")
+        for sub, term, oldest in short:
+            print(f"    r/{sub} '{term}': back to {_fmt(oldest)}")
+    if seen_filter.summary():
+        print(f"Seen filter: {seen_filter.summary()}")
+    if comment_fetch.summary():
+        print(f"Comment transfer: {comment_fetch.summary()}")
+    return added
+
+
+def _fmt(ts: int) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill a topic's recent history into the corpus store")
+    parser.add_argument("config", help="research config JSON")
+    parser.add_argument("--start", default=None, help="walk back to this day, YYYY-MM-DD (UTC), as far as listings reach")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent search listings")
+    parser.add_argument("--rate", type=float, default=DEFAULT_PER_MINUTE, help="API requests per minute")
+    parser.add_argument("--export", default=None, help="then export the topic's corpus to this .xlsx")
+    args = parser.parse_args()
+    if not args.start and not args.export:
+        parser.error("give --start to backfill and/or --export to export the corpus")
+
+    config = load_config(args.config)
+    if args.start:
+        backfill(config, parse_date(args.start), args.workers, args.rate)
+    if args.export:
+        print(f"Exported corpus to {export_corpus_excel(config, args.export)}")
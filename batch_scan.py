@@ -0,0 +1,155 @@
+"""Parallel multi-config batch runner.
+
+Discovers every config in scan_configs/, merges their searches into one
+deduplicated fetch plan and runs collection concurrently under a single global
+API budget. Searches shared by several configs, and comment trees of posts
+found by several configs, are fetched once. As each config's data completes,
+its analysis and scoring run in a process pool, whose workers start from a
+forkserver rather than a fork of this threaded process. Writes per-config
+research outputs, updates REVIEW.md and writes one combined digest.
+
+Usage:
+    python3 batch_scan.py [--dir scan_configs] [--rate 90] [--fetch-workers 8] [--process-workers N]
+"""
+
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+import comment_fetch
+import parallel_engine
+import run_metrics
+import seen_filter
+from rate_limit import DEFAULT_PER_MINUTE, RateBudget
+from reddit_research import (
+    DEFAULT_CONFIG,
+    analyze_scored,
+    export_excel,
+    export_report,
+    fetch_plan,
+    init_reddit,
+    topic_slug,
+)
+from review_writer import REVIEW_PATH, filter_new_items, load_seen, save_seen, update_review_md
+from scheduled_scan import DIGEST_PATH, SCAN_DIR, _collect_digest_items, write_digest
+from shared_fetch import SharedFetcher
+from timeseries import record_mentions
+
+BATCH_DIR = Path("output/batch")
+STREAM_LABELS = {"usecases": "Use Cases", "security": "Security"}
+REVIEW_MAX_NEW = {"usecases": 20, "security": 0}
+
+
+def discover_configs(scan_dir: Path = SCAN_DIR) -> list:
+    """Load every *.json config in scan_dir, merged with defaults. Returns [(name, config)]."""
+    configs = []
+    for path in sorted(Path(scan_dir).glob("*.json")):
+        with open(path, "r") as f:
+            config = DEFAULT_CONFIG.copy()
+            config.update(json.load(f))
+        configs.append((path.stem, config))
+    return configs
+
+
+def _analyze(config: dict, records: list) -> tuple:
+    """Process-pool worker: analyse and score one config's records."""
+    return analyze_scored(pd.DataFrame(records), config)
+
+
+def write_outputs(name: str, config: dict, df: pd.DataFrame, analysis: dict, timestamp: str,
+                  base_dir: Path = BATCH_DIR) -> Path:
+    """Write the per-config Excel workbook and markdown report under base_dir/name."""
+    out_dir = Path(base_dir) / name
+    out_dir.mkdir(parents=True, exist_ok=True)
+    slug = topic_slug(config["topic"])
+    export_excel(df, config, analysis, out_dir / f"research_{slug}_{timestamp}.xlsx")
+    export_report(config, analysis, out_dir / f"research_{slug}_{timestamp}.md")
+    return out_dir
+
+
+def run_batch(scan_dir: Path = SCAN_DIR, per_minute: float = DEFAULT_PER_MINUTE,
+              fetch_workers: int = 8, process_workers: int = None) -> None:
+    """Collect, analyse and review every config in scan_dir."""
+    print("=" * 60)
+    print("  OpenClaw Batch Scanner")
+    print("=" * 60)
+
+    run_metrics.reset()
+    configs = discover_configs(scan_dir)
+    if not configs:
+        print(f"No configs found in {scan_dir}")
+        return
+
+    searches = [(sub.lower(), term.lower()) for _n, c in configs for sub, term, _l in fetch_plan(c)]
+    print(f"{len(configs)} configs: {len(searches)} searches, {len(set(searches))} after sharing")
+
+    reddit = init_reddit()
+    budget = RateBudget(per_minute)
+    comment_limit = max(c["limits"]["comments"] for _n, c in configs)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetch_pool, \
+            ThreadPoolExecutor(max_workers=len(configs)) as drivers, \
+            ProcessPoolExecutor(max_workers=process_workers, mp_context=parallel_engine.process_context()) as cpu_pool:
+        fetcher = SharedFetcher(reddit, budget, fetch_pool, comment_limit=comment_limit)
+        fetcher.prefetch([c for _n, c in configs])
+
+        # Each driver waits for its config's fetches, then hands off to the process pool
+        def drive(config):
+            return cpu_pool.submit(_analyze, config, fetcher.collect(config))
+
+        analyses = [(name, config, drivers.submit(drive, config)) for name, config in configs]
+
+        seen = load_seen()
+        usecases_items, security_items = [], []
+        for name, config, driver in analyses:
+            stream = config.get("scoring_stream", "usecases")
+            try:
+                df, analysis = driver.result().result()
+            except Exception as e:
+                print(f"  {name}: ERROR {e}")
+                continue
+
+            if df.empty:
+                print(f"  {name}: no results")
+                continue
+
+            record_mentions(df, topic_slug(config["topic"]))
+            out_dir = write_outputs(name, config, df, analysis, timestamp)
+            new_df, seen = filter_new_items(df, seen)
+            added = update_review_md(new_df, STREAM_LABELS.get(stream, config["topic"]),
+                                     max_new=REVIEW_MAX_NEW.get(stream, 0))
+            items = _collect_digest_items(new_df)[:added]
+            (security_items if stream == "security" else usecases_items).extend(items)
+            print(f"  {name}: {len(df)} items, {added} new → {out_dir}")
+
+    save_seen(seen)
+
+    usecases_items.sort(key=lambda x: x["score"], reverse=True)
+    security_items.sort(key=lambda x: x["score"], reverse=True)
+    write_digest(usecases_items, security_items)
+
+    print()
+    print(f"API requests: {int(run_metrics.get('api_requests'))} "
+          f"(comment fetches {int(run_metrics.get('comment_fetches'))}, "
+          f"skipped {int(run_metrics.get('comment_fetches_skipped'))})")
+    if seen_filter.summary():
+        print(f"Seen filter: {seen_filter.summary()}")
+    if comment_fetch.summary():
+        print(f"Comment transfer: {comment_fetch.summary()}")
+    print(f"Review checklist: {REVIEW_PATH}")
+    print(f"Email digest:     {DIGEST_PATH}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run every scan config in one batch")
+    parser.add_argument("--dir", default=str(SCAN_DIR), help="directory of scan configs")
+    parser.add_argument("--rate", type=float, default=DEFAULT_PER_MINUTE, help="global API requests per minute")
+    parser.add_argument("--fetch-workers", type=int, default=8, help="concurrent API fetches")
+    parser.add_argument("--process-workers", type=int, default=None, help="analysis processes (default: CPU count)")
+    args = parser.parse_args()
+    run_batch(Path(args.dir), args.rate, args.fetch_workers, args.process_workers)
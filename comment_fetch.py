@@ -0,0 +1,139 @@
+"""Comment fetches limited on the server, on a bounded pool, with transfer accounting.
+
+Loading `submission.comments` downloads the whole first page of a thread's
+comment tree (up to ~200 comments with their replies), of which a run keeps
+3-5. Here the comments endpoint is asked for just that: `limit` comments in
+the configured `sort` order, `depth` levels deep, so a large thread costs a
+few KB instead of megabytes.
+
+All comment fetches in a process share one bounded thread pool, separate
+from the search listings, so however many searches run at once the number
+of concurrent comment requests stays capped.
+
+A response hook on the shared HTTP session measures what each comment
+request transferred over the wire (compressed, as sent) and how long it
+took; these are the measured figures in the run summary. Next to them is an
+estimate, not a measurement: the bytes the full first page would have cost,
+assuming bytes scale with the number of comments returned. No time estimate
+is made, since a request's time is mostly latency rather than size.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import reddit_session
+import run_metrics
+
+DEFAULT_SORT = "confidence"   # Reddit's "best", the order submission.comments used
+DEFAULT_DEPTH = 1             # top-level comments only
+WORKERS = 4
+FULL_TREE_COMMENTS = 200      # comments the unlimited endpoint returns on its first page
+SORTS = ("confidence", "top", "new", "controversial", "old", "qa")
+
+_lock = threading.Lock()
+_pool = None
+_pool_size = 0
+_local = threading.local()    # bytes of the comment responses on this thread
+
+
+def pool(workers: int = None) -> ThreadPoolExecutor:
+    """The process's comment fetch pool, sized on first use (`workers`, default WORKERS).
+
+    Later calls get the same pool; asking for a different size warns, since
+    the cap on concurrent comment requests is per process.
+    """
+    global _pool, _pool_size
+    with _lock:
+        if _pool is None:
+            _pool_size = max(workers or WORKERS, 1)
+            _pool = ThreadPoolExecutor(max_workers=_pool_size, thread_name_prefix="comments")
+        elif workers and workers != _pool_size:
+            print(f"  ⚠️  comment_workers={workers} ignored: this process's comment pool "
+                  f"already has {_pool_size} workers")
+        return _pool
+
+
+def _wire_bytes(response) -> int:
+    """Bytes `response` took on the wire: before decompression where that can be told."""
+    try:
+        return int(response.raw.tell())
+    except (AttributeError, TypeError, ValueError):
+        pass
+    length = response.headers.get("Content-Length")
+    return int(length) if length and length.isdigit() else len(response.content)
+
+
+def _record_response(response, *args, **kwargs):
+    if "/comments/" in response.url:
+        response.content    # read the body, so the raw stream's position is its full size
+        _local.bytes = getattr(_local, "bytes", 0) + _wire_bytes(response)
+
+
+def _hook(session) -> None:
+    """Count comment response bytes on `session` (once per session)."""
+    if session is not None and _record_response not in session.hooks["response"]:
+        session.hooks["response"].append(_record_response)
+
+
+def _flatten(comments, limit: int, depth: int) -> list:
+    """Up to `limit` comments in tree order (each followed by its replies), skipping 'load more' stubs."""
+    found, stack = [], [(comment, 1) for comment in reversed(list(comments))]
+    while stack and len(found) < limit:
+        comment, level = stack.pop()
+        if not hasattr(comment, "body"):
+            continue
+        found.append(comment)
+        if level < depth:
+            stack.extend((reply, level + 1) for reply in reversed(list(getattr(comment, "replies", None) or [])))
+    return found
+
+
+def fetch(reddit, post_id: str, limit: int, sort: str = DEFAULT_SORT, depth: int = DEFAULT_DEPTH,
+          num_comments: int = 0) -> list:
+    """The first `limit` comments of a post, `depth` levels deep, in `sort` order.
+
+    `num_comments` (the post's comment count) is used to estimate what the
+    full first page would have cost.
+    """
+    _hook(reddit_session.http_session())
+    _local.bytes = 0
+    started = time.perf_counter()
+    listings = reddit.get(f"comments/{post_id}/", params={"limit": limit, "sort": sort, "depth": depth})
+    seconds = time.perf_counter() - started
+    comments = _flatten(listings[1] if len(listings) > 1 else [], limit, depth)
+
+    received = _local.bytes
+    run_metrics.incr("comment_bytes", received)
+    run_metrics.incr("comment_fetch_seconds", seconds)
+    full = min(int(num_comments or 0), FULL_TREE_COMMENTS)
+    if comments and full > len(comments):
+        run_metrics.incr("comment_bytes_full_est", received * full / len(comments))
+    else:
+        run_metrics.incr("comment_bytes_full_est", received)
+    return comments
+
+
+def options(config: dict) -> dict:
+    """The config's comment sort and depth, as keyword arguments for `fetch`."""
+    sort = config.get("comment_sort", DEFAULT_SORT)
+    if sort not in SORTS:
+        print(f"  ⚠️  Unknown comment_sort '{sort}', using '{DEFAULT_SORT}'")
+        sort = DEFAULT_SORT
+    return {"sort": sort, "depth": max(int(config.get("comment_depth", DEFAULT_DEPTH)), 1)}
+
+
+def _size(n: float) -> str:
+    return f"{n / 2**20:.1f} MB" if n >= 2**20 else f"{n / 2**10:.0f} KB"
+
+
+def summary() -> str:
+    """One line of comment transfer metrics for the run summary ('' when nothing was fetched)."""
+    received = run_metrics.get("comment_bytes")
+    if not received:
+        return ""
+    line = f"{_size(received)} in {run_metrics.get('comment_fetch_seconds'):.1f}s (measured)"
+    full = run_metrics.get("comment_bytes_full_est")
+    if full > received:
+        line += f"; full threads estimated at ~{_size(full)} (scaled by comment count, not measured)"
+    return line
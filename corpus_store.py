@@ -0,0 +1,382 @@
+"""Persistent corpus of every collected post and comment.
+
+Each run (and each backfill batch) appends its records to a SQLite store at
+CORPUS_PATH, keyed by item so re-collected posts are stored once per topic.
+
+Posts also carry their scoring inputs as columns: raw upvotes (`score`) and
+the component scores they were scored with when stored, so history can be
+re-weighted (rescore.py) without re-reading the stored records. Per-term document
+counts of each topic's items are kept in step with the items, for the
+TF-IDF relevance component (relevance.py).
+"""
+
+import json
+import re
+import sqlite3
+from collections import Counter
+from pathlib import Path
+
+import seen_filter
+from documents import tokens
+
+CORPUS_PATH = Path("output/corpus.db")
+POST_ID_RE = re.compile(r"/comments/([a-z0-9]+)")
+
+_terms_checked = set()  # (store, topic) whose term counts were checked against the items this process
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    topic       TEXT NOT NULL,
+    item_key    TEXT NOT NULL,          -- '<id>_<type>'
+    type        TEXT NOT NULL,
+    subreddit   TEXT,
+    created_utc REAL,
+    record      TEXT NOT NULL,
+    score       INTEGER,
+    sentiment_component         REAL,   -- NULL until computed
+    code_quality_component      REAL,
+    security_severity_component REAL,
+    relevance_component         REAL,
+    PRIMARY KEY (topic, item_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS items_created ON items (topic, created_utc);
+CREATE INDEX IF NOT EXISTS items_score ON items (topic, type, score);
+CREATE TABLE IF NOT EXISTS term_counts (
+    topic TEXT NOT NULL,
+    term  TEXT NOT NULL,
+    docs  INTEGER NOT NULL,             -- stored items containing the term
+    PRIMARY KEY (topic, term)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS topic_counts (
+    topic TEXT PRIMARY KEY,
+    docs  INTEGER NOT NULL              -- stored items counted in term_counts
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name  TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+INSERT OR IGNORE INTO meta VALUES ('store_id', lower(hex(randomblob(8))));
+CREATE TABLE IF NOT EXISTS generations (
+    topic TEXT PRIMARY KEY,
+    value INTEGER NOT NULL              -- items inserted or deleted, ever: stamps the seen filter
+);
+CREATE TRIGGER IF NOT EXISTS items_inserted AFTER INSERT ON items
+BEGIN
+    INSERT INTO generations (topic, value) VALUES (NEW.topic, 1)
+    ON CONFLICT (topic) DO UPDATE SET value = value + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS items_deleted AFTER DELETE ON items
+BEGIN
+    INSERT INTO generations (topic, value) VALUES (OLD.topic, 1)
+    ON CONFLICT (topic) DO UPDATE SET value = value + 1;
+END;
+"""
+
+
+STORED_COMPONENTS = ("sentiment_component", "code_quality_component", "security_severity_component",
+                     "relevance_component")
+
+
+def connect(path: Path = None) -> sqlite3.Connection:
+    """Open (and create if needed) the corpus store."""
+    path = path or CORPUS_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def add_records(records: list, topic: str, conn: sqlite3.Connection = None, scored=None) -> int:
+    """Store raw result records under a topic slug. Returns how many were new.
+
+    `scored` is the records' scored DataFrame (`scoring.score_items`), if any:
+    new posts are stored with its component scores, so only posts stored
+    without them need `rescore.fill_components`.
+
+    A Bloom filter of the topic's item keys (seen_filter) fronts the store:
+    only keys it may hold are looked up, the definitely-new ones go straight
+    to the insert. The filter is checked against the topic's generation
+    inside the write transaction, so no other writer can slip in between.
+    """
+    if not records:
+        return 0
+
+    own = conn is None
+    conn = conn or connect()
+    by_key = {f"{r['id']}_{r['type']}": r for r in records}
+    keys = list(by_key)
+    name = f"corpus_{topic}"
+    components = {}
+    if scored is not None and all(col in scored.columns for col in STORED_COMPONENTS):
+        posts = scored[scored["type"] == "post"]
+        components = dict(zip((f"{i}_post" for i in posts["id"]),
+                              posts[list(STORED_COMPONENTS)].itertuples(index=False, name=None)))
+    missing = (None,) * len(STORED_COMPONENTS)
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        before = generation(topic, conn)
+        bloom = seen_filter.get(name, before, lambda: _item_keys(topic, conn))
+        maybe = seen_filter.split(bloom, keys)
+        known = _existing_keys(topic, [k for k, m in zip(keys, maybe) if m], conn)
+        seen_filter.false_positives(int(maybe.sum()) - len(known))
+        new_keys = [k for k in keys if k not in known]
+
+        conn.executemany(
+            f"""INSERT OR IGNORE INTO items (topic, item_key, type, subreddit, created_utc, record, score,
+                                             {', '.join(STORED_COMPONENTS)})
+                VALUES (?, ?, ?, ?, ?, ?, ?, {', '.join('?' * len(STORED_COMPONENTS))})""",
+            [(topic, key, r["type"], r.get("subreddit"), r.get("created_utc") or 0,
+              json.dumps(r, default=str), r.get("score") or 0, *components.get(key, missing))
+             for key, r in ((k, by_key[k]) for k in new_keys)],
+        )
+        after = generation(topic, conn)
+        _count_terms(topic, [by_key[k] for k in new_keys], conn)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    bloom.add(new_keys)
+    bloom.stamp = after
+    seen_filter.save(name)
+    added = after[1] - before[1]
+    if own:
+        conn.close()
+    return added
+
+
+def _count_terms(topic: str, records: list, conn: sqlite3.Connection) -> None:
+    """Add records' terms to the topic's document counts (inside the caller's transaction)."""
+    counts = Counter()
+    for record in records:
+        counts.update(set(tokens(f"{record.get('title') or ''} {record.get('text') or record.get('body') or ''}")))
+    conn.executemany(
+        """INSERT INTO term_counts (topic, term, docs) VALUES (?, ?, ?)
+           ON CONFLICT (topic, term) DO UPDATE SET docs = docs + excluded.docs""",
+        [(topic, term, n) for term, n in counts.items()],
+    )
+    conn.execute(
+        """INSERT INTO topic_counts (topic, docs) VALUES (?, ?)
+           ON CONFLICT (topic) DO UPDATE SET docs = docs + excluded.docs""",
+        (topic, len(records)),
+    )
+
+
+def term_stats(topic: str, terms: list, conn: sqlite3.Connection = None) -> tuple:
+    """(items counted, {term: items containing it}) for the given terms of a topic.
+
+    The first call for a topic in a process checks the counts against the
+    stored items, and recomputes them when they are out of step (items
+    stored before counts were kept).
+    """
+    own = conn is None
+    conn = conn or connect()
+    store = conn.execute("SELECT value FROM meta WHERE name = 'store_id'").fetchone()[0]
+    if (store, topic) not in _terms_checked:
+        counted = conn.execute("SELECT docs FROM topic_counts WHERE topic = ?", (topic,)).fetchone()
+        if (counted[0] if counted else 0) != count_records(topic, conn):
+            print(f"  Counting terms of stored {topic} items...")
+            with conn:
+                conn.execute("DELETE FROM term_counts WHERE topic = ?", (topic,))
+                conn.execute("DELETE FROM topic_counts WHERE topic = ?", (topic,))
+                cursor = conn.execute("SELECT record FROM items WHERE topic = ?", (topic,))
+                while True:
+                    rows = cursor.fetchmany(5000)
+                    if not rows:
+                        break
+                    _count_terms(topic, [json.loads(r[0]) for r in rows], conn)
+        _terms_checked.add((store, topic))
+    n_docs = (conn.execute("SELECT docs FROM topic_counts WHERE topic = ?", (topic,)).fetchone() or (0,))[0]
+    counts = term_counts(topic, terms, conn)
+    if own:
+        conn.close()
+    return n_docs, counts
+
+
+def term_counts(topic: str, terms: list, conn: sqlite3.Connection = None) -> dict:
+    """{term: items containing it} for the given terms of a topic (terms in no item are left out)."""
+    own = conn is None
+    conn = conn or connect()
+    terms = list(terms)
+    counts = {}
+    for start in range(0, len(terms), 500):
+        batch = terms[start:start + 500]
+        counts.update(conn.execute(
+            f"SELECT term, docs FROM term_counts WHERE topic = ? AND term IN ({', '.join('?' * len(batch))})",
+            (topic, *batch),
+        ))
+    if own:
+        conn.close()
+    return counts
+
+
+def generation(topic: str, conn: sqlite3.Connection) -> list:
+    """[store id, items of the topic ever inserted or deleted]: changes whenever the topic's key set does."""
+    store_id = conn.execute("SELECT value FROM meta WHERE name = 'store_id'").fetchone()[0]
+    row = conn.execute("SELECT value FROM generations WHERE topic = ?", (topic,)).fetchone()
+    return [store_id, row[0] if row else 0]
+
+
+def _item_keys(topic: str, conn: sqlite3.Connection):
+    return (key for (key,) in conn.execute("SELECT item_key FROM items WHERE topic = ?", (topic,)))
+
+
+def _existing_keys(topic: str, keys: list, conn: sqlite3.Connection) -> set:
+    found = set()
+    for start in range(0, len(keys), 500):
+        batch = keys[start:start + 500]
+        found.update(key for (key,) in conn.execute(
+            f"SELECT item_key FROM items WHERE topic = ? AND item_key IN ({', '.join('?' * len(batch))})",
+            (topic, *batch),
+        ))
+    return found
+
+
+def load_records(topic: str, start: float = None, end: float = None, conn: sqlite3.Connection = None) -> list:
+    """Records for a topic, oldest first, optionally limited to [start, end) epoch seconds."""
+    own = conn is None
+    conn = conn or connect()
+    rows = conn.execute(
+        """SELECT record FROM items WHERE topic = ? AND created_utc >= ? AND created_utc < ?
+           ORDER BY created_utc""",
+        (topic, start or 0, end if end is not None else float("inf")),
+    ).fetchall()
+    if own:
+        conn.close()
+    return [json.loads(r[0]) for r in rows]
+
+
+def iter_chunks(topic: str, item_type: str, chunk: int = 5000, conn: sqlite3.Connection = None):
+    """Yield a topic's records of one type in lists of up to `chunk`, highest score first.
+
+    Rows come off the (topic, type, score) index already in order, so only
+    one chunk is held in memory at a time.
+    """
+    own = conn is None
+    conn = conn or connect()
+    cursor = conn.execute(
+        """SELECT record FROM items WHERE topic = ? AND type = ?
+           ORDER BY score DESC""",
+        (topic, item_type),
+    )
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk)
+            if not rows:
+                break
+            yield [json.loads(r[0]) for r in rows]
+    finally:
+        if own:
+            conn.close()
+
+
+def count_records(topic: str, conn: sqlite3.Connection = None) -> int:
+    own = conn is None
+    conn = conn or connect()
+    n = conn.execute("SELECT COUNT(*) FROM items WHERE topic = ?", (topic,)).fetchone()[0]
+    if own:
+        conn.close()
+    return n
+
+
+def missing_components(topic: str, chunk: int = 5000, conn: sqlite3.Connection = None):
+    """Yield a topic's posts without stored component scores, in lists of up to `chunk`.
+
+    Pages by item key, so components can be written back between chunks.
+    """
+    own = conn is None
+    conn = conn or connect()
+    last = ""
+    try:
+        while True:
+            rows = conn.execute(
+                """SELECT item_key, record FROM items
+                   WHERE topic = ? AND type = 'post' AND (sentiment_component IS NULL OR relevance_component IS NULL)
+                     AND item_key > ?
+                   ORDER BY item_key LIMIT ?""",
+                (topic, last, chunk),
+            ).fetchall()
+            if not rows:
+                break
+            last = rows[-1][0]
+            yield [json.loads(r[1]) for r in rows]
+    finally:
+        if own:
+            conn.close()
+
+
+def set_components(topic: str, rows: list, conn: sqlite3.Connection = None) -> None:
+    """Store component scores: rows of (item_key, sentiment, code_quality, security_severity, relevance)."""
+    own = conn is None
+    conn = conn or connect()
+    with conn:
+        conn.executemany(
+            """UPDATE items SET sentiment_component = ?, code_quality_component = ?, security_severity_component = ?,
+                                relevance_component = ?
+               WHERE topic = ? AND item_key = ?""",
+            [(sentiment, code, security, relevance, topic, key) for key, sentiment, code, security, relevance in rows],
+        )
+    if own:
+        conn.close()
+
+
+def component_rows(topic: str, conn: sqlite3.Connection = None) -> list:
+    """(item_key, score, created_utc, *STORED_COMPONENTS) for every scored post of a topic."""
+    own = conn is None
+    conn = conn or connect()
+    rows = conn.execute(
+        f"""SELECT item_key, score, created_utc, {', '.join(STORED_COMPONENTS)} FROM items
+            WHERE topic = ? AND type = 'post' AND sentiment_component IS NOT NULL
+              AND relevance_component IS NOT NULL""",
+        (topic,),
+    ).fetchall()
+    if own:
+        conn.close()
+    return rows
+
+
+def get_records(topic: str, keys: list, conn: sqlite3.Connection = None) -> dict:
+    """{item_key: record} for the given keys of a topic."""
+    own = conn is None
+    conn = conn or connect()
+    found = {}
+    for start in range(0, len(keys), 500):
+        batch = keys[start:start + 500]
+        found.update((key, json.loads(record)) for key, record in conn.execute(
+            f"SELECT item_key, record FROM items WHERE topic = ? AND item_key IN ({', '.join('?' * len(batch))})",
+            (topic, *batch),
+        ))
+    if own:
+        conn.close()
+    return found
+
+
+def item_details(topic: str, keys: list, conn: sqlite3.Connection = None) -> dict:
+    """{item_key: (title, url)} for the given keys."""
+    own = conn is None
+    conn = conn or connect()
+    details = {}
+    for start in range(0, len(keys), 500):
+        batch = keys[start:start + 500]
+        details.update((key, (title, url)) for key, title, url in conn.execute(
+            f"""SELECT item_key, json_extract(record, '$.title'), json_extract(record, '$.url') FROM items
+                WHERE topic = ? AND item_key IN ({', '.join('?' * len(batch))})""",
+            (topic, *batch),
+        ))
+    if own:
+        conn.close()
+    return details
+
+
+def keys_for_urls(topic: str, urls: list, conn: sqlite3.Connection = None) -> dict:
+    """{url: item_key} for the topic's posts whose URL is in urls.
+
+    A post URL carries its id, so each is looked up by item key.
+    """
+    by_key = {}
+    for url in urls:
+        match = POST_ID_RE.search(url or "")
+        if match:
+            by_key[f"{match.group(1)}_post"] = url
+    details = item_details(topic, list(by_key), conn)
+    return {url: key for key, url in by_key.items() if key in details and details[key][1] == url}
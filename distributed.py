@@ -0,0 +1,349 @@
+"""Sharded collection across worker nodes.
+
+A coordinator splits the shared fetch plan of one or more configs into shards
+in a SQLite work queue. Workers, each using the Reddit credentials from its
+own .env, claim shards under a lease, scrape them and push records back;
+duplicates are dropped on insert.
+Search shards spawn comment shards for the posts worth a comment fetch, so
+comment trees are fetched once however many configs or searches found a post.
+Once the queue drains, the coordinator runs analysis and scoring once per config.
+
+The queue relies on SQLite's file locking, which is unreliable on network
+filesystems (NFS, SMB): concurrent writers there can corrupt the database.
+Keep the queue on a local disk and run the workers on that machine, or on
+other nodes only through a filesystem whose locks are known to work.
+
+Usage:
+    python3 distributed.py plan scan_configs/*.json [--queue output/work_queue.db] [--shard-size 4]
+    python3 distributed.py worker [--queue ...]          # run on each node
+    python3 distributed.py status [--queue ...]
+    python3 distributed.py finalize [--queue ...] [--force]
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from batch_scan import write_outputs
+from near_dup import collapse_duplicates
+from rate_limit import DEFAULT_PER_MINUTE, RateBudget, listing_requests
+from reddit_research import (
+    DEFAULT_CONFIG,
+    add_unique,
+    analyze_scored,
+    fetch_plan,
+    fetch_post_comments,
+    init_reddit,
+    scrape_subreddit,
+    select_comment_targets,
+    topic_slug,
+)
+
+QUEUE_PATH = Path("output/work_queue.db")
+OUTPUT_DIR = Path("output/distributed")
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+COMMENT_SHARD_SIZE = 20
+IDLE_POLL_SECONDS = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS configs (
+    name   TEXT PRIMARY KEY,
+    config TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shards (
+    id            INTEGER PRIMARY KEY,
+    kind          TEXT NOT NULL,          -- 'search' or 'comments'
+    payload       TEXT NOT NULL,
+    status        TEXT NOT NULL DEFAULT 'pending',
+    owner         TEXT,
+    lease_expires REAL,
+    attempts      INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS shards_status ON shards (status, lease_expires);
+CREATE TABLE IF NOT EXISTS records (
+    item_key TEXT PRIMARY KEY,            -- '<id>_<type>', dedups across workers
+    parent_id TEXT,
+    record   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_parent ON records (parent_id);
+CREATE TABLE IF NOT EXISTS search_hits (
+    search_key TEXT NOT NULL,
+    position   INTEGER NOT NULL,
+    item_key   TEXT NOT NULL,
+    PRIMARY KEY (search_key, position)
+);
+CREATE TABLE IF NOT EXISTS comment_posts (
+    post_id TEXT PRIMARY KEY              -- comment fetches already queued
+);
+"""
+
+
+def connect(path: Path = QUEUE_PATH) -> sqlite3.Connection:
+    """Open the work queue (plain rollback journal; see the module notes on network filesystems)."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _search_key(subreddit: str, term: str) -> str:
+    return f"{subreddit.lower()}\t{term.lower()}"
+
+
+# ============================================
+# COORDINATOR
+# ============================================
+
+def plan(conn: sqlite3.Connection, configs: dict, shard_size: int = 4) -> int:
+    """Queue the shared fetch plan of configs ({name: config}) as search shards."""
+    tasks = {}
+    for name, config in configs.items():
+        for subreddit, term, limit in fetch_plan(config):
+            key = _search_key(subreddit, term)
+            if key not in tasks:
+                tasks[key] = [subreddit, term, limit, []]
+            tasks[key][2] = max(tasks[key][2], limit)
+            tasks[key][3].append(name)
+
+    task_list = list(tasks.values())
+    conn.execute("BEGIN IMMEDIATE")
+    for name, config in configs.items():
+        conn.execute("INSERT OR REPLACE INTO configs (name, config) VALUES (?, ?)", (name, json.dumps(config)))
+    for i in range(0, len(task_list), shard_size):
+        conn.execute("INSERT INTO shards (kind, payload) VALUES ('search', ?)",
+                     (json.dumps(task_list[i:i + shard_size]),))
+    conn.execute("COMMIT")
+    return (len(task_list) + shard_size - 1) // shard_size
+
+
+def status(conn: sqlite3.Connection) -> dict:
+    """Shard counts by kind and status, plus the number of records collected."""
+    counts = {}
+    for kind, state, n in conn.execute("SELECT kind, status, COUNT(*) FROM shards GROUP BY kind, status"):
+        counts.setdefault(kind, {})[state] = n
+    counts["records"] = conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+    return counts
+
+
+def _drained(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT COUNT(*) FROM shards WHERE status IN ('pending', 'leased')").fetchone()[0] == 0
+
+
+def assemble(conn: sqlite3.Connection, config: dict) -> list:
+    """Rebuild one config's records from the queue, as a solo run would collect them."""
+    records, seen_ids = [], set()
+    for subreddit, term, limit in fetch_plan(config):
+        rows = conn.execute(
+            """SELECT r.record FROM search_hits h JOIN records r ON r.item_key = h.item_key
+               WHERE h.search_key = ? ORDER BY h.position LIMIT ?""",
+            (_search_key(subreddit, term), limit),
+        )
+        add_unique(records, seen_ids, [json.loads(r[0]) for r in rows])
+
+    if config.get("collapse_duplicates", True):
+        records, _collapsed = collapse_duplicates(records, topic_slug(config["topic"]))
+
+    comment_limit = config["limits"]["comments"]
+    if comment_limit <= 0:
+        return records
+
+    posts = [r for r in records if r["type"] == "post"]
+    targets = select_comment_targets(posts, config) if config.get("two_phase") else posts
+    for post in targets:
+        rows = conn.execute(
+            "SELECT record FROM records WHERE parent_id = ? ORDER BY rowid LIMIT ?", (post["id"], comment_limit)
+        )
+        add_unique(records, seen_ids, [json.loads(r[0]) for r in rows])
+    return records
+
+
+def finalize(conn: sqlite3.Connection, force: bool = False) -> None:
+    """Analyse and score each config once from the collected records."""
+    if not _drained(conn) and not force:
+        print("Queue not drained yet (use --force to finalize anyway):", status(conn))
+        return
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    for name, config_json in conn.execute("SELECT name, config FROM configs").fetchall():
+        config = json.loads(config_json)
+        records = assemble(conn, config)
+        if not records:
+            print(f"  {name}: no results")
+            continue
+        df, analysis = analyze_scored(pd.DataFrame(records), config)
+        out_dir = write_outputs(name, config, df, analysis, timestamp, base_dir=OUTPUT_DIR)
+        print(f"  {name}: {len(df)} items → {out_dir}")
+
+
+# ============================================
+# WORKER
+# ============================================
+
+def claim(conn: sqlite3.Connection, owner: str):
+    """Lease the next pending (or expired) shard. Returns (id, kind, payload) or None."""
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Give up on shards that keep failing or timing out
+        conn.execute(
+            """UPDATE shards SET status = 'failed'
+               WHERE attempts >= ? AND (status = 'pending' OR (status = 'leased' AND lease_expires < ?))""",
+            (MAX_ATTEMPTS, now),
+        )
+        row = conn.execute(
+            """SELECT id, kind, payload FROM shards
+               WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)
+               ORDER BY id LIMIT 1""",
+            (now,),
+        ).fetchone()
+        if row is None:
+            return None
+        shard_id, kind, payload = row
+        conn.execute(
+            "UPDATE shards SET status = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+            (owner, now + LEASE_SECONDS, shard_id),
+        )
+        return shard_id, kind, json.loads(payload)
+    finally:
+        conn.execute("COMMIT")
+
+
+def _renew(conn: sqlite3.Connection, shard_id: int, owner: str) -> None:
+    conn.execute("UPDATE shards SET lease_expires = ? WHERE id = ? AND owner = ?",
+                 (time.time() + LEASE_SECONDS, shard_id, owner))
+
+
+def _push(conn: sqlite3.Connection, records: list) -> None:
+    conn.executemany(
+        "INSERT OR IGNORE INTO records (item_key, parent_id, record) VALUES (?, ?, ?)",
+        [(f"{r['id']}_{r['type']}", r.get("parent_id"), json.dumps(r)) for r in records],
+    )
+
+
+def _run_search_shard(conn, reddit, budget, shard_id, owner, tasks, configs) -> None:
+    for subreddit, term, limit, config_names in tasks:
+        budget.acquire(listing_requests(limit))
+        posts = scrape_subreddit(reddit, subreddit, term, limit, 0)
+        key = _search_key(subreddit, term)
+
+        # Posts worth a comment fetch for any config that runs this search
+        wanted = {}
+        for name in config_names:
+            config = configs[name]
+            comment_limit = config["limits"]["comments"]
+            if comment_limit <= 0:
+                continue
+            own_limit = config.get("all_reddit_limit", 10) if subreddit == "all" else config["limits"]["posts"]
+            own_posts = posts[:own_limit]
+            targets = select_comment_targets(own_posts, config) if config.get("two_phase") else own_posts
+            for post in targets:
+                wanted[post["id"]] = (post, max(comment_limit, wanted.get(post["id"], (None, 0))[1]))
+
+        conn.execute("BEGIN IMMEDIATE")
+        _push(conn, posts)
+        conn.executemany(
+            "INSERT OR REPLACE INTO search_hits (search_key, position, item_key) VALUES (?, ?, ?)",
+            [(key, i, f"{p['id']}_post") for i, p in enumerate(posts)],
+        )
+        new_posts = [
+            wanted[pid] for pid in wanted
+            if conn.execute("INSERT OR IGNORE INTO comment_posts (post_id) VALUES (?)", (pid,)).rowcount
+        ]
+        for i in range(0, len(new_posts), COMMENT_SHARD_SIZE):
+            conn.execute("INSERT INTO shards (kind, payload) VALUES ('comments', ?)",
+                         (json.dumps(new_posts[i:i + COMMENT_SHARD_SIZE]),))
+        _renew(conn, shard_id, owner)
+        conn.execute("COMMIT")
+
+
+def _run_comment_shard(conn, reddit, budget, shard_id, owner, posts) -> None:
+    records = []
+    for post, comment_limit in posts:
+        records.extend(fetch_post_comments(reddit, post, comment_limit, budget))
+    conn.execute("BEGIN IMMEDIATE")
+    _push(conn, records)
+    _renew(conn, shard_id, owner)
+    conn.execute("COMMIT")
+
+
+def work(conn: sqlite3.Connection, per_minute: float = DEFAULT_PER_MINUTE) -> int:
+    """Claim and process shards until the queue drains. Returns shards completed."""
+    owner = f"{socket.gethostname()}-{os.getpid()}"
+    reddit = init_reddit()
+    budget = RateBudget(per_minute)
+    configs = {name: json.loads(c) for name, c in conn.execute("SELECT name, config FROM configs")}
+    completed = 0
+
+    print(f"Worker {owner} started")
+    while True:
+        shard = claim(conn, owner)
+        if shard is None:
+            if _drained(conn):
+                break
+            time.sleep(IDLE_POLL_SECONDS)  # other workers hold leases; they may add comment shards
+            continue
+
+        shard_id, kind, payload = shard
+        try:
+            if kind == "search":
+                _run_search_shard(conn, reddit, budget, shard_id, owner, payload, configs)
+            else:
+                _run_comment_shard(conn, reddit, budget, shard_id, owner, payload)
+        except Exception as e:
+            print(f"  shard {shard_id} failed: {e}")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            conn.execute("UPDATE shards SET status = 'pending', owner = NULL WHERE id = ? AND owner = ?",
+                         (shard_id, owner))
+            continue
+
+        conn.execute("UPDATE shards SET status = 'done' WHERE id = ? AND owner = ?", (shard_id, owner))
+        completed += 1
+        print(f"  shard {shard_id} ({kind}) done")
+
+    print(f"Worker {owner} finished: {completed} shards")
+    return completed
+
+
+def _load_configs(paths: list) -> dict:
+    configs = {}
+    for path in paths:
+        with open(path, "r") as f:
+            config = DEFAULT_CONFIG.copy()
+            config.update(json.load(f))
+        configs[Path(path).stem] = config
+    return configs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded distributed Reddit collection")
+    parser.add_argument("command", choices=["plan", "worker", "status", "finalize"])
+    parser.add_argument("configs", nargs="*", help="config files (plan only)")
+    parser.add_argument("--queue", default=str(QUEUE_PATH), help="shared SQLite work queue")
+    parser.add_argument("--shard-size", type=int, default=4, help="searches per shard (plan only)")
+    parser.add_argument("--rate", type=float, default=DEFAULT_PER_MINUTE, help="API requests per minute (worker)")
+    parser.add_argument("--force", action="store_true", help="finalize before the queue drains")
+    args = parser.parse_args()
+
+    conn = connect(Path(args.queue))
+    if args.command == "plan":
+        if not args.configs:
+            print("ERROR: plan needs at least one config file")
+            sys.exit(1)
+        n = plan(conn, _load_configs(args.configs), args.shard_size)
+        print(f"Queued {n} search shards in {args.queue}")
+    elif args.command == "worker":
+        work(conn, args.rate)
+    elif args.command == "status":
+        print(json.dumps(status(conn), indent=2))
+    else:
+        finalize(conn, args.force)
@@ -0,0 +1,126 @@
+"""Prepared documents shared by analysis, scoring and review.
+
+Every stage used to rebuild `title + text` for an item, lower-case it and
+search it again: analysis for entities and sentiment, scoring for security
+keywords and code blocks, the review writer for its summary line. A Document
+does that work once per item:
+
+- `lower`: the lower-cased "title text" that keyword matching runs against
+- `code`: the fenced ``` code blocks, joined (case kept, empty when none)
+- `summary`: the one-line text excerpt used in REVIEW.md
+- `hits(keywords)`: which of a keyword list occur, memoised per list
+- `word_hits(keywords)`: the same, counting only whole-word occurrences
+
+Documents are cached by a hash of their content, so the same item reaching
+analysis, scoring and review (or a later run in the same process) is prepared
+only once.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+CODE_BLOCK_RE = re.compile(r"```[\s\S]*?```")
+TOKEN_RE = re.compile(r"[^\W_]+")  # word tokens, as searched and weighted
+SUMMARY_CHARS = 200
+MAX_CACHED = 50000
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def _str(value) -> str:
+    # NaN / None from DataFrames become empty text
+    return value if isinstance(value, str) else ""
+
+
+class Document:
+    """One item's text, normalised once."""
+
+    __slots__ = ("lower", "code", "summary", "_hits")
+
+    def __init__(self, title: str, text: str):
+        full = f"{title} {text}"
+        self.lower = full.lower()
+        self.code = " ".join(CODE_BLOCK_RE.findall(full))
+        self.summary = text.replace("\n", " ").replace("\r", " ")[:SUMMARY_CHARS]
+        self._hits = {}
+
+    def hits(self, keywords: tuple) -> frozenset:
+        """The keywords (given lower-cased) that occur in the text."""
+        found = self._hits.get(keywords)
+        if found is None:
+            found = self._hits[keywords] = frozenset(kw for kw in keywords if kw in self.lower)
+        return found
+
+    def count(self, keywords: tuple) -> int:
+        """How many of the keywords occur (duplicates in the list count each time)."""
+        found = self.hits(keywords)
+        return sum(1 for kw in keywords if kw in found)
+
+    def word_hits(self, keywords: tuple) -> frozenset:
+        """The keywords that occur as whole words ("rce" matches "RCE in", not "source")."""
+        key = ("words",) + keywords
+        found = self._hits.get(key)
+        if found is None:
+            found = self._hits[key] = frozenset(_word_pattern(keywords).findall(self.lower))
+        return found
+
+    def code_hits(self, signals: tuple) -> frozenset:
+        """The signals (case-sensitive) that occur inside the code blocks."""
+        key = ("code",) + signals
+        found = self._hits.get(key)
+        if found is None:
+            found = self._hits[key] = frozenset(s for s in signals if s in self.code)
+        return found
+
+
+@lru_cache(maxsize=64)
+def _word_pattern(keywords: tuple) -> re.Pattern:
+    alternatives = "|".join(re.escape(kw) for kw in sorted(keywords, key=len, reverse=True))
+    return re.compile(rf"(?<!\w)(?:{alternatives})(?!\w)")
+
+
+def tokens(text: str) -> list:
+    """Lower-cased word tokens of a text."""
+    return TOKEN_RE.findall(text.lower())
+
+
+def keywords(words) -> tuple:
+    """A keyword list in the lower-cased tuple form `Document.hits` takes."""
+    return tuple(w.lower() for w in words)
+
+
+def prepare(title, text) -> Document:
+    """The Document for an item's title and text, from the cache when seen before."""
+    title, text = _str(title), _str(text)
+    key = hashlib.blake2b(f"{title}\x00{text}".encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _lock:
+        doc = _cache.get(key)
+        if doc is not None:
+            _cache.move_to_end(key)
+            return doc
+    doc = Document(title, text)
+    with _lock:
+        _cache[key] = doc
+        if len(_cache) > MAX_CACHED:
+            _cache.popitem(last=False)
+    return doc
+
+
+def documents(df, body: bool = True) -> list:
+    """Documents for each row of a results DataFrame (`text`, or `body` when that is what it has).
+
+    With `body` False the documents hold the titles only.
+    """
+    text_col = "text" if "text" in df.columns else "body"
+    titles = df["title"] if "title" in df.columns else [""] * len(df)
+    texts = df[text_col] if body and text_col in df.columns else [""] * len(df)
+    return [prepare(title, text) for title, text in zip(titles, texts)]
+
+
+def clear_cache() -> None:
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,68 @@
+"""Constant-memory Excel writing.
+
+openpyxl normally keeps every cell of a workbook in memory until it is saved.
+Write-only workbooks instead serialise each row as it is appended, so memory
+stays flat however many rows are written. Sheets are given as row iterators,
+and DataFrames are fed through in sorted chunks rather than copied and sorted
+whole.
+"""
+
+import math
+
+import numpy as np
+from openpyxl import Workbook
+
+CHUNK_ROWS = 5000
+
+
+def _clean(value):
+    # Blank cells for missing values, as pandas' to_excel writes them
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def write_workbook(output_path, sheets) -> None:
+    """Write sheets to a write-only workbook.
+
+    `sheets` is an iterable of (name, header, rows, keep_empty); rows is any
+    iterable of row sequences. A sheet with no rows is left out unless
+    keep_empty is true.
+    """
+    wb = Workbook(write_only=True)
+    for name, header, rows, keep_empty in sheets:
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None and not keep_empty:
+            continue
+        ws = wb.create_sheet(name)
+        ws.append(list(header))
+        if first is not None:
+            ws.append([_clean(v) for v in first])
+            for row in rows:
+                ws.append([_clean(v) for v in row])
+    wb.save(output_path)
+
+
+def frame_rows(df, columns: list, sort_by: str = None, ascending: bool = False, chunk: int = CHUNK_ROWS,
+               rows=None, prepare=None):
+    """Yield rows of df[columns], optionally sorted, one chunk at a time.
+
+    `rows` (positions) limits output to those rows without a filtered copy of
+    df. `prepare`, if given, is applied to each chunk before the columns are
+    picked (e.g. to derive display columns).
+    """
+    rows = np.arange(len(df)) if rows is None else np.asarray(rows)
+    if sort_by is not None and len(rows):
+        # Stable either way, so ties keep their order as with sort_values
+        values = df[sort_by].to_numpy(dtype=float)[rows]
+        rows = rows[np.argsort(values if ascending else -values, kind="stable")]
+
+    for start in range(0, len(rows), chunk):
+        part = df.iloc[rows[start:start + chunk]]
+        if prepare is not None:
+            part = prepare(part)
+        yield from part[[c for c in columns if c in part.columns]].itertuples(index=False, name=None)
+
@@ -0,0 +1,67 @@
+"""Concurrent, atomic export of one analysis result.
+
+A run's outputs (Excel workbook, markdown report, columnar partitions) all
+read the same finished analysis and none depends on another, so they are
+written at the same time on threads: export takes about as long as the
+slowest format rather than the sum, since the writers spend much of their
+time in file IO and Arrow, outside the GIL. Threads share the result without
+pickling it, and unlike forked processes they are safe alongside the other
+threads a run has going (comment fetches, listing prefetch).
+
+Each file is written to a temporary name beside its target and renamed over
+it when complete, so a crash or a failed writer never leaves a truncated
+output behind.
+"""
+
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+# Everything an export writer reads; built once, never modified by writers
+AnalysisResult = namedtuple('AnalysisResult', 'config df analysis history trends slug timestamp lean outputs')
+
+@contextmanager
+def atomic_path(path):
+    """Yield a temporary path beside `path`, renamed over `path` if the block succeeds."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.stem}.{os.getpid()}.tmp{path.suffix}")
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def _run(result, path, writer) -> float:
+    started = time.perf_counter()
+    if path is None:
+        writer(result)  # writes (and renames) its own files
+    else:
+        with atomic_path(path) as tmp:
+            writer(result, tmp)
+    return time.perf_counter() - started
+
+
+def run_exports(result: AnalysisResult, tasks: list) -> dict:
+    """Run every export task at once. Returns {name: seconds} for the ones that succeeded.
+
+    `tasks` are (name, path, writer) tuples; `writer(result, tmp_path)` writes
+    the file, or with path None `writer(result)` manages its own files.
+    A failing writer is reported and the others still complete.
+    """
+    if not tasks:
+        return {}
+
+    timings = {}
+    with ThreadPoolExecutor(len(tasks), thread_name_prefix="export") as pool:
+        futures = [(name, pool.submit(_run, result, path, writer)) for name, path, writer in tasks]
+        for name, future in futures:
+            try:
+                timings[name] = future.result()
+            except Exception as e:
+                print(f"  ✗ {name} export failed: {e}")
+    return timings
@@ -0,0 +1,147 @@
+"""Memory-lean analysis for very large result sets.
+
+The standard `analyze_data` keeps a prepared `documents.Document` (a
+lower-cased copy of the text) per row and adds entity hits as joined strings
+and formatted date/time strings, roughly doubling the memory held. Lean mode adds two compact columns instead:
+
+- `entity_mask`: uint64 bitmask, bit i set when entities_to_track[i] appears
+- `sentiment`: categorical (one byte per row)
+
+and converts the low-cardinality string columns (type, subreddit,
+search_term, author) to categoricals. The display columns
+(`entities_mentioned`, `created_date`, `created_time`) are derived a chunk at
+a time by `display_chunks`, only where something needs them (aggregates,
+time series, export). The analysis dict is identical to the standard one.
+"""
+
+import numpy as np
+import pandas as pd
+
+SENTIMENTS = ['Positive', 'Negative', 'Neutral']
+CATEGORY_COLS = ['type', 'subreddit', 'search_term', 'author']
+MAX_ENTITIES = 64
+CHUNK_ROWS = 50000
+
+
+def _lower_text(title, text) -> str:
+    return f"{title if isinstance(title, str) else ''} {text if isinstance(text, str) else ''}".lower()
+
+
+def annotate_lean(df: pd.DataFrame, config: dict) -> pd.DataFrame:
+    """Add entity_mask and categorical sentiment in place; categorise string columns."""
+    entities = [e.lower() for e in config.get('entities_to_track', [])]
+    if len(entities) > MAX_ENTITIES:
+        raise ValueError(f"Lean analysis tracks at most {MAX_ENTITIES} entities ({len(entities)} given)")
+    pos_kw = [kw.lower() for kw in config.get('keywords_positive', [])]
+    neg_kw = [kw.lower() for kw in config.get('keywords_negative', [])]
+
+    n = len(df)
+    mask = np.zeros(n, dtype=np.uint64)
+    codes = np.empty(n, dtype=np.int8)
+    # One pass, one transient lowercase string per row (same matching as find_entities/classify_sentiment)
+    for i, (title, text) in enumerate(zip(df['title'], df['text'])):
+        low = _lower_text(title, text)
+        bits = 0
+        for bit, entity in enumerate(entities):
+            if entity in low:
+                bits |= 1 << bit
+        mask[i] = bits
+        pos = sum(1 for kw in pos_kw if kw in low)
+        neg = sum(1 for kw in neg_kw if kw in low)
+        codes[i] = 0 if pos > neg else 1 if neg > pos else 2
+
+    df['entity_mask'] = mask
+    df['sentiment'] = pd.Categorical.from_codes(codes, SENTIMENTS)
+    for col in CATEGORY_COLS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return df
+
+
+def entity_hits(mask: np.ndarray, bit: int) -> np.ndarray:
+    return (mask >> np.uint64(bit)) & np.uint64(1) == 1
+
+
+def analyze_lean(df: pd.DataFrame, config: dict) -> tuple:
+    """Lean `analyze_data`: same analysis dict, compact columns, no filtered frame copies."""
+    entities = config.get('entities_to_track', [])
+    df = annotate_lean(df, config)
+    mask = df['entity_mask'].to_numpy()
+    codes = df['sentiment'].cat.codes.to_numpy()
+
+    entity_counts, entity_sentiment = {}, {}
+    for bit, entity in enumerate(entities):
+        hits = entity_hits(mask, bit)
+        count = int(hits.sum())
+        if count > 0:
+            pos, neg, neu = np.bincount(codes[hits], minlength=3)[:3]
+            entity_counts[entity] = count
+            entity_sentiment[entity] = {'Positive': int(pos), 'Negative': int(neg), 'Neutral': int(neu),
+                                        'total': count}
+
+    pos, neg, neu = np.bincount(codes, minlength=3)[:3]
+    is_post = (df['type'] == 'post').to_numpy()
+
+    subreddit_stats = (
+        df.loc[is_post, ['subreddit', 'score', 'num_comments']]
+        .groupby('subreddit', observed=True)
+        .agg(posts=('score', 'size'), avg_score=('score', 'mean'), avg_comments=('num_comments', 'mean'))
+        .round(2)
+        .sort_values('posts', ascending=False)
+    )
+    subreddit_stats.index = subreddit_stats.index.astype(str)
+
+    top_index = df.loc[is_post, 'score'].nlargest(10).index
+    top_posts = df.loc[top_index, ['title', 'subreddit', 'score', 'num_comments', 'url', 'sentiment']]
+    top_posts = top_posts.astype({'subreddit': str, 'sentiment': str}).to_dict('records')
+
+    dates = pd.to_datetime(df['created_utc'], unit='s')
+    analysis = {
+        'entities': entity_counts,
+        'entity_sentiment': entity_sentiment,
+        'sentiment': {'Positive': int(pos), 'Negative': int(neg), 'Neutral': int(neu)},
+        'subreddits': subreddit_stats.to_dict('index'),
+        'top_posts': top_posts,
+        'engagement': {
+            'total_posts': int(is_post.sum()),
+            'total_comments': int((df['type'] == 'comment').sum()),
+            'avg_score': round(df['score'].mean(), 2),
+            'total_score': int(df['score'].sum()),
+        },
+        'date_range': {
+            'earliest': dates.min().strftime('%Y-%m-%d'),
+            'latest': dates.max().strftime('%Y-%m-%d'),
+        },
+    }
+    return df, analysis
+
+
+def entity_strings(mask: np.ndarray, entities: list) -> np.ndarray:
+    """Bitmasks to ', '-joined entity names (computed once per distinct mask)."""
+    unique, inverse = np.unique(mask, return_inverse=True)
+    names = np.array([', '.join(e for bit, e in enumerate(entities) if int(m) >> bit & 1) for m in unique],
+                     dtype=object)
+    return names[inverse]
+
+
+def display_columns(chunk: pd.DataFrame, config: dict) -> pd.DataFrame:
+    """Add entities_mentioned / created_date / created_time to a chunk (for export and aggregates)."""
+    if 'entity_mask' not in chunk.columns:
+        return chunk
+    chunk = chunk.copy()
+    chunk['entities_mentioned'] = entity_strings(chunk['entity_mask'].to_numpy(), config.get('entities_to_track', []))
+    created = pd.to_datetime(chunk['created_utc'], unit='s')
+    chunk['created_date'] = created.dt.strftime('%Y-%m-%d')
+    chunk['created_time'] = created.dt.strftime('%H:%M:%S')
+    return chunk
+
+
+def display_chunks(df: pd.DataFrame, config: dict, chunk: int = CHUNK_ROWS):
+    """Yield df in row chunks with the display columns derived."""
+    for start in range(0, len(df), chunk):
+        yield display_columns(df.iloc[start:start + chunk], config)
+
+
+def memory_mb(df: pd.DataFrame) -> float:
+    """Deep memory use of a DataFrame in MB."""
+    return df.memory_usage(deep=True).sum() / 2**20
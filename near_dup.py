@@ -0,0 +1,202 @@
+"""Near-duplicate and cross-post collapsing with MinHash/LSH.
+
+The same announcement is often cross-posted to several subreddits under new
+ids, so exact-id dedup keeps every copy. Each post's title + text is reduced
+to a MinHash signature, and signatures are banded into an LSH index kept in
+SQLite at NEAR_DUP_PATH, one index per topic. A new post only has to be
+compared with the posts of its topic that share a band with it, so lookups
+stay fast as the index grows across runs. Texts shorter than one shingle
+(SHINGLE_WORDS words) are never collapsed: a title like "Help needed" says too
+little to call another post a copy.
+
+Copies are collapsed into one canonical record carrying the combined score
+and comment count, with the other subreddits listed in `crosspost_subreddits`.
+Its `canonical_id` stays stable across runs (the first copy ever indexed), so
+a cross-post seen in a later run is recognised as already known.
+"""
+
+import hashlib
+import re
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+import run_metrics
+
+NEAR_DUP_PATH = Path("output/near_dup.db")
+
+NUM_PERM = 128
+BANDS = 16              # 16 bands x 8 rows: pairs above ~0.7 similarity almost always collide
+ROWS = NUM_PERM // BANDS
+SIMILARITY = 0.7        # estimated Jaccard similarity at which posts count as duplicates
+SHINGLE_WORDS = 3
+RETAIN_DAYS = 90        # drop index entries for posts older than this
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(20240611)  # fixed seed: signatures must stay comparable across runs
+_A = _rng.randint(1, _PRIME, NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, NUM_PERM).astype(np.uint64)
+
+_URL_RE = re.compile(r"https?://\S+")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    topic       TEXT NOT NULL,
+    item_id     TEXT NOT NULL,
+    canonical   TEXT NOT NULL,
+    created_utc REAL,
+    sig         BLOB NOT NULL,
+    PRIMARY KEY (topic, item_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS signatures_created ON signatures (created_utc);
+CREATE TABLE IF NOT EXISTS bands (
+    topic   TEXT NOT NULL,
+    band    INTEGER NOT NULL,
+    hash    INTEGER NOT NULL,
+    item_id TEXT NOT NULL,
+    PRIMARY KEY (topic, band, hash, item_id)
+) WITHOUT ROWID;
+"""
+
+
+def connect(path: Path = None) -> sqlite3.Connection:
+    """Open (and create if needed) the LSH index."""
+    path = path or NEAR_DUP_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def shingles(text: str) -> set:
+    """Word 3-grams of normalised text (none for texts under SHINGLE_WORDS words)."""
+    words = _WORD_RE.findall(_URL_RE.sub(" ", text.lower()))
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def signature(text: str):
+    """MinHash signature (NUM_PERM uint64 values) of text, or None if it is too short to shingle."""
+    tokens = shingles(text)
+    if not tokens:
+        return None
+    x = np.fromiter((zlib.crc32(t.encode()) for t in tokens), dtype=np.uint64, count=len(tokens)) % _PRIME
+    return ((_A[:, None] * x[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def band_hashes(sig) -> list:
+    """One signed 64-bit hash per LSH band."""
+    return [int.from_bytes(hashlib.blake2b(sig[i * ROWS:(i + 1) * ROWS].tobytes(), digest_size=8).digest(),
+                           "big", signed=True) for i in range(BANDS)]
+
+
+def find_canonical(conn: sqlite3.Connection, topic: str, sig, bands: list):
+    """Canonical id of the topic's most similar indexed post at or above SIMILARITY, or None."""
+    candidates = set()
+    for band, h in enumerate(bands):
+        candidates.update(r[0] for r in conn.execute(
+            "SELECT item_id FROM bands WHERE topic = ? AND band = ? AND hash = ?", (topic, band, h)))
+    if not candidates:
+        return None
+
+    best, best_sim = None, SIMILARITY
+    marks = ",".join("?" * len(candidates))
+    for item_id, canonical, blob in conn.execute(
+            f"SELECT item_id, canonical, sig FROM signatures WHERE topic = ? AND item_id IN ({marks})",
+            (topic, *candidates)):
+        sim = float(np.mean(np.frombuffer(blob, dtype=np.uint64) == sig))
+        if sim >= best_sim:
+            best, best_sim = canonical, sim
+    return best
+
+
+def index_post(conn: sqlite3.Connection, topic: str, item_id: str, canonical: str, created_utc: float, sig,
+               bands: list) -> None:
+    conn.execute("INSERT OR REPLACE INTO signatures (topic, item_id, canonical, created_utc, sig) "
+                 "VALUES (?, ?, ?, ?, ?)", (topic, item_id, canonical, created_utc, sig.tobytes()))
+    conn.executemany("INSERT OR IGNORE INTO bands (topic, band, hash, item_id) VALUES (?, ?, ?, ?)",
+                     [(topic, band, h, item_id) for band, h in enumerate(bands)])
+
+
+def prune(conn: sqlite3.Connection, now: float = None) -> None:
+    """Drop index entries for posts older than RETAIN_DAYS."""
+    cutoff = (now or time.time()) - RETAIN_DAYS * 86400
+    with conn:
+        old = conn.execute("SELECT topic, item_id FROM signatures WHERE created_utc < ?", (cutoff,)).fetchall()
+        conn.executemany("DELETE FROM bands WHERE topic = ? AND item_id = ?", old)
+        conn.executemany("DELETE FROM signatures WHERE topic = ? AND item_id = ?", old)
+
+
+def collapse_posts(posts: list, topic: str, conn: sqlite3.Connection = None) -> tuple:
+    """Collapse near-duplicate posts of a topic (slug) into canonical items.
+
+    Every post gets a `canonical_id`. The earliest copy of each story is kept,
+    with the copies' score and num_comments added in and their subreddits in
+    `crosspost_subreddits`. Returns (kept posts, {dropped id: kept id}); the
+    posts are copies, since they may be shared with other collections.
+    """
+    if not posts:
+        return [], {}
+
+    own = conn is None
+    conn = conn or connect()
+    keep = {}        # canonical id -> kept record
+    dropped = {}     # dropped post id -> kept post id
+
+    with conn:
+        for post in sorted((dict(p) for p in posts), key=lambda r: r.get("created_utc") or 0):
+            row = conn.execute("SELECT canonical FROM signatures WHERE topic = ? AND item_id = ?",
+                               (topic, post["id"])).fetchone()
+            if row:
+                canonical = row[0]
+            else:
+                canonical = post["id"]
+                sig = signature(f"{post.get('title', '')} {post.get('text', '')}")
+                if sig is not None:
+                    bands = band_hashes(sig)
+                    canonical = find_canonical(conn, topic, sig, bands) or post["id"]
+                    index_post(conn, topic, post["id"], canonical, post.get("created_utc") or 0, sig, bands)
+
+            post["canonical_id"] = canonical
+            kept = keep.get(canonical)
+            if kept is None or kept["id"] == post["id"]:
+                keep[canonical] = post
+                post.setdefault("crosspost_subreddits", "")
+                continue
+
+            kept["score"] = (kept.get("score") or 0) + (post.get("score") or 0)
+            kept["num_comments"] = (kept.get("num_comments") or 0) + (post.get("num_comments") or 0)
+            subs = [s for s in kept["crosspost_subreddits"].split(", ") if s]
+            if post["subreddit"] != kept["subreddit"] and post["subreddit"] not in subs:
+                kept["crosspost_subreddits"] = ", ".join(subs + [post["subreddit"]])
+            dropped[post["id"]] = kept["id"]
+
+    prune(conn)
+    run_metrics.incr("near_duplicates_collapsed", len(dropped))
+    if own:
+        conn.close()
+    return list(keep.values()), dropped
+
+
+def collapse_duplicates(records: list, topic: str, conn: sqlite3.Connection = None) -> tuple:
+    """`collapse_posts` over a list of records, keeping their order.
+
+    Comments of dropped copies are re-parented to the kept post. Returns
+    (records, number of posts collapsed).
+    """
+    kept, dropped = collapse_posts([r for r in records if r["type"] == "post"], topic, conn)
+    by_id = {p["id"]: p for p in kept}
+
+    result = []
+    for r in records:
+        if r["type"] == "post":
+            if r["id"] in by_id:
+                result.append(by_id[r["id"]])
+        elif r.get("parent_id") in dropped:
+            result.append(dict(r, parent_id=dropped[r["parent_id"]]))
+        else:
+            result.append(r)
+    return result, len(dropped)
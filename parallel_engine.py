@@ -0,0 +1,272 @@
+"""Multi-core analysis and scoring of one large results frame.
+
+`analyze_data` and `score_items` do their per-row text work (entity
+matching, sentiment, code quality / security / relevance components) in one
+process. For big backfills and batches this engine splits the rows into
+chunks and runs that work in a pool of forked worker processes:
+
+- inputs (titles and texts as UTF-8 blobs with offsets, and the numeric
+  columns the aggregates need) are placed in shared memory blocks, which
+  each worker attaches by name when it starts, so rows are never pickled;
+- workers write their per-row outputs (entity bitmask, sentiment code,
+  text components) into shared output arrays, and return only small partial
+  aggregates (entity x sentiment counts, per-subreddit post sums, top-post
+  candidates);
+- the parent merges the partials and builds the same columns and analysis
+  dict as the serial path.
+
+Workers start from a forkserver (spawn where that is unavailable), not by
+forking the caller: by analysis time a run still has comment-pool and
+prefetch threads, and a child forked from a threaded process can deadlock
+on a lock one of them held. Workers re-import the entry script, so it needs
+the usual `if __name__ == "__main__"` guard. With one worker the chunks run
+in this process, with the same results.
+"""
+
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from documents import Document, keywords
+from lean_analysis import MAX_ENTITIES, SENTIMENTS, entity_hits, entity_strings
+from scoring import COMPONENT_COLS, COMPONENTS, combine, recency_scores, text_components, upvote_scores
+
+MIN_ROWS = 5000         # smaller frames are analysed serially
+CHUNKS_PER_WORKER = 4   # more chunks than workers evens out uneven text lengths
+TOP_POSTS = 10
+
+# What the workers read: settings plus views of the shared arrays (attached in each worker)
+_Job = namedtuple('_Job', 'entity_kw pos_kw neg_kw relevance score body arrays')
+_job = None
+_attached = []   # a worker's handles on the shared blocks, kept open while it runs
+
+_SENTIMENT_SCORES = np.array([1.0, 0.0, 0.5])  # SENTIMENTS order, as scoring._sentiment_score
+
+
+class _SharedArrays:
+    """Numpy arrays backed by shared memory blocks, released together."""
+
+    def __init__(self):
+        self.blocks = []
+        self.arrays = {}
+        self.specs = {}   # name -> (block name, shape, dtype), to attach from another process
+
+    def add(self, name: str, shape, dtype, values=None) -> np.ndarray:
+        size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+        block = shared_memory.SharedMemory(create=True, size=size)
+        self.blocks.append(block)
+        array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        if values is not None:
+            array[...] = values
+        self.arrays[name] = array
+        self.specs[name] = (block.name, shape, np.dtype(dtype).str)
+        return array
+
+    def add_text(self, name: str, values) -> None:
+        """A string column as one UTF-8 blob plus row offsets (NaN/None become '')."""
+        encoded = [v.encode('utf-8', 'surrogatepass') if isinstance(v, str) else b'' for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        self.add(f'{name}_offsets', offsets.shape, np.int64, offsets)
+        self.add(name, (int(offsets[-1]),), np.uint8, np.frombuffer(b''.join(encoded), dtype=np.uint8))
+
+    def close(self) -> None:
+        self.arrays.clear()
+        self.specs.clear()
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks.clear()
+
+
+def process_context():
+    """A start method that doesn't fork this (threaded) process: forkserver, else spawn."""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def _attach(job: _Job, specs: dict) -> None:
+    """Worker initializer: map the parent's shared blocks and set the job."""
+    global _job
+    arrays = {}
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _attached.append(block)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    _job = job._replace(arrays=arrays)
+
+
+def _text(arrays: dict, name: str, i: int) -> str:
+    offsets = arrays[f'{name}_offsets']
+    return arrays[name][offsets[i]:offsets[i + 1]].tobytes().decode('utf-8', 'surrogatepass')
+
+
+def _work(start: int, stop: int) -> dict:
+    """Analyse rows [start, stop): write per-row outputs to shared arrays, return partial aggregates."""
+    from reddit_research import document_sentiment
+
+    job, a = _job, _job.arrays
+    posts = []
+    for i in range(start, stop):
+        doc = Document(_text(a, 'title', i), _text(a, 'text', i))
+        found = doc.hits(job.entity_kw)
+        bits = 0
+        for bit, kw in enumerate(job.entity_kw):
+            if kw in found:
+                bits |= 1 << bit
+        a['entity_mask'][i] = bits
+        a['sentiment'][i] = SENTIMENTS.index(document_sentiment(doc, job.pos_kw, job.neg_kw))
+        if job.score and a['is_post'][i]:
+            posts.append((i, doc))
+
+    if posts:
+        rows = np.array([i for i, _ in posts])
+        docs = [doc for _, doc in posts]
+        text_docs = docs if job.body else [Document(_text(a, 'title', i), '') for i in rows]
+        a['text_components'][rows, :2] = text_components(text_docs)
+        a['text_components'][rows, 2] = job.relevance.scores(docs) if job.relevance is not None else 0.0
+
+    # Partial aggregates over the chunk
+    mask, codes = a['entity_mask'][start:stop], a['sentiment'][start:stop].astype(np.int64)
+    entity_sentiment = np.array([np.bincount(codes[entity_hits(mask, bit)], minlength=3)[:3]
+                                 for bit in range(len(job.entity_kw))]).reshape(len(job.entity_kw), 3)
+    is_post = a['is_post'][start:stop]
+    subs = a['subreddit'][start:stop][is_post]
+    n_subs = a['subreddit_count'][0]
+    keep = subs >= 0
+    scores = a['score'][start:stop][is_post]
+    by_score = np.argsort(-scores, kind='stable')[:TOP_POSTS]
+    return {
+        'entity_sentiment': entity_sentiment,
+        'sentiment': np.bincount(codes, minlength=3)[:3],
+        'posts': np.bincount(subs[keep], minlength=n_subs),
+        'score_sum': np.bincount(subs[keep], weights=scores[keep], minlength=n_subs),
+        'comments_sum': np.bincount(subs[keep], weights=a['num_comments'][start:stop][is_post][keep], minlength=n_subs),
+        'top': (scores[by_score], (np.flatnonzero(is_post) + start)[by_score]),
+    }
+
+
+def _run(n: int, workers: int, specs: dict) -> list:
+    chunk = max(-(-n // (workers * CHUNKS_PER_WORKER)), 1)
+    ranges = [(s, min(s + chunk, n)) for s in range(0, n, chunk)]
+    if workers > 1:
+        with ProcessPoolExecutor(workers, mp_context=process_context(), initializer=_attach,
+                                 initargs=(_job._replace(arrays=None), specs)) as pool:
+            return list(pool.map(_work, *zip(*ranges)))
+    return [_work(s, e) for s, e in ranges]
+
+
+def analyze(df: pd.DataFrame, config: dict, workers: int = None, stream: str = None, weights: dict = None,
+            relevance=None) -> tuple:
+    """`analyze_data` on `workers` processes (default: all cores), plus `score_items` when `stream` is given.
+
+    Returns (df, analysis) with the same columns and analysis dict as the
+    serial path.
+    """
+    global _job
+    workers = workers or os.cpu_count() or 1
+    entities = config.get('entities_to_track', [])
+    if len(entities) > MAX_ENTITIES:
+        raise ValueError(f"The parallel engine tracks at most {MAX_ENTITIES} entities ({len(entities)} given)")
+    n = len(df)
+    is_post = (df['type'] == 'post').to_numpy()
+    sub_codes, sub_names = pd.factorize(df['subreddit'], sort=True)
+
+    shared = _SharedArrays()
+    try:
+        shared.add_text('title', df['title'] if 'title' in df.columns else [''] * n)
+        text_col = 'text' if 'text' in df.columns else 'body'
+        shared.add_text('text', df[text_col] if text_col in df.columns else [''] * n)
+        shared.add('is_post', (n,), bool, is_post)
+        shared.add('subreddit', (n,), np.int32, np.where(is_post, sub_codes, -1))
+        shared.add('subreddit_count', (1,), np.int64, len(sub_names))
+        shared.add('score', (n,), np.float64, pd.to_numeric(df['score']).to_numpy(dtype=float))
+        shared.add('num_comments', (n,), np.float64, pd.to_numeric(df['num_comments']).to_numpy(dtype=float))
+        mask = shared.add('entity_mask', (n,), np.uint64)
+        codes = shared.add('sentiment', (n,), np.int8)
+        text = shared.add('text_components', (n, 3), np.float64)  # code quality, security, relevance
+        _job = _Job(keywords(entities), keywords(config.get('keywords_positive', [])),
+                    keywords(config.get('keywords_negative', [])), relevance, stream is not None,
+                    config.get('score_post_body', False), shared.arrays)
+        partials = _run(n, workers, shared.specs)
+        mask, codes, text = mask.copy(), codes.copy(), text.copy()
+    finally:
+        _job = None
+        shared.close()
+
+    # Per-row columns, as _annotate adds them
+    df['entities_mentioned'] = entity_strings(mask, entities)
+    df['sentiment'] = np.array(SENTIMENTS, dtype=object)[codes]
+    created = pd.to_datetime(df['created_utc'], unit='s')
+    df['created_date'] = created.dt.strftime('%Y-%m-%d')
+    df['created_time'] = created.dt.strftime('%H:%M:%S')
+
+    if stream is not None:
+        _add_scores(df, is_post, codes, text, weights)
+    return df, _merge(df, partials, entities, is_post, sub_names)
+
+
+def _add_scores(df, is_post, codes, text, weights) -> None:
+    """Component columns and priority_score, as score_items computes them."""
+    max_upvotes = max(df['score'].max() if len(df) else 1, 1)
+    components = np.zeros((len(df), len(COMPONENTS)))
+    components[:, 0] = upvote_scores(df['score'], max_upvotes)
+    components[:, 1] = _SENTIMENT_SCORES[codes]
+    components[:, 2:4] = text[:, :2]
+    components[:, 4] = recency_scores(df['created_utc'] if 'created_utc' in df.columns else np.full(len(df), np.nan))
+    components[:, 5] = text[:, 2]
+    components[~is_post] = 0.0
+    for col, values in zip(COMPONENT_COLS, components.T):
+        df[col] = values
+    df['priority_score'] = np.round(combine(components, weights), 1)
+
+
+def _merge(df, partials, entities, is_post, sub_names) -> dict:
+    """The analysis dict from the workers' partial aggregates."""
+    entity_sentiment_counts = sum(p['entity_sentiment'] for p in partials)
+    entity_counts, entity_sentiment = {}, {}
+    for entity, (pos, neg, neu) in zip(entities, entity_sentiment_counts):
+        count = int(pos + neg + neu)
+        if count > 0:
+            entity_counts[entity] = count
+            entity_sentiment[entity] = {'Positive': int(pos), 'Negative': int(neg), 'Neutral': int(neu),
+                                        'total': count}
+    pos, neg, neu = sum(p['sentiment'] for p in partials)
+
+    posts = sum(p['posts'] for p in partials)
+    present = posts > 0
+    subreddit_stats = pd.DataFrame({
+        'posts': posts[present],
+        'avg_score': sum(p['score_sum'] for p in partials)[present] / posts[present],
+        'avg_comments': sum(p['comments_sum'] for p in partials)[present] / posts[present],
+    }, index=pd.Index(np.asarray(sub_names)[present], name='subreddit')).round(2)
+    subreddit_stats = subreddit_stats.sort_values('posts', ascending=False)
+
+    top_scores = np.concatenate([p['top'][0] for p in partials])
+    top_rows = np.concatenate([p['top'][1] for p in partials])
+    top = top_rows[np.lexsort((top_rows, -top_scores))][:TOP_POSTS]
+    top_posts = df.iloc[top][['title', 'subreddit', 'score', 'num_comments', 'url', 'sentiment']].to_dict('records')
+
+    dates = pd.to_datetime(df['created_utc'], unit='s')
+    return {
+        'entities': entity_counts,
+        'entity_sentiment': entity_sentiment,
+        'sentiment': {'Positive': int(pos), 'Negative': int(neg), 'Neutral': int(neu)},
+        'subreddits': subreddit_stats.to_dict('index'),
+        'top_posts': top_posts,
+        'engagement': {
+            'total_posts': int(is_post.sum()),
+            'total_comments': int((df['type'] == 'comment').sum()),
+            'avg_score': round(df['score'].mean(), 2),
+            'total_score': int(df['score'].sum()),
+        },
+        'date_range': {
+            'earliest': dates.min().strftime('%Y-%m-%d'),
+            'latest': dates.max().strftime('%Y-%m-%d'),
+        },
+    }
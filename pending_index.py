@@ -0,0 +1,111 @@
+"""Index of the items still pending in REVIEW.md.
+
+Digest stats used to come from scans: a regex over the whole of REVIEW.md
+for the pending count, and a pass over every seen.json entry (pending or not)
+for the oldest item. This index holds one row per pending REVIEW.md entry,
+ordered by when it was added, and is kept in step by `update_review_md` as
+items are added and ticked off. A trigger-maintained counter gives the count
+in O(1) and the `first_seen` index gives the oldest entry in O(log n).
+"""
+
+import re
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+PENDING_INDEX_PATH = Path("output/openclaw_intel/pending.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending (
+    link       TEXT NOT NULL,           -- REVIEW.md link of the entry
+    first_seen REAL NOT NULL            -- epoch seconds the entry was added
+);
+CREATE INDEX IF NOT EXISTS pending_first_seen ON pending (first_seen);
+CREATE INDEX IF NOT EXISTS pending_link ON pending (link);
+CREATE TABLE IF NOT EXISTS counts (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO counts VALUES ('pending', 0);
+CREATE TRIGGER IF NOT EXISTS pending_added AFTER INSERT ON pending
+BEGIN UPDATE counts SET value = value + 1 WHERE name = 'pending'; END;
+CREATE TRIGGER IF NOT EXISTS pending_removed AFTER DELETE ON pending
+BEGIN UPDATE counts SET value = value - 1 WHERE name = 'pending'; END;
+"""
+
+_POST_ID_RE = re.compile(r"/comments/([a-z0-9]+)")
+
+
+def connect(path: Path = None) -> sqlite3.Connection:
+    """Open (and create if needed) the pending index."""
+    path = path or PENDING_INDEX_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def update(added: list, removed: list, conn: sqlite3.Connection) -> None:
+    """Add entries ((link, first_seen) pairs) and remove reviewed ones (links), in one transaction."""
+    with conn:
+        for link in removed:
+            # One row per entry: a re-listed (trending) item may be pending twice
+            conn.execute(
+                "DELETE FROM pending WHERE rowid = (SELECT rowid FROM pending WHERE link = ? ORDER BY first_seen LIMIT 1)",
+                (link,),
+            )
+        conn.executemany("INSERT INTO pending (link, first_seen) VALUES (?, ?)", added)
+
+
+def count(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT value FROM counts WHERE name = 'pending'").fetchone()[0]
+
+
+def oldest(conn: sqlite3.Connection):
+    """Epoch seconds the oldest pending entry was added, or None."""
+    return conn.execute("SELECT MIN(first_seen) FROM pending").fetchone()[0]
+
+
+def rebuild(links: list, seen: dict, conn: sqlite3.Connection) -> None:
+    """Replace the index with these pending links (REVIEW.md order).
+
+    Used when the index is new or REVIEW.md was edited by hand. Entries keep
+    their indexed age where known, else the post's seen.json first_seen.
+    """
+    known = {}
+    for link, first_seen in conn.execute("SELECT link, first_seen FROM pending ORDER BY first_seen"):
+        known.setdefault(link, []).append(first_seen)
+
+    now = time.time()
+    rows = []
+    for link in links:
+        if known.get(link):
+            first_seen = known[link].pop(0)
+        else:
+            match = _POST_ID_RE.search(link)
+            first_seen = _parse_time((seen.get(match.group(1)) or {}).get("first_seen")) if match else None
+        rows.append((link, first_seen or now))
+
+    with conn:
+        conn.execute("DELETE FROM pending")
+        conn.executemany("INSERT INTO pending (link, first_seen) VALUES (?, ?)", rows)
+
+
+def _parse_time(value):
+    # seen.json stores naive UTC ISO timestamps
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+    except (ValueError, TypeError):
+        return None
+
+
+def stats(conn: sqlite3.Connection = None) -> tuple:
+    """(pending count, days since the oldest pending entry was added) for the digest."""
+    own = conn is None
+    conn = conn or connect()
+    n, first = count(conn), oldest(conn)
+    if own:
+        conn.close()
+    days = max(int((time.time() - first) // 86400), 0) if first is not None else 0
+    return n, days
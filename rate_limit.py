@@ -0,0 +1,50 @@
+"""Shared Reddit API request budget.
+
+Reddit allows roughly 100 requests per minute per OAuth client. When several
+threads (or configs) share one client, they draw from a single RateBudget so
+the combined request rate stays under that limit.
+"""
+
+import math
+import threading
+import time
+
+import run_metrics
+
+DEFAULT_PER_MINUTE = 90
+LISTING_PAGE_SIZE = 100  # Reddit returns at most 100 items per listing request
+
+
+class RateBudget:
+    """Thread-safe token bucket: `per_minute` requests, bursts up to `burst`."""
+
+    def __init__(self, per_minute: float = DEFAULT_PER_MINUTE, burst: int = 10):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, n: int = 1) -> None:
+        """Block until `n` requests are available, then spend them.
+
+        Requests larger than the burst size go into debt, delaying later callers.
+        """
+        need = min(n, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= need:
+                    self.tokens -= n
+                    run_metrics.incr("api_requests", n)
+                    return
+                wait = (need - self.tokens) / self.rate
+            run_metrics.incr("rate_wait_seconds", wait)
+            time.sleep(wait)
+
+
+def listing_requests(limit: int) -> int:
+    """Number of API requests a search listing of `limit` items costs."""
+    return max(math.ceil(limit / LISTING_PAGE_SIZE), 1)
@@ -0,0 +1,166 @@
+"""Compact column buffers for collected posts and comments.
+
+A dict per record carries a hash table and a dozen key references on top of
+its values, and every comment also repeats its post's title and a URL built
+from the post's. RecordBuffer stores records column-wise instead: numbers in
+typed `array` buffers, repeated strings (subreddit, search term, type, author)
+interned, and comments keep only `parent_id`. Parent titles and comment URLs
+are derived from the parent post when records are read back.
+
+`to_frame` hands the numeric buffers to pandas without copying them. The
+buffer is read-only after that (the arrays are pinned by the DataFrame).
+"""
+
+import sys
+from array import array
+
+import numpy as np
+import pandas as pd
+
+# Column order matches the record dicts built in reddit_research
+STR_FIELDS = ('id', 'type', 'subreddit', 'title', 'text', 'author', 'url', 'search_term', 'parent_id')
+NUM_FIELDS = {'score': 'q', 'upvote_ratio': 'd', 'num_comments': 'q', 'created_utc': 'd'}
+FIELD_ORDER = ('id', 'type', 'subreddit', 'title', 'text', 'author', 'score', 'upvote_ratio',
+               'num_comments', 'created_utc', 'url', 'search_term', 'parent_id', 'parent_title')
+_INTERNED = ('type', 'subreddit', 'author', 'search_term')
+
+
+class RecordBuffer:
+    """Append-only, deduplicating store of result records."""
+
+    __slots__ = ('_str', '_num', '_extra', '_keys', '_post_titles', '_post_urls')
+
+    def __init__(self, records=None):
+        self._str = {f: [] for f in STR_FIELDS}
+        self._num = {f: array(code) for f, code in NUM_FIELDS.items()}
+        self._extra = {}          # field -> {row: value}, for rare fields (e.g. canonical_id)
+        self._keys = set()        # '<id>_<type>' of every stored record
+        self._post_titles = {}    # post id -> title, for comments' parent_title
+        self._post_urls = {}      # post id -> url, for comments' url
+        if records is not None:
+            self.add_unique(records)
+
+    def __len__(self) -> int:
+        return len(self._str['id'])
+
+    def __iter__(self):
+        return (self.record(i) for i in range(len(self)))
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def append(self, r: dict) -> None:
+        """Store one record dict (no duplicate check)."""
+        row = len(self)
+        is_comment = r.get('type') == 'comment'
+        parent = r.get('parent_id')
+        for f in STR_FIELDS:
+            value = r.get(f)
+            if f == 'url' and is_comment and parent in self._post_urls and value == f"{self._post_urls[parent]}{r.get('id')}":
+                value = None      # derived from the parent post on read
+            elif f in _INTERNED and value is not None:
+                value = sys.intern(str(value))
+            self._str[f].append(value)
+        for f, buf in self._num.items():
+            value = r.get(f) or 0
+            buf.append(int(value) if buf.typecode == 'q' else float(value))
+        for f, value in r.items():
+            if f not in NUM_FIELDS and f not in STR_FIELDS and f != 'parent_title':
+                self._extra.setdefault(f, {})[row] = value
+        if is_comment and parent is not None and parent not in self._post_titles and r.get('parent_title'):
+            # Parent post not collected (rare): keep its title once
+            self._post_titles[parent] = r['parent_title']
+        if not is_comment:
+            self._post_titles[r['id']] = r.get('title', '')
+            self._post_urls[r['id']] = r.get('url', '')
+        self._keys.add(f"{r['id']}_{r.get('type', 'post')}")
+
+    def add_unique(self, records) -> int:
+        """Append records not stored yet (keyed by id and type). Returns count added."""
+        added = 0
+        for r in records:
+            if f"{r['id']}_{r['type']}" not in self._keys:
+                self.append(r)
+                added += 1
+        return added
+
+    def record(self, row: int) -> dict:
+        """Rebuild one record as a dict, in the same shape it was appended."""
+        r = {}
+        for f in FIELD_ORDER:
+            if f in NUM_FIELDS:
+                r[f] = self._num[f][row]
+            elif f == 'parent_title':
+                if r['type'] == 'comment':
+                    r[f] = self._post_titles.get(r['parent_id'], '')
+            elif f == 'parent_id':
+                if r['type'] == 'comment':
+                    r[f] = self._str[f][row]
+            else:
+                r[f] = self._str[f][row]
+        if r['type'] == 'comment' and r['url'] is None:
+            r['url'] = f"{self._post_urls[r['parent_id']]}{r['id']}"
+        for f, values in self._extra.items():
+            if row in values:
+                r[f] = values[row]
+        return r
+
+    def posts(self) -> list:
+        """Post records as dicts."""
+        return [self.record(i) for i, t in enumerate(self._str['type']) if t != 'comment']
+
+    def replace_posts(self, posts: list, reparent: dict) -> 'RecordBuffer':
+        """A new buffer with these post versions and every comment, in the original order.
+
+        Posts not in `posts` are dropped; comments whose parent is a key of
+        `reparent` move to the mapped post (used after collapsing duplicates).
+        """
+        by_id = {p['id']: p for p in posts}
+        out = RecordBuffer()
+        for i in range(len(self)):
+            if self._str['type'][i] != 'comment':
+                if self._str['id'][i] in by_id:
+                    out.append(by_id[self._str['id'][i]])
+                continue
+            r = self.record(i)
+            if r.get('parent_id') in reparent:
+                r['parent_id'] = reparent[r['parent_id']]
+            out.append(r)
+        # Comment URLs/titles of dropped posts still derive from them
+        for post_id, url in self._post_urls.items():
+            out._post_urls.setdefault(post_id, url)
+            out._post_titles.setdefault(post_id, self._post_titles[post_id])
+        return out
+
+    def to_frame(self) -> pd.DataFrame:
+        """The records as a DataFrame; numeric columns share the buffers' memory."""
+        n = len(self)
+        types = self._str['type']
+        is_comment = [t == 'comment' for t in types]
+        columns = {}
+        for f in FIELD_ORDER:
+            if f in NUM_FIELDS:
+                columns[f] = np.frombuffer(self._num[f], dtype=np.int64 if NUM_FIELDS[f] == 'q' else np.float64)
+            elif f == 'url':
+                urls = self._str['url']
+                columns[f] = [u if u is not None else f"{self._post_urls[p]}{i}"
+                              for u, p, i in zip(urls, self._str['parent_id'], self._str['id'])]
+            elif f == 'parent_title':
+                if any(is_comment):
+                    titles = self._post_titles
+                    columns[f] = [titles.get(p, '') if c else None for c, p in zip(is_comment, self._str['parent_id'])]
+            elif f == 'parent_id':
+                if any(is_comment):
+                    columns[f] = self._str[f]
+            else:
+                columns[f] = self._str[f]
+        for f, values in self._extra.items():
+            columns[f] = [values.get(i) for i in range(n)]
+        return pd.DataFrame(columns, copy=False)
+
+
+def to_frame(records) -> pd.DataFrame:
+    """DataFrame from a RecordBuffer or a list of record dicts."""
+    if isinstance(records, RecordBuffer):
+        return records.to_frame()
+    return pd.DataFrame(records)
@@ -9,11 +9,14 @@ import json
 import sys
 import re
 import time
+import queue
+import threading
 from datetime import datetime
 from pathlib import Path
 
 try:
     import praw
+    import numpy as np
     import pandas as pd
     from dotenv import load_dotenv
 except ImportError as e:
@@ -24,6 +27,25 @@ except ImportError as e:
 
 load_dotenv()
 
+import columnar
+import comment_fetch
+import corpus_store
+import parallel_engine
+import reddit_session
+import relevance
+import run_metrics
+import search_index
+import seen_filter
+from aggregates import fold_rows, history_summary, summarize, update_aggregates
+from documents import documents, keywords, prepare
+from export_stage import AnalysisResult, run_exports
+from excel_stream import CHUNK_ROWS, frame_rows, write_workbook
+from lean_analysis import analyze_lean, display_chunks, display_columns
+from near_dup import collapse_posts
+from records import RecordBuffer, to_frame
+from scoring import score_items, weight_profile
+from timeseries import entity_trends, record_mentions, sparkline
+
 REDDIT_CONFIG = {
     'client_id': os.getenv('REDDIT_CLIENT_ID'),
     'client_secret': os.getenv('REDDIT_CLIENT_SECRET'),
@@ -45,7 +67,23 @@ DEFAULT_CONFIG = {
                           'disappointed', 'useless', 'problem', 'issue', 'toxic'],
     'limits': {'posts': 50, 'comments': 3},
     'include_all_reddit': True,
-    'all_reddit_limit': 10
+    'all_reddit_limit': 10,
+    'scoring_stream': 'usecases',
+    'scoring_weights': {},
+    'score_post_body': False,
+    'two_phase': False,
+    'comment_min_priority': 40,
+    'comment_top_k': 0,
+    'comment_workers': 4,
+    'comment_sort': comment_fetch.DEFAULT_SORT,
+    'comment_depth': comment_fetch.DEFAULT_DEPTH,
+    'collapse_duplicates': True,
+    'columnar_format': 'arrow',
+    'export_formats': ['xlsx', 'md', 'json', 'columnar'],
+    'search_index': True,
+    'lean_analysis': False,
+    'analysis_workers': 0,
+    'memory_budget_mb': 0
 }
 
 
@@ -81,7 +119,7 @@ def load_config(config_path=None):
 # ============================================
 
 def init_reddit():
-    """Initialize Reddit API connection."""
+    """Return the Reddit API connection, shared by every caller in the process."""
     if not REDDIT_CONFIG['client_id']:
         print("\nERROR: Reddit credentials not found")
         print("Create a .env file with:")
@@ -91,16 +129,19 @@ def init_reddit():
         print("\nGet credentials at: https://www.reddit.com/prefs/apps")
         sys.exit(1)
 
-    print("Connecting to Reddit API...")
-    reddit = praw.Reddit(
-        client_id=REDDIT_CONFIG['client_id'],
-        client_secret=REDDIT_CONFIG['client_secret'],
-        user_agent=REDDIT_CONFIG['user_agent']
-    )
-    print(f"✓ Connected (read-only: {reddit.read_only})")
+    reddit = reddit_session.shared_client()
+    if reddit is None:
+        print("Connecting to Reddit API...")
+        reddit = reddit_session.get_reddit(**REDDIT_CONFIG)
+        print(f"✓ Connected (read-only: {reddit.read_only})")
     return reddit
 
 
+def topic_slug(topic):
+    """Filesystem-safe short name for a topic."""
+    return re.sub(r'[^\w\s-]', '', topic)[:30].strip().replace(' ', '_')
+
+
 def safe_get(obj, attr, default=''):
     """Safely get attribute with fallback."""
     try:
@@ -114,72 +155,101 @@ def safe_get(obj, attr, default=''):
 # SCRAPING
 # ============================================
 
-def scrape_subreddit(reddit, subreddit_name, search_term, post_limit, comment_limit):
-    """Scrape posts and comments from a subreddit search."""
-    results = []
+def post_record(submission, subreddit_name, search_term):
+    """Build a post result record from a PRAW submission."""
+    author = '[deleted]'
+    try:
+        if submission.author:
+            author = str(submission.author.name)
+    except:
+        pass
+
+    return {
+        'id': safe_get(submission, 'id'),
+        'type': 'post',
+        'subreddit': safe_get(submission.subreddit, 'display_name', subreddit_name),
+        'title': safe_get(submission, 'title'),
+        'text': safe_get(submission, 'selftext'),
+        'author': author,
+        'score': safe_get(submission, 'score', 0),
+        'upvote_ratio': safe_get(submission, 'upvote_ratio', 0),
+        'num_comments': safe_get(submission, 'num_comments', 0),
+        'created_utc': submission.created_utc if hasattr(submission, 'created_utc') else 0,
+        'url': f"https://reddit.com{submission.permalink}" if hasattr(submission, 'permalink') else '',
+        'search_term': search_term
+    }
+
+
+PREFETCH_DEPTH = 25       # listing items buffered ahead of processing
+
+
+def prefetch(iterable, depth=PREFETCH_DEPTH):
+    """Iterate `iterable` on a background thread, buffering up to `depth` items ahead.
+
+    Lets PRAW fetch the next listing page while the current items are being
+    processed. Exceptions from the producer are re-raised in the consumer.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(entry) -> bool:
+        """Queue an entry unless the consumer has stopped; False once it has."""
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception as e:
+            put((done, e))
+            return
+        put((done, None))
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def scrape_subreddit(reddit, subreddit_name, search_term, post_limit, comment_limit,
+                     sort=comment_fetch.DEFAULT_SORT, depth=comment_fetch.DEFAULT_DEPTH):
+    """Scrape posts and comments from a subreddit search.
+
+    The listing is prefetched on a background thread and each post's comments
+    are fetched on the shared comment pool as soon as the post arrives, so
+    network waits overlap with processing.
+    """
+    fetched = []
 
     try:
         subreddit = reddit.subreddit(subreddit_name)
-        search_results = subreddit.search(search_term, limit=post_limit, sort='relevance')
+        search_results = prefetch(subreddit.search(search_term, limit=post_limit, sort='relevance'))
 
         for submission in search_results:
             try:
-                # Post data
-                author = '[deleted]'
-                try:
-                    if submission.author:
-                        author = str(submission.author.name)
-                except:
-                    pass
-
-                post = {
-                    'id': safe_get(submission, 'id'),
-                    'type': 'post',
-                    'subreddit': safe_get(submission.subreddit, 'display_name', subreddit_name),
-                    'title': safe_get(submission, 'title'),
-                    'text': safe_get(submission, 'selftext'),
-                    'author': author,
-                    'score': safe_get(submission, 'score', 0),
-                    'upvote_ratio': safe_get(submission, 'upvote_ratio', 0),
-                    'num_comments': safe_get(submission, 'num_comments', 0),
-                    'created_utc': submission.created_utc if hasattr(submission, 'created_utc') else 0,
-                    'url': f"https://reddit.com{submission.permalink}" if hasattr(submission, 'permalink') else '',
-                    'search_term': search_term
-                }
-                results.append(post)
+                post = post_record(submission, subreddit_name, search_term)
 
                 # Comments
-                try:
-                    submission.comments.replace_more(limit=0)
-                    for comment in submission.comments[:comment_limit]:
-                        if not hasattr(comment, 'body'):
-                            continue
-
-                        comment_author = '[deleted]'
-                        try:
-                            if comment.author:
-                                comment_author = str(comment.author.name)
-                        except:
-                            pass
-
-                        results.append({
-                            'id': safe_get(comment, 'id'),
-                            'type': 'comment',
-                            'subreddit': post['subreddit'],
-                            'title': '',
-                            'text': safe_get(comment, 'body'),
-                            'author': comment_author,
-                            'score': safe_get(comment, 'score', 0),
-                            'upvote_ratio': 0,
-                            'num_comments': 0,
-                            'created_utc': comment.created_utc if hasattr(comment, 'created_utc') else 0,
-                            'url': f"{post['url']}{comment.id}" if post['url'] else '',
-                            'search_term': search_term,
-                            'parent_id': post['id'],
-                            'parent_title': post['title']
-                        })
-                except:
-                    pass
+                comments = None
+                if comment_limit > 0:
+                    run_metrics.incr('comment_fetches')
+                    comments = comment_fetch.pool().submit(_comment_records, reddit, post, comment_limit, sort, depth)
+                fetched.append((post, comments))
 
             except:
                 continue
@@ -187,65 +257,190 @@ def scrape_subreddit(reddit, subreddit_name, search_term, post_limit, comment_li
     except Exception as e:
         print(f"    Error: {e}")
 
+    results = []
+    for post, comments in fetched:
+        results.append(post)
+        if comments is not None:
+            results.extend(comments.result())
+    return results
+
+
+def _comment_records(reddit, post, comment_limit, sort=comment_fetch.DEFAULT_SORT, depth=comment_fetch.DEFAULT_DEPTH):
+    """Fetch a post's first `comment_limit` comments (server-side limited) as result records."""
+    records = []
+    try:
+        comments = comment_fetch.fetch(reddit, post['id'], comment_limit, sort, depth, post.get('num_comments', 0))
+        for comment in comments:
+            comment_author = '[deleted]'
+            try:
+                if comment.author:
+                    comment_author = str(comment.author.name)
+            except:
+                pass
+
+            records.append({
+                'id': safe_get(comment, 'id'),
+                'type': 'comment',
+                'subreddit': post['subreddit'],
+                'title': '',
+                'text': safe_get(comment, 'body'),
+                'author': comment_author,
+                'score': safe_get(comment, 'score', 0),
+                'upvote_ratio': 0,
+                'num_comments': 0,
+                'created_utc': comment.created_utc if hasattr(comment, 'created_utc') else 0,
+                'url': f"{post['url']}{comment.id}" if post['url'] else '',
+                'search_term': post['search_term'],
+                'parent_id': post['id'],
+                'parent_title': post['title']
+            })
+    except:
+        pass
+
+    return records
+
+
+def fetch_post_comments(reddit, post, comment_limit, budget=None,
+                        sort=comment_fetch.DEFAULT_SORT, depth=comment_fetch.DEFAULT_DEPTH):
+    """Fetch comments for one already-collected post record.
+
+    If a `rate_limit.RateBudget` is given, the fetch draws one request from it.
+    """
+    if budget is not None:
+        budget.acquire()
+    run_metrics.incr('comment_fetches')
+    return _comment_records(reddit, post, comment_limit, sort, depth)
+
+
+def fetch_comments(reddit, posts, comment_limit, workers=None, budget=None,
+                   sort=comment_fetch.DEFAULT_SORT, depth=comment_fetch.DEFAULT_DEPTH):
+    """Fetch comments for already-collected posts on the shared comment pool. Returns comment records."""
+    results = []
+    pool = comment_fetch.pool(workers)
+    for records in pool.map(lambda post: fetch_post_comments(reddit, post, comment_limit, budget, sort, depth), posts):
+        results.extend(records)
     return results
 
 
-def collect_data(reddit, config):
-    """Collect all data based on configuration."""
-    all_results = []
-    seen_ids = set()
+def select_comment_targets(posts, config, scorer=None):
+    """Score post metadata and return the posts worth a comment fetch.
+
+    Posts at or above `comment_min_priority` are kept, highest first, capped at
+    `comment_top_k` when that is set. `scorer` is the run's relevance scorer
+    (built from the config when not given).
+    """
+    if not posts:
+        return []
+
+    df = pd.DataFrame(posts)
+    pos_kw = keywords(config.get('keywords_positive', []))
+    neg_kw = keywords(config.get('keywords_negative', []))
+    df['sentiment'] = [document_sentiment(doc, pos_kw, neg_kw) for doc in documents(df)]
+    stream = config.get('scoring_stream', 'usecases')
+    df = score_items(df, stream=stream, weights=weight_profile(stream, config),
+                     relevance=scorer or relevance_scorer(config), body=config.get('score_post_body', False))
+
+    selected = df[df['priority_score'] >= config.get('comment_min_priority', 40)]
+    selected = selected.sort_values('priority_score', ascending=False, kind='stable')
+    top_k = config.get('comment_top_k', 0)
+    if top_k > 0:
+        selected = selected.head(top_k)
 
-    subreddits = config['subreddits']
-    search_terms = config['search_terms']
+    return [posts[i] for i in selected.index]
+
+
+def fetch_plan(config):
+    """List the searches a config needs as (subreddit, term, post_limit) tuples.
+
+    Subreddit searches come first, in config order, followed by the r/all
+    searches for the priority terms.
+    """
     post_limit = config['limits']['posts']
+    plan = [(sub, term, post_limit) for sub in config['subreddits'] for term in config['search_terms']]
+    if config.get('include_all_reddit', True):
+        all_limit = config.get('all_reddit_limit', 10)
+        plan += [('all', term, all_limit) for term in config['search_terms'][:5]]
+    return plan
+
+
+def add_unique(all_results, seen_ids, records):
+    """Append records not already in seen_ids (keyed by id and type). Returns count added."""
+    new_count = 0
+    for r in records:
+        key = f"{r['id']}_{r['type']}"
+        if key not in seen_ids:
+            seen_ids.add(key)
+            all_results.append(r)
+            new_count += 1
+    return new_count
+
+
+def collect_data(reddit, config, scorer=None):
+    """Collect all data based on configuration. Returns a `records.RecordBuffer`.
+
+    `scorer` is the run's relevance scorer, for two-phase comment selection.
+    """
+    all_results = RecordBuffer()
+
     comment_limit = config['limits']['comments']
+    comment_options = comment_fetch.options(config)
+    comment_fetch.pool(config.get('comment_workers', 4))
 
-    total = len(subreddits) * len(search_terms)
-    current = 0
+    # Two-phase mode: collect post metadata first, fetch comments afterwards.
+    # Collapsing duplicates also defers comments, so dropped copies never get a fetch.
+    two_phase = config.get('two_phase', False) and comment_limit > 0
+    collapse = config.get('collapse_duplicates', True)
+    defer_comments = comment_limit > 0 and (two_phase or collapse)
+    scrape_comment_limit = 0 if defer_comments else comment_limit
 
-    print(f"\nSearching {total} subreddit/term combinations...")
+    plan = fetch_plan(config)
+    total = len(config['subreddits']) * len(config['search_terms'])
 
-    for subreddit in subreddits:
-        for term in search_terms:
-            current += 1
-            print(f"[{current}/{total}] r/{subreddit}: '{term[:40]}..'" if len(term) > 40 else f"[{current}/{total}] r/{subreddit}: '{term}'", end='')
+    print(f"\nSearching {total} subreddit/term combinations...")
 
-            results = scrape_subreddit(reddit, subreddit, term, post_limit, comment_limit)
+    for current, (subreddit, term, post_limit) in enumerate(plan[:total], 1):
+        print(f"[{current}/{total}] r/{subreddit}: '{term[:40]}..'" if len(term) > 40 else f"[{current}/{total}] r/{subreddit}: '{term}'", end='')
 
-            # Deduplicate
-            new_count = 0
-            for r in results:
-                key = f"{r['id']}_{r['type']}"
-                if key not in seen_ids:
-                    seen_ids.add(key)
-                    all_results.append(r)
-                    new_count += 1
+        results = scrape_subreddit(reddit, subreddit, term, post_limit, scrape_comment_limit, **comment_options)
+        new_count = all_results.add_unique(results)
 
-            posts = sum(1 for r in results if r['type'] == 'post' and f"{r['id']}_post" not in seen_ids or f"{r['id']}_post" in seen_ids)
-            print(f" → {new_count} new")
-            time.sleep(0.5)  # Rate limiting
+        print(f" → {new_count} new")
+        time.sleep(0.5)  # Rate limiting
 
     # Search all of Reddit for priority terms
-    if config.get('include_all_reddit', True):
+    if plan[total:]:
         print("\nSearching all of Reddit...")
-        priority_terms = search_terms[:5]
 
-        for term in priority_terms:
+        for subreddit, term, post_limit in plan[total:]:
             print(f"  all: '{term[:40]}..'" if len(term) > 40 else f"  all: '{term}'", end='')
 
-            results = scrape_subreddit(reddit, 'all', term, config.get('all_reddit_limit', 10), comment_limit)
-
-            new_count = 0
-            for r in results:
-                key = f"{r['id']}_{r['type']}"
-                if key not in seen_ids:
-                    seen_ids.add(key)
-                    all_results.append(r)
-                    new_count += 1
+            results = scrape_subreddit(reddit, subreddit, term, post_limit, scrape_comment_limit, **comment_options)
+            new_count = all_results.add_unique(results)
 
             print(f" → {new_count} new")
             time.sleep(0.5)
 
+    # Collapse cross-posts before any comments are fetched for them
+    if collapse:
+        kept, dropped = collapse_posts(all_results.posts(), topic_slug(config['topic']))
+        all_results = all_results.replace_posts(kept, dropped)
+        if dropped:
+            print(f"\nCollapsed {len(dropped)} near-duplicate posts (cross-posts / reposts)")
+
+    if two_phase:
+        posts = all_results.posts()
+        targets = select_comment_targets(posts, config, scorer)
+        skipped = len(posts) - len(targets)
+        run_metrics.incr('comment_fetches_skipped', skipped)
+        print(f"\nFetching comments for {len(targets)}/{len(posts)} posts ({skipped} below priority threshold)...")
+    elif defer_comments:
+        targets = all_results.posts()
+        print(f"\nFetching comments for {len(targets)} posts...")
+
+    if defer_comments:
+        all_results.add_unique(fetch_comments(reddit, targets, comment_limit, config.get('comment_workers', 4),
+                                              **comment_options))
+
     return all_results
 
 
@@ -255,15 +450,14 @@ def collect_data(reddit, config):
 
 def find_entities(text, entities):
     """Find which entities are mentioned in text."""
-    text_lower = text.lower()
-    return [e for e in entities if e.lower() in text_lower]
+    found = prepare(text, '').hits(keywords(entities))
+    return [e for e in entities if e.lower() in found]
 
 
-def classify_sentiment(text, positive_kw, negative_kw):
-    """Classify sentiment based on keyword matches."""
-    text_lower = text.lower()
-    pos = sum(1 for kw in positive_kw if kw.lower() in text_lower)
-    neg = sum(1 for kw in negative_kw if kw.lower() in text_lower)
+def document_sentiment(doc, positive_kw, negative_kw):
+    """Classify a prepared document; keyword lists as from `documents.keywords`."""
+    pos = doc.count(positive_kw)
+    neg = doc.count(negative_kw)
 
     if pos > neg:
         return 'Positive'
@@ -272,18 +466,48 @@ def classify_sentiment(text, positive_kw, negative_kw):
     return 'Neutral'
 
 
-def analyze_data(df, config):
-    """Perform comprehensive analysis."""
-    entities = config.get('entities_to_track', [])
-    pos_kw = config.get('keywords_positive', [])
-    neg_kw = config.get('keywords_negative', [])
+def classify_sentiment(text, positive_kw, negative_kw):
+    """Classify sentiment based on keyword matches."""
+    return document_sentiment(prepare(text, ''), keywords(positive_kw), keywords(negative_kw))
+
 
-    # Add analysis columns
-    df['full_text'] = df['title'].fillna('') + ' ' + df['text'].fillna('')
-    df['entities_mentioned'] = df['full_text'].apply(lambda x: ', '.join(find_entities(x, entities)))
-    df['sentiment'] = df['full_text'].apply(lambda x: classify_sentiment(x, pos_kw, neg_kw))
+def _annotate(df, config):
+    # annotate(), also returning the rows' prepared documents for reuse
+    entities = config.get('entities_to_track', [])
+    entity_kw = keywords(entities)
+    pos_kw = keywords(config.get('keywords_positive', []))
+    neg_kw = keywords(config.get('keywords_negative', []))
+
+    docs = documents(df)
+    df['entities_mentioned'] = [', '.join(e for e, kw in zip(entities, entity_kw) if kw in doc.hits(entity_kw))
+                                for doc in docs]
+    df['sentiment'] = [document_sentiment(doc, pos_kw, neg_kw) for doc in docs]
     df['created_date'] = pd.to_datetime(df['created_utc'], unit='s').dt.strftime('%Y-%m-%d')
     df['created_time'] = pd.to_datetime(df['created_utc'], unit='s').dt.strftime('%H:%M:%S')
+    return df, docs
+
+
+def annotate(df, config):
+    """Add the per-item analysis columns (entities, sentiment, dates) to df."""
+    return _annotate(df, config)[0]
+
+
+def analyze_data(df, config, lean=False):
+    """Perform comprehensive analysis.
+
+    With `lean`, uses `lean_analysis.analyze_lean`: the same analysis dict
+    with compact columns (entity bitmask, categoricals) instead of the
+    display strings. With `analysis_workers` > 1, large frames are analysed
+    by `parallel_engine` on that many processes, with the same results.
+    """
+    if lean:
+        return analyze_lean(df, config)
+    workers = config.get('analysis_workers', 0)
+    if workers > 1 and len(df) >= parallel_engine.MIN_ROWS:
+        return parallel_engine.analyze(df, config, workers)
+    entities = config.get('entities_to_track', [])
+    entity_kw = keywords(entities)
+    df, docs = _annotate(df, config)
 
     analysis = {}
 
@@ -291,8 +515,8 @@ def analyze_data(df, config):
     entity_counts = {}
     entity_sentiment = {}
 
-    for entity in entities:
-        mask = df['full_text'].str.lower().str.contains(entity.lower(), regex=False)
+    for entity, kw in zip(entities, entity_kw):
+        mask = np.fromiter((kw in doc.hits(entity_kw) for doc in docs), dtype=bool, count=len(docs))
         count = mask.sum()
         if count > 0:
             entity_counts[entity] = int(count)
@@ -352,77 +576,139 @@ def analyze_data(df, config):
 # EXPORT
 # ============================================
 
-def export_excel(df, config, analysis, output_path):
-    """Export results to Excel with multiple sheets."""
+def _summary_values(config, summary):
+    """Summary-sheet values for an aggregates summary, aligned with the Metric rows."""
+    dr = summary['date_range']
+    return [
+        config['topic'],
+        summary['engagement']['total_posts'],
+        summary['engagement']['total_comments'],
+        len(summary['subreddits']),
+        f"{dr['earliest']} to {dr['latest']}" if dr['earliest'] else '',
+        summary['engagement']['avg_score'],
+        summary['engagement']['total_score'],
+        summary['sentiment']['Positive'],
+        summary['sentiment']['Negative'],
+        summary['sentiment']['Neutral'],
+        len(config.get('entities_to_track', [])),
+        summary['engagement']['with_entities']
+    ]
+
+
+STREAMING_EXPORT_ROWS = 20000  # larger results are written with constant-memory worksheets
+
+POST_COLS = ['id', 'subreddit', 'title', 'text', 'author', 'score', 'upvote_ratio',
+             'num_comments', 'created_date', 'url', 'entities_mentioned', 'sentiment']
+COMMENT_COLS = ['id', 'subreddit', 'parent_title', 'text', 'author', 'score',
+                'created_date', 'url', 'entities_mentioned', 'sentiment']
+TOP_POST_COLS = ['title', 'subreddit', 'score', 'num_comments', 'url', 'sentiment']
+SUBREDDIT_COLS = ['Subreddit', 'posts', 'avg_score', 'avg_comments']
+ENTITY_COLS = ['Entity', 'Mentions', 'Positive', 'Negative', 'Neutral', 'Positive %']
+TREND_COLS = ['Entity', 'Week', 'Mentions', 'Negative', 'Negative %']
+
+
+def _summary_table(config, analysis, with_entities, history=None):
+    """Summary sheet columns ({header: values})."""
+    summary = {
+        'Metric': [
+            'Topic',
+            'Total Posts',
+            'Total Comments',
+            'Unique Subreddits',
+            'Date Range',
+            'Average Score',
+            'Total Engagement',
+            'Positive Posts',
+            'Negative Posts',
+            'Neutral Posts',
+            'Entities Tracked',
+            'Posts with Entity Mentions'
+        ],
+        'Value': [
+            config['topic'],
+            analysis['engagement']['total_posts'],
+            analysis['engagement']['total_comments'],
+            len(analysis['subreddits']),
+            f"{analysis['date_range']['earliest']} to {analysis['date_range']['latest']}",
+            analysis['engagement']['avg_score'],
+            analysis['engagement']['total_score'],
+            analysis['sentiment']['Positive'],
+            analysis['sentiment']['Negative'],
+            analysis['sentiment']['Neutral'],
+            len(config.get('entities_to_track', [])),
+            with_entities
+        ]
+    }
+    if history:
+        window = f"Last {history['window_days']} Days"
+        summary[window] = _summary_values(config, history['window'])
+        summary['All Time'] = _summary_values(config, history['all_time'])
+    return summary
+
+
+def _entity_rows(analysis):
+    """Entity Analysis sheet rows, most mentioned first."""
+    entity_data = []
+    for entity, count in sorted(analysis['entities'].items(), key=lambda x: -x[1]):
+        sent = analysis['entity_sentiment'].get(entity, {})
+        total = sent.get('total', count)
+        pos = sent.get('Positive', 0)
+        entity_data.append({
+            'Entity': entity,
+            'Mentions': count,
+            'Positive': pos,
+            'Negative': sent.get('Negative', 0),
+            'Neutral': sent.get('Neutral', 0),
+            'Positive %': round(pos / total * 100, 1) if total > 0 else 0
+        })
+    return entity_data
+
+
+def _trend_rows(trends):
+    return [{'Entity': entity, 'Week': point['week'], 'Mentions': point['mentions'],
+             'Negative': point['negative'], 'Negative %': round(point['negative_share'] * 100, 1)}
+            for entity, series in trends.items() for point in series]
+
+
+def _dict_sheet(name, columns, rows, keep_empty=True):
+    return name, columns, ([row.get(c) for c in columns] for row in rows), keep_empty
+
+
+def export_excel(df, config, analysis, output_path, history=None, trends=None, streaming=None):
+    """Export results to Excel with multiple sheets.
+
+    When `history` (from `aggregates.history_summary`) is given, the Summary
+    sheet gains trailing-window and all-time columns. `trends` (from
+    `timeseries.entity_trends`) adds an Entity Trends sheet. Results of
+    STREAMING_EXPORT_ROWS or more (or `streaming=True`) are written with
+    constant-memory worksheets; the sheets are the same. Lean-analysed
+    frames always take that path.
+    """
+    if streaming is None:
+        streaming = len(df) >= STREAMING_EXPORT_ROWS or 'entity_mask' in df.columns
+    if streaming:
+        return _export_excel_streaming(df, config, analysis, output_path, history, trends)
 
     posts_df = df[df['type'] == 'post'].copy()
     comments_df = df[df['type'] == 'comment'].copy()
 
-    # Columns to export
-    post_cols = ['id', 'subreddit', 'title', 'text', 'author', 'score', 'upvote_ratio',
-                 'num_comments', 'created_date', 'url', 'entities_mentioned', 'sentiment']
-    comment_cols = ['id', 'subreddit', 'parent_title', 'text', 'author', 'score',
-                    'created_date', 'url', 'entities_mentioned', 'sentiment']
-
     with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
 
         # Summary sheet
-        summary = {
-            'Metric': [
-                'Topic',
-                'Total Posts',
-                'Total Comments',
-                'Unique Subreddits',
-                'Date Range',
-                'Average Score',
-                'Total Engagement',
-                'Positive Posts',
-                'Negative Posts',
-                'Neutral Posts',
-                'Entities Tracked',
-                'Posts with Entity Mentions'
-            ],
-            'Value': [
-                config['topic'],
-                analysis['engagement']['total_posts'],
-                analysis['engagement']['total_comments'],
-                len(analysis['subreddits']),
-                f"{analysis['date_range']['earliest']} to {analysis['date_range']['latest']}",
-                analysis['engagement']['avg_score'],
-                analysis['engagement']['total_score'],
-                analysis['sentiment']['Positive'],
-                analysis['sentiment']['Negative'],
-                analysis['sentiment']['Neutral'],
-                len(config.get('entities_to_track', [])),
-                len(df[df['entities_mentioned'] != ''])
-            ]
-        }
+        summary = _summary_table(config, analysis, len(df[df['entities_mentioned'] != '']), history)
         pd.DataFrame(summary).to_excel(writer, sheet_name='Summary', index=False)
 
         # Posts sheet
-        posts_export = posts_df[[c for c in post_cols if c in posts_df.columns]].sort_values('score', ascending=False)
+        posts_export = posts_df[[c for c in POST_COLS if c in posts_df.columns]].sort_values('score', ascending=False)
         posts_export.to_excel(writer, sheet_name='Posts', index=False)
 
         # Comments sheet
-        comments_export = comments_df[[c for c in comment_cols if c in comments_df.columns]].sort_values('score', ascending=False)
+        comments_export = comments_df[[c for c in COMMENT_COLS if c in comments_df.columns]].sort_values('score', ascending=False)
         comments_export.to_excel(writer, sheet_name='Comments', index=False)
 
         # Entity analysis
         if analysis['entities']:
-            entity_data = []
-            for entity, count in sorted(analysis['entities'].items(), key=lambda x: -x[1]):
-                sent = analysis['entity_sentiment'].get(entity, {})
-                total = sent.get('total', count)
-                pos = sent.get('Positive', 0)
-                entity_data.append({
-                    'Entity': entity,
-                    'Mentions': count,
-                    'Positive': pos,
-                    'Negative': sent.get('Negative', 0),
-                    'Neutral': sent.get('Neutral', 0),
-                    'Positive %': round(pos / total * 100, 1) if total > 0 else 0
-                })
-            pd.DataFrame(entity_data).to_excel(writer, sheet_name='Entity Analysis', index=False)
+            pd.DataFrame(_entity_rows(analysis)).to_excel(writer, sheet_name='Entity Analysis', index=False)
 
         # Subreddit stats
         sub_data = [{'Subreddit': k, **v} for k, v in analysis['subreddits'].items()]
@@ -434,15 +720,100 @@ def export_excel(df, config, analysis, output_path):
         # High-value posts (positive sentiment, good score)
         high_value = posts_df[(posts_df['sentiment'] == 'Positive') & (posts_df['score'] >= 5)]
         if len(high_value) > 0:
-            high_value[[c for c in post_cols if c in high_value.columns]].to_excel(
+            high_value[[c for c in POST_COLS if c in high_value.columns]].to_excel(
                 writer, sheet_name='Positive Highlights', index=False
             )
 
+        # Weekly entity trends
+        if trends:
+            pd.DataFrame(_trend_rows(trends)).to_excel(writer, sheet_name='Entity Trends', index=False)
+
+    return output_path
+
+
+def _workbook_sheets(config, analysis, with_entities, history, trends, posts, comments, highlights):
+    """Sheet tuples for `excel_stream.write_workbook`, in export_excel's order.
+
+    posts, comments and highlights are (header, rows) with rows as iterators.
+    """
+    summary = _summary_table(config, analysis, with_entities, history)
+    yield 'Summary', list(summary), zip(*summary.values()), True
+    yield 'Posts', posts[0], posts[1], True
+    yield 'Comments', comments[0], comments[1], True
+    if analysis['entities']:
+        yield _dict_sheet('Entity Analysis', ENTITY_COLS, _entity_rows(analysis))
+    yield _dict_sheet('Subreddit Stats', SUBREDDIT_COLS,
+                      [{'Subreddit': k, **v} for k, v in analysis['subreddits'].items()])
+    yield _dict_sheet('Top Posts', TOP_POST_COLS, analysis['top_posts'])
+    yield 'Positive Highlights', highlights[0], highlights[1], False
+    if trends:
+        yield _dict_sheet('Entity Trends', TREND_COLS, _trend_rows(trends))
+
+
+def _export_excel_streaming(df, config, analysis, output_path, history=None, trends=None):
+    """export_excel with write-only worksheets, rows fed from df in sorted chunks.
+
+    Works on lean-analysed frames too: display columns are derived per chunk.
+    """
+    lean = 'entity_mask' in df.columns
+    prepare = (lambda chunk: display_columns(chunk, config)) if lean else None
+    available = set(df.columns) | ({'entities_mentioned', 'created_date', 'created_time'} if lean else set())
+    post_cols = [c for c in POST_COLS if c in available]
+    comment_cols = [c for c in COMMENT_COLS if c in available]
+
+    # Row positions rather than filtered copies of df
+    is_post = (df['type'] == 'post').to_numpy()
+    post_rows = np.flatnonzero(is_post)
+    comment_rows = np.flatnonzero(~is_post)
+    highlight_rows = np.flatnonzero(is_post & (df['sentiment'] == 'Positive').to_numpy() & (df['score'] >= 5).to_numpy())
+    with_entities = int((df['entity_mask'] != 0).sum()) if lean else int((df['entities_mentioned'] != '').sum())
+
+    write_workbook(output_path, _workbook_sheets(
+        config, analysis, with_entities, history, trends,
+        posts=(post_cols, frame_rows(df, post_cols, sort_by='score', rows=post_rows, prepare=prepare)),
+        comments=(comment_cols, frame_rows(df, comment_cols, sort_by='score', rows=comment_rows, prepare=prepare)),
+        highlights=(post_cols, frame_rows(df, post_cols, rows=highlight_rows, prepare=prepare)),
+    ))
+    return output_path
+
+
+def _corpus_rows(topic, config, item_type, columns, where=None):
+    """Analysed corpus rows of one type, highest score first, read in chunks."""
+    for chunk in corpus_store.iter_chunks(topic, item_type, CHUNK_ROWS):
+        df = annotate(pd.DataFrame(chunk), config)
+        if where is not None:
+            df = df[where(df)]
+        for c in columns:
+            if c not in df.columns:
+                df[c] = None
+        yield from df[columns].itertuples(index=False, name=None)
+
+
+def export_corpus_excel(config, output_path, history=None, trends=None):
+    """Export a topic's whole corpus store to Excel in constant memory.
+
+    One pass over the store builds the analysis (via the mergeable aggregates),
+    then each row sheet streams from the store in score order.
+    """
+    slug = topic_slug(config['topic'])
+    bucket = None
+    for item_type in ('post', 'comment'):
+        for chunk in corpus_store.iter_chunks(slug, item_type, CHUNK_ROWS):
+            bucket = fold_rows(annotate(pd.DataFrame(chunk), config).to_dict('records'), bucket)
+    analysis = summarize(bucket or fold_rows([]))
+
+    positive = lambda d: (d['sentiment'] == 'Positive') & (d['score'] >= 5)
+    write_workbook(output_path, _workbook_sheets(
+        config, analysis, analysis['engagement']['with_entities'], history, trends,
+        posts=(POST_COLS, _corpus_rows(slug, config, 'post', POST_COLS)),
+        comments=(COMMENT_COLS, _corpus_rows(slug, config, 'comment', COMMENT_COLS)),
+        highlights=(POST_COLS, _corpus_rows(slug, config, 'post', POST_COLS, where=positive)),
+    ))
     return output_path
 
 
-def export_report(config, analysis, output_path):
-    """Generate markdown report."""
+def export_report(config, analysis, output_path, history=None, trends=None):
+    """Generate markdown report. Adds History and Trends sections when given."""
 
     with open(output_path, 'w', encoding='utf-8') as f:
         f.write(f"# Reddit Research Report: {config['topic']}\n\n")
@@ -479,6 +850,41 @@ def export_report(config, analysis, output_path):
                 f.write(f"| {entity} | {count} | {pos} | {neg} | {pct}% |\n")
             f.write("\n")
 
+        # History
+        if history:
+            window = history['window']
+            all_time = history['all_time']
+            f.write("## History\n\n")
+            f.write(f"| Metric | This run | Last {history['window_days']} days | All time |\n")
+            f.write("|--------|----------|--------------|----------|\n")
+            for label, key in [('Posts', 'total_posts'), ('Comments', 'total_comments'), ('Total engagement', 'total_score')]:
+                f.write(f"| {label} | {analysis['engagement'][key]} | {window['engagement'][key]} | {all_time['engagement'][key]} |\n")
+            for sentiment in ('Positive', 'Negative'):
+                f.write(f"| {sentiment} | {analysis['sentiment'][sentiment]} | {window['sentiment'][sentiment]} | {all_time['sentiment'][sentiment]} |\n")
+            f.write(f"| Earliest post | {analysis['date_range']['earliest']} | {window['date_range']['earliest']} | {all_time['date_range']['earliest']} |\n")
+            f.write("\n")
+
+            if all_time['entities']:
+                f.write(f"| Entity | This run | Last {history['window_days']} days | All time |\n")
+                f.write("|--------|----------|--------------|----------|\n")
+                for entity, count in sorted(all_time['entities'].items(), key=lambda x: -x[1])[:15]:
+                    f.write(f"| {entity} | {analysis['entities'].get(entity, 0)} | {window['entities'].get(entity, 0)} | {count} |\n")
+                f.write("\n")
+
+        # Weekly trends
+        if trends:
+            weeks = len(next(iter(trends.values())))
+            f.write(f"## Trends (last {weeks} weeks)\n\n")
+            f.write("| Entity | Weekly mentions | This week | Negative % (first → last week) |\n")
+            f.write("|--------|-----------------|-----------|--------------------------------|\n")
+            for entity, series in trends.items():
+                mentions = [p['mentions'] for p in series]
+                active = [p for p in series if p['mentions']]
+                neg = (f"{round(active[0]['negative_share'] * 100)}% → {round(active[-1]['negative_share'] * 100)}%"
+                       if active else "-")
+                f.write(f"| {entity} | {sparkline(mentions)} | {mentions[-1]} | {neg} |\n")
+            f.write("\n")
+
         # Top subreddits
         f.write("## Top Subreddits\n\n")
         for sub, stats in list(analysis['subreddits'].items())[:10]:
@@ -498,12 +904,139 @@ def export_report(config, analysis, output_path):
     return output_path
 
 
+# ============================================
+# EXPORT STAGE
+# ============================================
+
+EXPORT_FORMATS = ['xlsx', 'md', 'json', 'columnar']
+OUTPUT_JSON = 'research_output.json'
+
+
+def export_paths(config, slug, timestamp):
+    """{format: output path} for the formats this run will write."""
+    formats = config.get('export_formats', EXPORT_FORMATS)
+    unknown = [f for f in formats if f not in EXPORT_FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown export format(s): {', '.join(unknown)}. Choose from {EXPORT_FORMATS}")
+
+    paths = {
+        'xlsx': f"research_{slug}_{timestamp}.xlsx",
+        'md': f"research_{slug}_{timestamp}.md",
+        'json': OUTPUT_JSON,
+        'columnar': str(columnar.COLUMNAR_DIR / f"topic={slug}"),
+    }
+    if 'columnar' in formats and config.get('columnar_format', 'arrow') == 'none':
+        formats = [f for f in formats if f != 'columnar']
+    if 'columnar' in formats and not columnar.available():
+        print("  (pyarrow not installed -- skipping columnar output)")
+        formats = [f for f in formats if f != 'columnar']
+    return {f: paths[f] for f in EXPORT_FORMATS if f in formats}
+
+
+def _write_xlsx(result, path):
+    export_excel(result.df, result.config, result.analysis, path, result.history, result.trends)
+
+
+def _write_md(result, path):
+    export_report(result.config, result.analysis, path, result.history, result.trends)
+
+
+def _write_json(result, path):
+    # Summary for programmatic use
+    analysis = result.analysis
+    output = {
+        'excel_file': result.outputs.get('xlsx', ''),
+        'report_file': result.outputs.get('md', ''),
+        'columnar_dir': result.outputs.get('columnar', ''),
+        'posts': analysis['engagement']['total_posts'],
+        'comments': analysis['engagement']['total_comments'],
+        'sentiment': analysis['sentiment'],
+        'top_entities': dict(sorted(analysis['entities'].items(), key=lambda x: -x[1])[:5])
+    }
+    with open(path, 'w') as f:
+        json.dump(output, f, indent=2)
+
+
+def _write_columnar(result):
+    # Lean mode derives the display columns a chunk at a time
+    frames = display_chunks(result.df, result.config) if result.lean else [result.df]
+    columnar.write_columnar(frames, result.slug, result.timestamp, fmt=result.config.get('columnar_format', 'arrow'))
+
+
+_WRITERS = {
+    'xlsx': (_write_xlsx, True),
+    'md': (_write_md, True),
+    'json': (_write_json, True),
+    'columnar': (_write_columnar, False),  # a directory of partitions, each renamed into place
+}
+
+
+def export_all(result):
+    """Write every format in result.outputs. Returns {format: seconds} for those written.
+
+    The files are written concurrently; research_output.json goes last, so it
+    lists only the outputs that were written.
+    """
+    tasks = []
+    for fmt, path in result.outputs.items():
+        writer, single_file = _WRITERS[fmt]
+        if fmt != 'json':
+            tasks.append((fmt, path if single_file else None, writer))
+    timings = run_exports(result, tasks)
+    if 'json' in result.outputs:
+        written = {fmt: path for fmt, path in result.outputs.items() if fmt in timings}
+        timings.update(run_exports(result._replace(outputs=written), [('json', result.outputs['json'], _write_json)]))
+    return timings
+
+
 # ============================================
 # PROGRAMMATIC API
 # ============================================
 
-def run_config(config_dict):
-    """Run research from a config dict. Returns (DataFrame, analysis_dict) or raises on error."""
+def relevance_scorer(config):
+    """TF-IDF relevance scorer for a config's search terms and entities, over its topic's corpus."""
+    return relevance.for_config(config, topic_slug(config['topic']))
+
+
+def analyze_scored(df, config, scorer=None):
+    """analyze_data then score_items with the config's stream weights and relevance.
+
+    `scorer` is the run's relevance scorer (built from the config when not
+    given). With `analysis_workers` > 1, large frames get both in one pass of
+    `parallel_engine`.
+    """
+    stream = config.get('scoring_stream', 'usecases')
+    weights = weight_profile(stream, config)
+    scorer = scorer or relevance_scorer(config)
+    workers = config.get('analysis_workers', 0)
+    if workers > 1 and len(df) >= parallel_engine.MIN_ROWS:
+        return parallel_engine.analyze(df, config, workers, stream, weights, scorer)
+    df, analysis = analyze_data(df, config)
+    return score_items(df, stream=stream, weights=weights, relevance=scorer,
+                       body=config.get('score_post_body', False)), analysis
+
+
+def index_results(df, config, scorer=None):
+    """Add analysed results to the local search index (unless `search_index` is off).
+
+    Scored frames are indexed with their own priority scores; others are
+    scored with `scorer` (built from the config when not given).
+    """
+    if not config.get('search_index', True):
+        return 0
+    stream = config.get('scoring_stream', 'usecases')
+    if 'priority_score' not in df.columns:
+        scorer = scorer or relevance_scorer(config)
+    return search_index.index_frame(df, topic_slug(config['topic']), stream, weight_profile(stream, config),
+                                    relevance=scorer, body=config.get('score_post_body', False))
+
+
+def run_config(config_dict, collector=None):
+    """Run research from a config dict. Returns (DataFrame, analysis_dict) or raises on error.
+
+    `collector`, if given, is called with the merged config in place of
+    connecting and running `collect_data` (e.g. `SharedFetcher.collect`).
+    """
     merged = DEFAULT_CONFIG.copy()
     merged.update(config_dict)
 
@@ -512,8 +1045,11 @@ def run_config(config_dict):
     if missing:
         raise ValueError(f"Missing required fields: {', '.join(missing)}")
 
-    reddit = init_reddit()
-    results = collect_data(reddit, merged)
+    scorer = relevance_scorer(merged)  # one per run: nothing is stored until it has scored
+    if collector is not None:
+        results = collector(merged)
+    else:
+        results = collect_data(init_reddit(), merged, scorer)
 
     if not results:
         return pd.DataFrame(), {'engagement': {'total_posts': 0, 'total_comments': 0},
@@ -521,8 +1057,11 @@ def run_config(config_dict):
                                  'entities': {}, 'entity_sentiment': {},
                                  'subreddits': {}, 'top_posts': [], 'date_range': {}}
 
-    df = pd.DataFrame(results)
-    df, analysis = analyze_data(df, merged)
+    df = to_frame(results)
+    df, analysis = analyze_scored(df, merged, scorer)
+    corpus_store.add_records(results, topic_slug(merged['topic']), scored=df)
+    record_mentions(df, topic_slug(merged['topic']))
+    index_results(df, merged, scorer)
     return df, analysis
 
 
@@ -545,10 +1084,12 @@ def main():
     print(f"🏷️  Entities to track: {len(config.get('entities_to_track', []))}")
 
     # Connect
+    run_metrics.reset()
     reddit = init_reddit()
+    scorer = relevance_scorer(config)  # one per run: nothing is stored until it has scored
 
     # Scrape
-    results = collect_data(reddit, config)
+    results = collect_data(reddit, config, scorer)
 
     if not results:
         print("\n✗ No results found")
@@ -558,19 +1099,45 @@ def main():
 
     # Analyze
     print("\nAnalyzing data...")
-    df = pd.DataFrame(results)
-    df, analysis = analyze_data(df, config)
+    lean = config.get('lean_analysis', False)
+    df = to_frame(results)
+    run_metrics.record_memory('collected', df)
+    if lean:
+        df, analysis = analyze_data(df, config, lean=True)
+        stream = config.get('scoring_stream', 'usecases')
+        df = score_items(df, stream=stream, weights=weight_profile(stream, config),
+                         relevance=scorer, body=config.get('score_post_body', False))
+    else:
+        df, analysis = analyze_scored(df, config, scorer)
+    run_metrics.record_memory('analysed', df)
+    corpus_store.add_records(results, topic_slug(config['topic']), scored=df)
+    del results
+    index_results(df, config, scorer)
+
+    # Lean mode derives the display columns a chunk at a time for consumers that need them
+    display = (lambda: display_chunks(df, config)) if lean else (lambda: [df])
 
     # Export
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    topic_slug = re.sub(r'[^\w\s-]', '', config['topic'])[:30].strip().replace(' ', '_')
+    slug = topic_slug(config['topic'])
 
-    excel_path = f"research_{topic_slug}_{timestamp}.xlsx"
-    report_path = f"research_{topic_slug}_{timestamp}.md"
+    # Fold this run into the running aggregates for all-time / windowed figures
+    update_aggregates(display(), slug)
+    history = history_summary(slug)
+    for frame in display():
+        record_mentions(frame, slug)
+    trends = entity_trends(slug, config.get('entities_to_track', []))
 
     print(f"\nExporting results...")
-    export_excel(df, config, analysis, excel_path)
-    export_report(config, analysis, report_path)
+    outputs = export_paths(config, slug, timestamp)
+    result = AnalysisResult(config, df, analysis, history, trends, slug, timestamp, lean, outputs)
+    started = time.perf_counter()
+    timings = export_all(result)
+    elapsed = time.perf_counter() - started
+    run_metrics.record_memory('exported')
+    if timings:
+        slowest = max(timings, key=timings.get)
+        print(f"  {len(timings)} formats in {elapsed:.1f}s (slowest: {slowest}, {timings[slowest]:.1f}s)")
 
     # Summary
     print("\n" + "="*60)
@@ -579,26 +1146,31 @@ def main():
     print(f"\n📊 Posts: {analysis['engagement']['total_posts']}")
     print(f"💬 Comments: {analysis['engagement']['total_comments']}")
     print(f"😊 Sentiment: +{analysis['sentiment']['Positive']} / -{analysis['sentiment']['Negative']}")
+    print(f"🌐 Comment fetches: {int(run_metrics.get('comment_fetches'))} ({int(run_metrics.get('comment_fetches_skipped'))} skipped)")
+    if comment_fetch.summary():
+        print(f"📉 Comment transfer: {comment_fetch.summary()}")
+    if seen_filter.summary():
+        print(f"🧮 Seen filter: {seen_filter.summary()}")
 
     if analysis['entities']:
         top_entity = max(analysis['entities'].items(), key=lambda x: x[1])
         print(f"🏆 Top entity: {top_entity[0]} ({top_entity[1]} mentions)")
 
-    print(f"\n📁 Excel: {excel_path}")
-    print(f"📄 Report: {report_path}")
-
-    # Output JSON for programmatic use
-    output = {
-        'excel_file': excel_path,
-        'report_file': report_path,
-        'posts': analysis['engagement']['total_posts'],
-        'comments': analysis['engagement']['total_comments'],
-        'sentiment': analysis['sentiment'],
-        'top_entities': dict(sorted(analysis['entities'].items(), key=lambda x: -x[1])[:5])
-    }
-
-    with open('research_output.json', 'w') as f:
-        json.dump(output, f, indent=2)
+    if 'xlsx' in timings:
+        print(f"\n📁 Excel: {outputs['xlsx']}")
+    if 'md' in timings:
+        print(f"📄 Report: {outputs['md']}")
+    if 'columnar' in timings:
+        print(f"🗂️  Columnar: {outputs['columnar']}")
+
+    if lean:
+        print(f"\n🧠 Memory (RSS / DataFrame MB): "
+              f"collected {run_metrics.get('memory_collected_rss_mb'):.0f} / {run_metrics.get('memory_collected_df_mb'):.0f}, "
+              f"analysed {run_metrics.get('memory_analysed_rss_mb'):.0f} / {run_metrics.get('memory_analysed_df_mb'):.0f}, "
+              f"exported {run_metrics.get('memory_exported_rss_mb'):.0f}; peak {run_metrics.peak_rss_mb():.0f}")
+    budget = config.get('memory_budget_mb', 0)
+    if budget and run_metrics.peak_rss_mb() > budget:
+        print(f"⚠️  Peak memory {run_metrics.peak_rss_mb():.0f} MB exceeded memory_budget_mb ({budget})")
 
 
 if __name__ == '__main__':
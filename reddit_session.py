@@ -0,0 +1,50 @@
+"""Process-wide Reddit client with pooled connections.
+
+Every caller in a process shares one `praw.Reddit`, backed by one keep-alive
+`requests.Session`. Token handling is left to prawcore: it fetches the
+app-only token on the first request and refreshes it on the first request
+after it expires, under its own control, so nothing here touches its state.
+"""
+
+import threading
+
+import praw
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_SIZE = 16          # keep-alive connections (covers the parallel fetch pools)
+
+_lock = threading.Lock()
+_reddit = None
+_http = None
+
+
+def shared_client():
+    """Return the process's Reddit client, or None if not created yet."""
+    return _reddit
+
+
+def http_session():
+    """Return the pooled HTTP session behind the shared client (or None)."""
+    return _http
+
+
+def get_reddit(client_id: str, client_secret: str, user_agent: str):
+    """Return the shared Reddit client, creating it once."""
+    global _reddit, _http
+    with _lock:
+        if _reddit is not None:
+            return _reddit
+
+        _http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+        _http.mount("https://", adapter)
+
+        _reddit = praw.Reddit(
+            client_id=client_id,
+            client_secret=client_secret,
+            user_agent=user_agent,
+            requestor_kwargs={"session": _http},
+        )
+        return _reddit
+
@@ -0,0 +1,98 @@
+"""TF-IDF relevance of items to a topic's search terms and tracked entities.
+
+The keyword components only see the words they list, so a post describing
+the topic in other words scores low. This component weighs every word by
+how rare it is in the topic's corpus (the per-term document counts the
+corpus store keeps as items are stored, so the model grows with the corpus)
+and scores each item by the cosine similarity of its TF-IDF vector to the
+config's `search_terms` and `entities_to_track`, taken as one query.
+
+Document counts are read only for the terms in use: the query's when the
+scorer is built, and each batch's new terms as it is scored (cached on the
+scorer), so a large corpus vocabulary is never loaded whole. Build one
+scorer per run and pass it to every stage that scores.
+
+A batch is scored with sparse-matrix arithmetic: its (item, term) counts
+become CSR arrays in one pass, rows are L2-normalised with one weighted
+bincount, and the similarities are the matrix-vector product with the
+query, so 100k items take seconds.
+"""
+
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+import corpus_store
+from documents import TOKEN_RE, tokens
+
+
+def _tf(counts) -> np.ndarray:
+    """Sublinear term frequency: 1 + ln(count)."""
+    return 1.0 + np.log(np.asarray(counts, dtype=float))
+
+
+class RelevanceScorer:
+    """Scores documents against one query under a topic's document counts.
+
+    `lookup(terms)` returns {term: document count} for terms not in
+    `doc_counts` yet; without it unknown terms count as in no document.
+    """
+
+    def __init__(self, query: list, n_docs: int = 0, doc_counts: dict = None, lookup=None):
+        self.n_docs = n_docs
+        self.doc_counts = dict(doc_counts or {})
+        self.lookup = lookup
+        terms = pd.Series(tokens(" ".join(query)), dtype=object).value_counts()
+        weights = _tf(terms.to_numpy()) * self.idf(terms.index)
+        self.query = dict(zip(terms.index, weights))
+        self.query_norm = float(np.sqrt((weights ** 2).sum()))
+
+    def idf(self, terms) -> np.ndarray:
+        """Smoothed inverse document frequency: ln((1 + N) / (1 + df)) + 1."""
+        if self.lookup is not None:
+            missing = [t for t in pd.unique(np.asarray(terms, dtype=object)) if t not in self.doc_counts]
+            if missing:
+                found = self.lookup(missing)
+                self.doc_counts.update((t, found.get(t, 0)) for t in missing)
+        df = pd.Series(terms, dtype=object).map(self.doc_counts).fillna(0).to_numpy(dtype=float)
+        return np.log((1 + self.n_docs) / (1 + df)) + 1
+
+    def matrix(self, docs: list) -> tuple:
+        """(data, indices, indptr, terms): the docs' L2-normalised TF-IDF rows as CSR arrays."""
+        toks, lengths = [], []
+        for doc in docs:
+            doc_toks = TOKEN_RE.findall(doc.lower)
+            toks.extend(doc_toks)
+            lengths.append(len(doc_toks))
+        codes, terms = pd.factorize(np.array(toks, dtype=object))
+        rows = np.repeat(np.arange(len(docs)), lengths)
+        # Unique (row, term) pairs come out sorted by row: CSR order
+        pairs, counts = np.unique(rows * max(len(terms), 1) + codes, return_counts=True)
+        rows, indices = np.divmod(pairs, max(len(terms), 1))
+        data = _tf(counts) * self.idf(terms)[indices]
+        norms = np.sqrt(np.bincount(rows, weights=data ** 2, minlength=len(docs)))
+        data /= norms[rows]
+        indptr = np.searchsorted(rows, np.arange(len(docs) + 1))
+        return data, indices, indptr, terms
+
+    def scores(self, docs: list) -> np.ndarray:
+        """Cosine similarity (0-1) of each document to the query."""
+        if not self.query_norm or not docs:
+            return np.zeros(len(docs))
+        data, indices, indptr, terms = self.matrix(docs)
+        q = pd.Series(terms, dtype=object).map(self.query).fillna(0).to_numpy(dtype=float) / self.query_norm
+        rows = np.repeat(np.arange(len(docs)), np.diff(indptr))
+        return np.minimum(np.bincount(rows, weights=data * q[indices], minlength=len(docs)), 1.0)
+
+
+def query_terms(config: dict) -> list:
+    """The texts a config's items are compared with: its search terms and tracked entities."""
+    return list(config.get("search_terms", [])) + list(config.get("entities_to_track", []))
+
+
+def for_config(config: dict, topic: str, conn=None) -> RelevanceScorer:
+    """A scorer for a config's query, weighted by the topic's stored corpus."""
+    query = query_terms(config)
+    n_docs, doc_counts = corpus_store.term_stats(topic, tokens(" ".join(query)), conn)
+    return RelevanceScorer(query, n_docs, doc_counts, lookup=partial(corpus_store.term_counts, topic))
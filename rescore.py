@@ -0,0 +1,191 @@
+"""Re-score a topic's history under new weights and report what would change.
+
+Scoring weights (scoring.py `_WEIGHTS`, or `scoring_weights` in a config)
+used to be baked into each run's `priority_score`, so trying new weights meant
+collecting and scoring everything again. The corpus store now keeps each
+post's component inputs (upvotes, created_utc, and the sentiment / code
+quality / security / relevance scores of its text), so re-weighting all of
+history is one matrix product over those columns.
+
+The first run for a topic computes the components of posts stored before
+they were kept (once; they are written back). The report compares the
+config's current weights with the proposed ones: how the items pending in
+REVIEW.md would be re-ordered, and which posts would enter or leave the top N.
+
+Usage:
+    python3 rescore.py config.json --set recency=0.3 --set upvotes=0.2 [--top 25]
+    python3 rescore.py config.json --weights proposed_weights.json
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import corpus_store
+from documents import documents, keywords
+from reddit_research import document_sentiment, load_config, relevance_scorer, topic_slug
+from review_writer import REVIEW_PATH, _extract_pending_items
+from scoring import (
+    COMPONENTS,
+    combine,
+    component_scores,
+    recency_scores,
+    severity_label,
+    upvote_scores,
+    weight_profile,
+)
+
+RESCORE_DIR = Path("output/rescore")
+TOP_N = 25
+
+
+def fill_components(config: dict, slug: str, conn) -> int:
+    """Compute and store components for the topic's posts that lack them. Returns how many."""
+    pos_kw = keywords(config.get("keywords_positive", []))
+    neg_kw = keywords(config.get("keywords_negative", []))
+    scorer = relevance_scorer(config)
+    filled = 0
+    for records in corpus_store.missing_components(slug, conn=conn):
+        df = pd.DataFrame(records)
+        df["sentiment"] = [document_sentiment(doc, pos_kw, neg_kw) for doc in documents(df)]
+        # Sentiment, code quality, security and relevance are the stored ones
+        stored = component_scores(df, relevance=scorer, body=config.get("score_post_body", False))[:, [1, 2, 3, 5]]
+        keys = [f"{r['id']}_post" for r in records]
+        corpus_store.set_components(slug, [(key, *map(float, row)) for key, row in zip(keys, stored)], conn)
+        filled += len(records)
+    return filled
+
+
+def load_matrix(slug: str, conn, now: float = None) -> tuple:
+    """(item keys, items x COMPONENTS matrix) for every scored post of a topic.
+
+    Upvotes are normalised against the topic's most upvoted post, as
+    `score_items` normalises against its batch.
+    """
+    rows = corpus_store.component_rows(slug, conn)
+    keys = [row[0] for row in rows]
+    values = np.array([row[1:] for row in rows], dtype=float).reshape(len(rows), 6)
+    matrix = np.empty((len(rows), len(COMPONENTS)))
+    matrix[:, 0] = upvote_scores(values[:, 0])
+    matrix[:, 1:4] = values[:, 2:5]
+    matrix[:, 4] = recency_scores(values[:, 1], now)
+    matrix[:, 5] = values[:, 5]
+    return keys, matrix
+
+
+def _ranks(scores: np.ndarray) -> np.ndarray:
+    """1-based rank of each score (highest first, ties in input order)."""
+    ranks = np.empty(len(scores), dtype=int)
+    ranks[np.argsort(-scores, kind="stable")] = np.arange(1, len(scores) + 1)
+    return ranks
+
+
+def diff_report(config: dict, current: dict, proposed: dict, top: int = TOP_N, conn=None) -> tuple:
+    """Re-score a topic's stored posts under both weight sets. Returns (report markdown, seconds to score)."""
+    own = conn is None
+    conn = conn or corpus_store.connect()
+    slug = topic_slug(config["topic"])
+
+    filled = fill_components(config, slug, conn)
+    if filled:
+        print(f"Computed components for {filled} stored posts")
+    keys, matrix = load_matrix(slug, conn)
+
+    started = time.perf_counter()
+    before = combine(matrix, current)
+    after = combine(matrix, proposed)
+    elapsed = time.perf_counter() - started
+
+    lines = [
+        f"# Re-scoring: {config['topic']}",
+        "",
+        f"*{len(keys)} posts re-scored in {elapsed * 1000:.1f} ms — {datetime.now().strftime('%Y-%m-%d %H:%M')}*",
+        "",
+        "| Component | Current | Proposed |",
+        "|---|---|---|",
+    ]
+    lines += [f"| {name} | {current.get(name, 0):g} | {proposed.get(name, 0):g} |" for name in COMPONENTS]
+
+    # REVIEW.md: how the pending list would be re-ordered
+    pending = _extract_pending_items(REVIEW_PATH.read_text()) if REVIEW_PATH.exists() else []
+    pending = [item for item in pending if not item.get("checked")]
+    index = {key: i for i, key in enumerate(keys)}
+    by_url = corpus_store.keys_for_urls(slug, [item["link"] for item in pending], conn)
+    matched = [(item, index[by_url[item["link"]]]) for item in pending
+               if item["link"] in by_url and by_url[item["link"]] in index]
+
+    lines += ["", f"## REVIEW.md pending items ({len(matched)} of {len(pending)} in this topic)", ""]
+    if matched:
+        rows = np.array([i for _, i in matched])
+        rank_before, rank_after = _ranks(before[rows]), _ranks(after[rows])
+        lines += ["| Rank | Item | Listed | Current | Proposed | Label |", "|---|---|---|---|---|---|"]
+        for j in np.argsort(rank_after, kind="stable"):
+            item, i = matched[j]
+            old_label, new_label = severity_label(before[i]), severity_label(after[i])
+            label = new_label if old_label == new_label else f"{old_label} → {new_label}"
+            lines.append(f"| {rank_before[j]} → {rank_after[j]} | {item['title'][:80]} | {item['score']} | "
+                         f"{before[i]:.1f} | {after[i]:.1f} | {label} |")
+
+    # Whole history: the top N under each weight set
+    rank_before = _ranks(before)
+    top_before = np.argsort(-before, kind="stable")[:top].tolist()
+    top_after = np.argsort(-after, kind="stable")[:top].tolist()
+    leaving = [i for i in top_before if i not in set(top_after)]
+    details = corpus_store.item_details(slug, [keys[i] for i in top_after + leaving], conn)
+
+    lines += ["", f"## Top {top} under the proposed weights", "",
+              "| # | Was | Title | Current | Proposed |", "|---|---|---|---|---|"]
+    for rank, i in enumerate(top_after, 1):
+        title, url = details.get(keys[i], ("", ""))
+        was = rank_before[i] if rank_before[i] <= top else f"{rank_before[i]} (new)"
+        lines.append(f"| {rank} | {was} | [{(title or '')[:80]}]({url}) | {before[i]:.1f} | {after[i]:.1f} |")
+    if leaving:
+        lines += ["", f"Leaving the top {top}:", ""]
+        for i in leaving:
+            title, url = details.get(keys[i], ("", ""))
+            lines.append(f"- [{(title or '')[:80]}]({url}) ({before[i]:.1f} → {after[i]:.1f})")
+
+    if own:
+        conn.close()
+    return "\n".join(lines) + "\n", elapsed
+
+
+def _parse_set(values: list) -> dict:
+    weights = {}
+    for value in values:
+        name, _, weight = value.partition("=")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score a topic's history under new weights")
+    parser.add_argument("config", help="research config JSON")
+    parser.add_argument("--weights", default=None, help="JSON file of proposed component weights")
+    parser.add_argument("--set", action="append", default=[], metavar="COMPONENT=WEIGHT",
+                        help="proposed weight for one component (repeatable)")
+    parser.add_argument("--top", type=int, default=TOP_N, help="size of the top-N comparison")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    stream = config.get("scoring_stream", "usecases")
+    current = weight_profile(stream, config)
+    changes = {}
+    if args.weights:
+        with open(args.weights) as f:
+            changes.update(json.load(f))
+    changes.update(_parse_set(args.set))
+    if not changes:
+        parser.error("give --weights and/or --set with the proposed weights")
+    proposed = weight_profile(stream, {"scoring_weights": {stream: {**current, **changes}}})
+
+    report, elapsed = diff_report(config, current, proposed, args.top)
+    RESCORE_DIR.mkdir(parents=True, exist_ok=True)
+    path = RESCORE_DIR / f"rescore_{topic_slug(config['topic'])}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
+    path.write_text(report)
+    print(f"Re-scored in {elapsed * 1000:.1f} ms. Report: {path}")
@@ -0,0 +1,233 @@
+"""Local HTTP research service around `run_config`.
+
+Accepts research configs as jobs and runs them on a bounded worker pool. One
+Reddit client and one SharedFetcher serve every job, so concurrent jobs with
+overlapping searches share fetches. Identical configs (after normalisation)
+submitted within the TTL return the cached job instead of running again.
+
+Endpoints:
+    POST /jobs                 body: config JSON  -> {"job_id", "status", "cached"}
+    GET  /jobs/<id>            status, plus the analysis once done
+    GET  /jobs/<id>/results    result rows as streamed NDJSON (once done)
+
+Usage:
+    python3 research_service.py [--port 8765] [--workers 4] [--ttl 900]
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rate_limit import DEFAULT_PER_MINUTE, RateBudget
+from reddit_research import DEFAULT_CONFIG, init_reddit, run_config
+from shared_fetch import SharedFetcher
+
+DEFAULT_PORT = 8765
+MAX_QUEUED = 32       # reject new jobs beyond this many queued or running
+MAX_JOBS = 200        # finished jobs kept for polling
+RESULT_CHUNK = 500    # rows per streamed chunk
+
+
+_LIST_FIELDS = ("search_terms", "subreddits", "entities_to_track", "keywords_positive", "keywords_negative")
+_ORDERED_FIELDS = ("search_terms",)  # fetch_plan runs the first few on r/all, so order matters
+
+
+def normalize_config(config: dict) -> dict:
+    """Merge defaults and drop repeated list entries, keeping the caller's order."""
+    merged = DEFAULT_CONFIG.copy()
+    merged.update(config)
+    for key in _LIST_FIELDS:
+        merged[key] = list(dict.fromkeys(merged.get(key) or []))
+    return merged
+
+
+def config_hash(config: dict) -> str:
+    """Cache key of a normalised config: order-free list fields are sorted, so equivalent configs share it."""
+    canonical = dict(config)
+    for key in _LIST_FIELDS:
+        if key not in _ORDERED_FIELDS:
+            canonical[key] = sorted(canonical.get(key) or [], key=lambda v: str(v).lower())
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+
+
+class Job:
+    def __init__(self, config: dict, key: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.config = config
+        self.key = key
+        self.status = "queued"
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.df = None
+        self.analysis = None
+
+    def describe(self) -> dict:
+        info = {
+            "job_id": self.id,
+            "topic": self.config["topic"],
+            "status": self.status,
+            "created": self.created,
+            "finished": self.finished,
+        }
+        if self.error:
+            info["error"] = self.error
+        if self.status == "done":
+            info["rows"] = len(self.df)
+            info["analysis"] = self.analysis
+        return info
+
+
+class ResearchService:
+    """Job queue, result cache and shared fetcher behind the HTTP handler."""
+
+    def __init__(self, workers: int = 4, ttl: float = 900, per_minute: float = DEFAULT_PER_MINUTE):
+        self.ttl = ttl
+        self.jobs = {}
+        self.by_key = {}
+        self.lock = threading.Lock()
+        self.workers = ThreadPoolExecutor(max_workers=workers)
+        self.fetch_pool = ThreadPoolExecutor(max_workers=workers * 2)
+        self.fetcher = SharedFetcher(init_reddit(), RateBudget(per_minute), self.fetch_pool, ttl=ttl)
+
+    def submit(self, config: dict) -> tuple:
+        """Queue a job, or return the cached/in-flight one for an identical config.
+
+        Returns (job, cached). Raises ValueError on invalid config and
+        OverflowError when the queue is full.
+        """
+        if not isinstance(config, dict):
+            raise ValueError("Config must be a JSON object")
+        missing = [f for f in ("topic", "search_terms", "subreddits") if not config.get(f)]
+        if missing:
+            raise ValueError(f"Missing required fields: {', '.join(missing)}")
+
+        normalized = normalize_config(config)
+        key = config_hash(normalized)
+        with self.lock:
+            existing = self.jobs.get(self.by_key.get(key))
+            if existing and existing.status != "error" and (
+                    existing.finished is None or time.time() - existing.finished < self.ttl):
+                return existing, True
+
+            active = sum(1 for j in self.jobs.values() if j.status in ("queued", "running"))
+            if active >= MAX_QUEUED:
+                raise OverflowError("Job queue is full")
+
+            job = Job(normalized, key)
+            self.jobs[job.id] = job
+            self.by_key[key] = job.id
+            self._evict()
+
+        self.workers.submit(self._run, job)
+        return job, False
+
+    def _evict(self) -> None:
+        finished = sorted((j for j in self.jobs.values() if j.finished), key=lambda j: j.finished)
+        for job in finished[:max(len(self.jobs) - MAX_JOBS, 0)]:
+            del self.jobs[job.id]
+            if self.by_key.get(job.key) == job.id:
+                del self.by_key[job.key]
+
+    def _run(self, job: Job) -> None:
+        job.status = "running"
+        try:
+            job.df, job.analysis = run_config(job.config, collector=self.fetcher.collect)
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "error"
+        finally:
+            job.finished = time.time()
+            self.fetcher.prune()
+
+    def get(self, job_id: str):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+
+def _json_default(obj):
+    # numpy scalars from pandas aggregations
+    return obj.item() if hasattr(obj, "item") else str(obj)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # needed for chunked result streaming
+    service = None  # set by serve()
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload, default=_json_default).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            return self._send_json(404, {"error": "Not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            config = json.loads(self.rfile.read(length) or b"{}")
+            job, cached = self.service.submit(config)
+        except (ValueError, json.JSONDecodeError) as e:
+            return self._send_json(400, {"error": str(e)})
+        except OverflowError as e:
+            return self._send_json(503, {"error": str(e)})
+        self._send_json(200 if cached else 202, {"job_id": job.id, "status": job.status, "cached": cached})
+
+    def do_GET(self):
+        parts = [p for p in self.path.split("/") if p]
+        if len(parts) < 2 or parts[0] != "jobs":
+            return self._send_json(404, {"error": "Not found"})
+
+        job = self.service.get(parts[1])
+        if job is None:
+            return self._send_json(404, {"error": "Unknown job"})
+
+        if len(parts) == 2:
+            return self._send_json(200, job.describe())
+        if parts[2:] == ["results"]:
+            if job.status != "done":
+                return self._send_json(409, {"job_id": job.id, "status": job.status})
+            return self._stream_results(job)
+        self._send_json(404, {"error": "Not found"})
+
+    def _stream_results(self, job: Job) -> None:
+        """Write result rows as NDJSON using chunked transfer encoding."""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for start in range(0, len(job.df), RESULT_CHUNK):
+            chunk = job.df.iloc[start:start + RESULT_CHUNK].to_json(orient="records", lines=True)
+            data = (chunk.rstrip("\n") + "\n").encode()
+            self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def serve(port: int = DEFAULT_PORT, workers: int = 4, ttl: float = 900) -> None:
+    """Run the service on localhost until interrupted."""
+    Handler.service = ResearchService(workers=workers, ttl=ttl)
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    print(f"Research service on http://127.0.0.1:{port} ({workers} workers, cache TTL {ttl:.0f}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local HTTP research service")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=4, help="concurrent research jobs")
+    parser.add_argument("--ttl", type=float, default=900, help="seconds to reuse identical results")
+    args = parser.parse_args()
+    serve(args.port, args.workers, args.ttl)
@@ -0,0 +1,225 @@
+"""REVIEW.md state: parsing, rewriting and archiving the checklist.
+
+Everything here works on the persisted files (REVIEW.md, the archive,
+seen.json, the pending index) with the standard library only, so the
+fast paths in scheduled_scan (refresh REVIEW.md, archive) run without
+importing pandas, numpy or praw. review_writer adds the DataFrame side.
+"""
+
+import json
+import re
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pending_index
+
+INTEL_DIR = Path("output/openclaw_intel")
+REVIEW_PATH = INTEL_DIR / "REVIEW.md"
+ARCHIVE_PATH = INTEL_DIR / "REVIEW_ARCHIVE.md"
+SEEN_PATH = INTEL_DIR / "seen.json"
+ARCHIVE_DAYS = 30
+
+
+def load_seen() -> dict:
+    """Load seen.json — returns {post_id: {score, first_seen}}."""
+    if not SEEN_PATH.exists():
+        return {}
+    with open(SEEN_PATH, "r") as f:
+        return json.load(f)
+
+
+def _extract_pending_items(content: str) -> list:
+    """Parse pending items from REVIEW.md content.
+
+    Returns list of dicts with: score, label, title, stream, subreddit,
+    posted, summary, link, checked, trending.
+    """
+    pending_section = re.search(
+        r"## Pending Review.*?\n(.*?)(?=\n## |\Z)", content, re.DOTALL
+    )
+    if not pending_section:
+        return []
+
+    items = []
+    blocks = re.split(r"\n(?=### \[)", pending_section.group(1))
+
+    for block in blocks:
+        block = block.strip()
+        if not block:
+            continue
+
+        header = re.match(
+            r"### \[(\d+)\]\s*(TRENDING\s*—\s*)?(CRITICAL|HIGH|MEDIUM|LOW)\s*—\s*(.+)",
+            block,
+        )
+        if not header:
+            continue
+
+        score = int(header.group(1))
+        trending = bool(header.group(2))
+        title = header.group(4).strip()
+
+        stream_match = re.search(r"\*\*Stream:\*\*\s*([^|]+)", block)
+        source_match = re.search(r"\*\*Source:\*\*\s*r/(\S+)", block)
+        posted_match = re.search(r"\*\*Posted:\*\*\s*(\S+)", block)
+        summary_match = re.search(r"\*\*Summary:\*\*\s*(.+)", block)
+        link_match = re.search(r"\*\*Link:\*\*\s*(\S+)", block)
+        checked = bool(re.search(r"\[x\]\s*Reviewed", block, re.IGNORECASE))
+
+        items.append({
+            "score": score,
+            "label": header.group(3),
+            "title": title,
+            "stream": stream_match.group(1).strip() if stream_match else "",
+            "subreddit": source_match.group(1).strip() if source_match else "",
+            "posted": posted_match.group(1).strip() if posted_match else "",
+            "summary": summary_match.group(1).strip() if summary_match else "",
+            "link": link_match.group(1).strip() if link_match else "",
+            "checked": checked,
+            "trending": trending,
+        })
+
+    return items
+
+
+def _extract_reviewed_items(content: str) -> list:
+    """Parse reviewed items from REVIEW.md.
+
+    Returns list of dicts with: score, title, reviewed_date, raw_line.
+    """
+    reviewed_section = re.search(
+        r"## Reviewed\s*\n(.*?)(?=\n## |\Z)", content, re.DOTALL
+    )
+    if not reviewed_section:
+        return []
+
+    items = []
+    for match in re.finditer(
+        r"### \[(\d+)\]\s*~~(.+?)~~\s*—\s*reviewed\s+(\S+)",
+        reviewed_section.group(1),
+    ):
+        items.append({
+            "score": int(match.group(1)),
+            "title": match.group(2).strip(),
+            "reviewed_date": match.group(3).strip(),
+        })
+
+    return items
+
+
+def _format_pending_item(item: dict) -> str:
+    """Format a single pending item as markdown."""
+    trending_flag = "TRENDING — " if item.get("trending") else ""
+    title = item["title"][:100]
+
+    lines = [
+        f"### [{item['score']}] {trending_flag}{item['label']} — {title}",
+        f"- **Stream:** {item['stream']} | **Source:** r/{item['subreddit']} | **Posted:** {item['posted']}",
+        f"- **Summary:** {item['summary'][:200]}",
+        f"- **Link:** {item['link']}",
+        "- [ ] Reviewed",
+    ]
+    return "\n".join(lines)
+
+
+def _format_reviewed_item(item: dict) -> str:
+    """Format a single reviewed item as markdown."""
+    return f"### [{item['score']}] ~~{item['title']}~~ — reviewed {item['reviewed_date']}"
+
+
+def sync_review(new_items: list = (), archive_days: int = ARCHIVE_DAYS) -> int:
+    """Rewrite REVIEW.md: move checked items to Reviewed, add new items, archive old reviewed ones.
+
+    `new_items` are pending-item dicts (score, label, title, stream,
+    subreddit, posted, summary, link, trending). Reviewed items older than
+    `archive_days` move to the archive (0 = all of them). Returns how many
+    items were added.
+    """
+    INTEL_DIR.mkdir(parents=True, exist_ok=True)
+    today = datetime.utcnow().strftime("%Y-%m-%d")
+    now_str = datetime.utcnow().strftime("%Y-%m-%d %H:%M GMT")
+
+    # Read existing REVIEW.md
+    existing_content = ""
+    if REVIEW_PATH.exists():
+        existing_content = REVIEW_PATH.read_text()
+
+    # Parse existing items
+    pending_items = _extract_pending_items(existing_content)
+    reviewed_items = _extract_reviewed_items(existing_content)
+
+    # Move checked pending items to reviewed
+    still_pending = []
+    reviewed_links = []
+    for item in pending_items:
+        if item.get("checked"):
+            reviewed_links.append(item["link"])
+            reviewed_items.append({
+                "score": item["score"],
+                "title": item["title"],
+                "reviewed_date": today,
+            })
+        else:
+            still_pending.append(item)
+
+    added = [(item["link"], time.time()) for item in new_items]
+    still_pending.extend(new_items)
+
+    # Sort pending by score descending
+    still_pending.sort(key=lambda x: x["score"], reverse=True)
+
+    # Archive reviewed items older than archive_days
+    cutoff = (datetime.utcnow() - timedelta(days=archive_days)).strftime("%Y-%m-%d")
+    to_archive = [r for r in reviewed_items if archive_days == 0 or r["reviewed_date"] < cutoff]
+    reviewed_items = [r for r in reviewed_items if r not in to_archive]
+
+    if to_archive:
+        archive_lines = []
+        if ARCHIVE_PATH.exists():
+            archive_lines.append(ARCHIVE_PATH.read_text().rstrip())
+        else:
+            archive_lines.append("# OpenClaw Intelligence — Review Archive\n")
+        archive_lines.append(f"\n## Archived {today}\n")
+        for item in to_archive:
+            archive_lines.append(_format_reviewed_item(item))
+        ARCHIVE_PATH.write_text("\n".join(archive_lines) + "\n")
+
+    # Build REVIEW.md
+    lines = [
+        "# OpenClaw Intelligence Review",
+        "",
+        f"Last updated: {now_str}",
+        "",
+        "## Pending Review (sorted by priority)",
+        "",
+    ]
+
+    if still_pending:
+        for item in still_pending:
+            lines.append(_format_pending_item(item))
+            lines.append("")
+    else:
+        lines.append("*No pending items.*")
+        lines.append("")
+
+    lines.append("## Reviewed")
+    lines.append("")
+
+    if reviewed_items:
+        for item in reviewed_items:
+            lines.append(_format_reviewed_item(item))
+    else:
+        lines.append("*No reviewed items yet.*")
+
+    lines.append("")
+    REVIEW_PATH.write_text("\n".join(lines))
+
+    # Keep the digest's pending index in step; rebuild it if REVIEW.md was edited by hand
+    conn = pending_index.connect()
+    pending_index.update(added, reviewed_links, conn)
+    if pending_index.count(conn) != len(still_pending):
+        pending_index.rebuild([item["link"] for item in still_pending], load_seen(), conn)
+    conn.close()
+
+    return len(new_items)
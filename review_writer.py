@@ -1,32 +1,32 @@
-"""REVIEW.md checklist writer with dedup and archiving."""
+"""REVIEW.md checklist writer with dedup and archiving.
+
+Parsing and rewriting REVIEW.md itself lives in review_state; this module
+turns scored DataFrames into new checklist items.
+"""
 
 import json
-import re
-from datetime import datetime, timedelta
-from pathlib import Path
+from datetime import datetime
 
 import pandas as pd
 
+from documents import prepare
+from export_stage import atomic_path
+from review_state import (  # noqa: F401 (re-exported for the scan scripts)
+    ARCHIVE_PATH,
+    INTEL_DIR,
+    REVIEW_PATH,
+    SEEN_PATH,
+    _extract_pending_items,
+    load_seen,
+    sync_review,
+)
 from scoring import severity_label
 
-INTEL_DIR = Path("output/openclaw_intel")
-REVIEW_PATH = INTEL_DIR / "REVIEW.md"
-ARCHIVE_PATH = INTEL_DIR / "REVIEW_ARCHIVE.md"
-SEEN_PATH = INTEL_DIR / "seen.json"
-
-
-def load_seen() -> dict:
-    """Load seen.json — returns {post_id: {score, first_seen}}."""
-    if not SEEN_PATH.exists():
-        return {}
-    with open(SEEN_PATH, "r") as f:
-        return json.load(f)
-
 
 def save_seen(seen: dict) -> None:
     """Write seen dict to seen.json. Creates INTEL_DIR if needed."""
     INTEL_DIR.mkdir(parents=True, exist_ok=True)
-    with open(SEEN_PATH, "w") as f:
+    with atomic_path(SEEN_PATH) as tmp, open(tmp, "w") as f:
         json.dump(seen, f, indent=2)
 
 
@@ -43,7 +43,9 @@ def filter_new_items(df: pd.DataFrame, seen: dict) -> tuple:
     posts["trending"] = False
 
     for idx, row in posts.iterrows():
-        post_id = str(row.get("id", row.get("post_id", idx)))
+        # Cross-posts share a canonical id, so a copy of a known story is not new
+        canonical = row.get("canonical_id")
+        post_id = str(canonical if pd.notna(canonical) and canonical else row.get("id", row.get("post_id", idx)))
         score = int(row.get("priority_score", row.get("score", 0)))
 
         if post_id not in seen:
@@ -60,105 +62,6 @@ def filter_new_items(df: pd.DataFrame, seen: dict) -> tuple:
     return filtered, seen
 
 
-def _extract_pending_items(content: str) -> list:
-    """Parse pending items from REVIEW.md content.
-
-    Returns list of dicts with: score, title, stream, subreddit, posted,
-    summary, link, checked, trending, raw_block.
-    """
-    pending_section = re.search(
-        r"## Pending Review.*?\n(.*?)(?=\n## |\Z)", content, re.DOTALL
-    )
-    if not pending_section:
-        return []
-
-    items = []
-    blocks = re.split(r"\n(?=### \[)", pending_section.group(1))
-
-    for block in blocks:
-        block = block.strip()
-        if not block:
-            continue
-
-        header = re.match(
-            r"### \[(\d+)\]\s*(TRENDING\s*—\s*)?(CRITICAL|HIGH|MEDIUM|LOW)\s*—\s*(.+)",
-            block,
-        )
-        if not header:
-            continue
-
-        score = int(header.group(1))
-        trending = bool(header.group(2))
-        title = header.group(4).strip()
-
-        stream_match = re.search(r"\*\*Stream:\*\*\s*([^|]+)", block)
-        source_match = re.search(r"\*\*Source:\*\*\s*r/(\S+)", block)
-        posted_match = re.search(r"\*\*Posted:\*\*\s*(\S+)", block)
-        summary_match = re.search(r"\*\*Summary:\*\*\s*(.+)", block)
-        link_match = re.search(r"\*\*Link:\*\*\s*(\S+)", block)
-        checked = bool(re.search(r"\[x\]\s*Reviewed", block, re.IGNORECASE))
-
-        items.append({
-            "score": score,
-            "title": title,
-            "stream": stream_match.group(1).strip() if stream_match else "",
-            "subreddit": source_match.group(1).strip() if source_match else "",
-            "posted": posted_match.group(1).strip() if posted_match else "",
-            "summary": summary_match.group(1).strip() if summary_match else "",
-            "link": link_match.group(1).strip() if link_match else "",
-            "checked": checked,
-            "trending": trending,
-        })
-
-    return items
-
-
-def _extract_reviewed_items(content: str) -> list:
-    """Parse reviewed items from REVIEW.md.
-
-    Returns list of dicts with: score, title, reviewed_date, raw_line.
-    """
-    reviewed_section = re.search(
-        r"## Reviewed\s*\n(.*?)(?=\n## |\Z)", content, re.DOTALL
-    )
-    if not reviewed_section:
-        return []
-
-    items = []
-    for match in re.finditer(
-        r"### \[(\d+)\]\s*~~(.+?)~~\s*—\s*reviewed\s+(\S+)",
-        reviewed_section.group(1),
-    ):
-        items.append({
-            "score": int(match.group(1)),
-            "title": match.group(2).strip(),
-            "reviewed_date": match.group(3).strip(),
-        })
-
-    return items
-
-
-def _format_pending_item(item: dict) -> str:
-    """Format a single pending item as markdown."""
-    trending_flag = "TRENDING — " if item.get("trending") else ""
-    label = item.get("label", severity_label(item["score"]))
-    title = item["title"][:100]
-
-    lines = [
-        f"### [{item['score']}] {trending_flag}{label} — {title}",
-        f"- **Stream:** {item['stream']} | **Source:** r/{item['subreddit']} | **Posted:** {item['posted']}",
-        f"- **Summary:** {item['summary'][:200]}",
-        f"- **Link:** {item['link']}",
-        "- [ ] Reviewed",
-    ]
-    return "\n".join(lines)
-
-
-def _format_reviewed_item(item: dict) -> str:
-    """Format a single reviewed item as markdown."""
-    return f"### [{item['score']}] ~~{item['title']}~~ — reviewed {item['reviewed_date']}"
-
-
 def update_review_md(new_items_df: pd.DataFrame, stream_label: str, max_new: int = 0) -> int:
     """Update REVIEW.md with new items, handle checked items, archive old ones.
 
@@ -170,108 +73,27 @@ def update_review_md(new_items_df: pd.DataFrame, stream_label: str, max_new: int
     Returns:
         Count of new items added.
     """
-    INTEL_DIR.mkdir(parents=True, exist_ok=True)
     today = datetime.utcnow().strftime("%Y-%m-%d")
-    now_str = datetime.utcnow().strftime("%Y-%m-%d %H:%M GMT")
-
-    # Read existing REVIEW.md
-    existing_content = ""
-    if REVIEW_PATH.exists():
-        existing_content = REVIEW_PATH.read_text()
-
-    # Parse existing items
-    pending_items = _extract_pending_items(existing_content)
-    reviewed_items = _extract_reviewed_items(existing_content)
 
-    # Move checked pending items to reviewed
-    still_pending = []
-    for item in pending_items:
-        if item.get("checked"):
-            reviewed_items.append({
-                "score": item["score"],
-                "title": item["title"],
-                "reviewed_date": today,
-            })
-        else:
-            still_pending.append(item)
-
-    # Add new items from DataFrame (sorted by score, capped by max_new)
-    new_count = 0
+    # New items from the DataFrame (sorted by score, capped by max_new)
+    new_items = []
     rows = list(new_items_df.iterrows())
     rows.sort(key=lambda x: int(x[1].get("priority_score", x[1].get("score", 0))), reverse=True)
     for _, row in rows:
-        score = int(row.get("priority_score", row.get("score", 0)))
-        title = str(row.get("title", "Untitled"))[:100]
-        text = str(row.get("text", row.get("body", "")))
-        summary = text.replace("\n", " ").replace("\r", " ")[:200]
-        posted = str(row.get("created_date", today))
-        subreddit = str(row.get("subreddit", "unknown"))
-        link = str(row.get("url", ""))
-        trending = bool(row.get("trending", False))
-
-        if max_new > 0 and new_count >= max_new:
+        if max_new > 0 and len(new_items) >= max_new:
             break
 
-        still_pending.append({
+        score = int(row.get("priority_score", row.get("score", 0)))
+        new_items.append({
             "score": score,
             "label": severity_label(score),
-            "title": title,
+            "title": str(row.get("title", "Untitled"))[:100],
             "stream": stream_label,
-            "subreddit": subreddit,
-            "posted": posted,
-            "summary": summary,
-            "link": link,
-            "trending": trending,
+            "subreddit": str(row.get("subreddit", "unknown")),
+            "posted": str(row.get("created_date", today)),
+            "summary": prepare(row.get("title"), row.get("text", row.get("body", ""))).summary,
+            "link": str(row.get("url", "")),
+            "trending": bool(row.get("trending", False)),
         })
-        new_count += 1
-
-    # Sort pending by score descending
-    still_pending.sort(key=lambda x: x["score"], reverse=True)
-
-    # Archive reviewed items older than 30 days
-    cutoff = (datetime.utcnow() - timedelta(days=30)).strftime("%Y-%m-%d")
-    to_archive = [r for r in reviewed_items if r["reviewed_date"] < cutoff]
-    reviewed_items = [r for r in reviewed_items if r["reviewed_date"] >= cutoff]
-
-    if to_archive:
-        archive_lines = []
-        if ARCHIVE_PATH.exists():
-            archive_lines.append(ARCHIVE_PATH.read_text().rstrip())
-        else:
-            archive_lines.append("# OpenClaw Intelligence — Review Archive\n")
-        archive_lines.append(f"\n## Archived {today}\n")
-        for item in to_archive:
-            archive_lines.append(_format_reviewed_item(item))
-        ARCHIVE_PATH.write_text("\n".join(archive_lines) + "\n")
-
-    # Build REVIEW.md
-    lines = [
-        "# OpenClaw Intelligence Review",
-        "",
-        f"Last updated: {now_str}",
-        "",
-        "## Pending Review (sorted by priority)",
-        "",
-    ]
-
-    if still_pending:
-        for item in still_pending:
-            lines.append(_format_pending_item(item))
-            lines.append("")
-    else:
-        lines.append("*No pending items.*")
-        lines.append("")
-
-    lines.append("## Reviewed")
-    lines.append("")
-
-    if reviewed_items:
-        for item in reviewed_items:
-            lines.append(_format_reviewed_item(item))
-    else:
-        lines.append("*No reviewed items yet.*")
-
-    lines.append("")
-    REVIEW_PATH.write_text("\n".join(lines))
 
-    return new_count
+    return sync_review(new_items)
@@ -0,0 +1,104 @@
+"""Per-run counters and timers shared across collection and scan stages.
+
+Memory readings use the Unix `resource` module. On Windows they fall back to
+psutil when it is installed and read 0 otherwise.
+"""
+
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+_lock = threading.Lock()
+_counters = {}
+
+
+def incr(name: str, amount: float = 1) -> None:
+    """Add `amount` to the named counter (thread-safe)."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def get(name: str, default: float = 0) -> float:
+    """Return the current value of a counter."""
+    with _lock:
+        return _counters.get(name, default)
+
+
+@contextmanager
+def timed(name: str):
+    """Accumulate wall-clock seconds spent in the block into `<name>_seconds`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        incr(f"{name}_seconds", time.perf_counter() - start)
+
+
+def set_value(name: str, value: float) -> None:
+    """Set a gauge-style counter to `value`."""
+    with _lock:
+        _counters[name] = value
+
+
+def rss_mb() -> float:
+    """Current resident memory of this process in MB (peak where not available, 0 if unknown)."""
+    if resource is None:
+        return psutil.Process().memory_info().rss / 2**20 if psutil else 0.0
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process so far in MB (0 if unknown)."""
+    if resource is None:
+        if psutil is None:
+            return 0.0
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 2**20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KB on Linux
+
+
+def record_memory(stage: str, df=None) -> None:
+    """Record process RSS (and a DataFrame's deep size) after a pipeline stage."""
+    set_value(f"memory_{stage}_rss_mb", round(rss_mb(), 1))
+    if df is not None:
+        set_value(f"memory_{stage}_df_mb", round(df.memory_usage(deep=True).sum() / 2**20, 1))
+
+
+def snapshot() -> dict:
+    """Return a copy of all counters."""
+    with _lock:
+        return dict(_counters)
+
+
+def reset() -> None:
+    """Clear all counters (start of a new run)."""
+    with _lock:
+        _counters.clear()
+
+
+def format_metrics() -> str:
+    """Render counters as `name=value` pairs, one per line, sorted by name."""
+    lines = []
+    for name, value in sorted(snapshot().items()):
+        if isinstance(value, float) and not value.is_integer():
+            value = round(value, 3)
+        else:
+            value = int(value)
+        lines.append(f"{name}={value}")
+    return "\n".join(lines)
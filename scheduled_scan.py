@@ -3,32 +3,30 @@
 Runs both scan configs (use cases + security), scores results, deduplicates,
 updates REVIEW.md, and prints an email digest.
 
+The other subcommands only work on saved state (REVIEW.md, the pending
+index, the last scan's digest items). They don't import praw, pandas or the
+scoring stack and don't touch the network, so they finish in milliseconds.
+
 Usage:
-    python3 scheduled_scan.py
+    python3 scheduled_scan.py                  # same as `scan`
+    python3 scheduled_scan.py scan
+    python3 scheduled_scan.py refresh-review   # apply checked boxes, re-sort REVIEW.md
+    python3 scheduled_scan.py digest           # rebuild the digest from the last scan
+    python3 scheduled_scan.py archive [--days N]
 """
 
+import argparse
 import json
-import re
 import traceback
-from datetime import datetime
 from pathlib import Path
 
-import pandas as pd
-
+import pending_index
 from email_digest import format_digest
-from reddit_research import run_config
-from review_writer import (
-    INTEL_DIR,
-    REVIEW_PATH,
-    filter_new_items,
-    load_seen,
-    save_seen,
-    update_review_md,
-)
-from scoring import score_items
+from review_state import ARCHIVE_PATH, INTEL_DIR, REVIEW_PATH, sync_review
 
 SCAN_DIR = Path("scan_configs")
 DIGEST_PATH = INTEL_DIR / "latest_digest.txt"
+DIGEST_ITEMS_PATH = INTEL_DIR / "latest_digest.json"
 
 
 def _load_config(filename: str) -> dict:
@@ -37,8 +35,10 @@ def _load_config(filename: str) -> dict:
         return json.load(f)
 
 
-def _collect_digest_items(df: pd.DataFrame) -> list:
+def _collect_digest_items(df) -> list:
     """Extract digest-ready dicts from a scored DataFrame of new items."""
+    import pandas as pd
+
     items = []
     posts = df[df.get("type", pd.Series(["post"] * len(df))) != "comment"]
     for _, row in posts.iterrows():
@@ -51,40 +51,22 @@ def _collect_digest_items(df: pd.DataFrame) -> list:
     return items
 
 
-def _count_pending() -> int:
-    """Count unchecked '- [ ] Reviewed' lines in REVIEW.md."""
-    if not REVIEW_PATH.exists():
-        return 0
-    content = REVIEW_PATH.read_text()
-    return len(re.findall(r"- \[ \] Reviewed", content))
-
-
-def _oldest_unreviewed_days(seen: dict) -> int:
-    """Estimate days since the oldest unreviewed item was first seen."""
-    if not seen:
-        return 0
-
-    # Check which IDs are still pending in REVIEW.md
-    # Approximate: oldest first_seen across all seen items
-    oldest = None
-    for entry in seen.values():
-        first_seen = entry.get("first_seen")
-        if not first_seen:
-            continue
-        try:
-            dt = datetime.fromisoformat(first_seen)
-        except (ValueError, TypeError):
-            continue
-        if oldest is None or dt < oldest:
-            oldest = dt
-
-    if oldest is None:
-        return 0
-    return max((datetime.utcnow() - oldest).days, 0)
+def write_digest(usecases_items: list, security_items: list) -> tuple:
+    """Format the digest, write it and the items it was built from. Returns (subject, body)."""
+    subject, body = format_digest(usecases_items, security_items, *pending_index.stats())
+    INTEL_DIR.mkdir(parents=True, exist_ok=True)
+    DIGEST_PATH.write_text(f"Subject: {subject}\n\n{body}\n")
+    with open(DIGEST_ITEMS_PATH, "w") as f:
+        json.dump({"usecases": usecases_items, "security": security_items}, f, indent=2)
+    return subject, body
 
 
 def run_scan():
     """Run the full scan pipeline for both streams."""
+    import seen_filter
+    from reddit_research import run_config
+    from review_writer import filter_new_items, load_seen, save_seen, update_review_md
+
     print("=" * 60)
     print("  OpenClaw Intelligence Scanner")
     print("=" * 60)
@@ -97,11 +79,10 @@ def run_scan():
     # --- Stream 1: Use Cases ---
     print("[1/2] Use Cases stream")
     try:
-        config = _load_config("openclaw_usecases.json")
-        df, _analysis = run_config(config)
+        config = dict(_load_config("openclaw_usecases.json"), scoring_stream="usecases")
+        df, _analysis = run_config(config)  # analysed and scored
         print(f"      Scraped {len(df)} items from Reddit")
 
-        df = score_items(df, stream="usecases")
         new_df, seen = filter_new_items(df, seen)
         added = update_review_md(new_df, "Use Cases", max_new=20)
         usecases_digest_items = _collect_digest_items(new_df)[:added]
@@ -115,11 +96,10 @@ def run_scan():
     # --- Stream 2: Security ---
     print("[2/2] Security stream")
     try:
-        config = _load_config("openclaw_security.json")
-        df, _analysis = run_config(config)
+        config = dict(_load_config("openclaw_security.json"), scoring_stream="security")
+        df, _analysis = run_config(config)  # analysed and scored
         print(f"      Scraped {len(df)} items from Reddit")
 
-        df = score_items(df, stream="security")
         new_df, seen = filter_new_items(df, seen)
         added = update_review_md(new_df, "Security")
         security_digest_items = _collect_digest_items(new_df)[:added]
@@ -134,15 +114,7 @@ def run_scan():
     save_seen(seen)
 
     # --- Build digest ---
-    pending_count = _count_pending()
-    oldest_days = _oldest_unreviewed_days(seen)
-
-    subject, body = format_digest(
-        usecases_digest_items,
-        security_digest_items,
-        pending_count,
-        oldest_days,
-    )
+    subject, body = write_digest(usecases_digest_items, security_digest_items)
 
     print()
     print("-" * 60)
@@ -151,16 +123,56 @@ def run_scan():
     print(body)
     print("-" * 60)
 
-    # Write digest to file
-    INTEL_DIR.mkdir(parents=True, exist_ok=True)
-    DIGEST_PATH.write_text(f"Subject: {subject}\n\n{body}\n")
-
     print()
     print("Output files:")
     print(f"  Review checklist: {REVIEW_PATH}")
     print(f"  Email digest:     {DIGEST_PATH}")
+    if seen_filter.summary():
+        print(f"  Seen filter:      {seen_filter.summary()}")
     print()
 
 
+def refresh_review():
+    """Apply checked boxes and re-sort REVIEW.md without scanning."""
+    sync_review()
+    print(f"Review checklist: {REVIEW_PATH} ({pending_index.stats()[0]} pending)")
+
+
+def regenerate_digest():
+    """Rebuild the digest from the last scan's items and the current pending counts."""
+    if not DIGEST_ITEMS_PATH.exists():
+        print(f"No saved digest items at {DIGEST_ITEMS_PATH}; run a scan first")
+        return
+    with open(DIGEST_ITEMS_PATH, "r") as f:
+        items = json.load(f)
+    subject, body = write_digest(items.get("usecases", []), items.get("security", []))
+    print(f"Subject: {subject}")
+    print(body)
+    print(f"Email digest: {DIGEST_PATH}")
+
+
+def archive(days: int):
+    """Move reviewed items older than `days` (0 = all) to the archive."""
+    sync_review(archive_days=days)
+    print(f"Review archive: {ARCHIVE_PATH}")
+
+
 if __name__ == "__main__":
-    run_scan()
+    parser = argparse.ArgumentParser(description="OpenClaw scheduled scan and review upkeep")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("scan", help="scrape, score and update REVIEW.md and the digest (default)")
+    commands.add_parser("refresh-review", help="apply checked boxes and re-sort REVIEW.md")
+    commands.add_parser("digest", help="rebuild the digest from the last scan's items")
+    archive_parser = commands.add_parser("archive", help="archive reviewed items now")
+    archive_parser.add_argument("--days", type=int, default=0,
+                                help="only archive items reviewed more than this many days ago (default: all)")
+    args = parser.parse_args()
+
+    if args.command == "refresh-review":
+        refresh_review()
+    elif args.command == "digest":
+        regenerate_digest()
+    elif args.command == "archive":
+        archive(args.days)
+    else:
+        run_scan()
@@ -1,15 +1,26 @@
 """Priority scoring engine for OpenClaw intelligence items.
 
 Scores Reddit posts on a 0-100 priority scale. Two streams supported:
-- usecases: balanced weights across engagement, sentiment, code quality, security, recency
+- usecases: balanced weights across engagement, sentiment, code quality, security, recency, relevance
 - security: heavily weighted toward severity
+
+Profiles can be overridden per config (`scoring_weights`), and the component
+scores are kept alongside `priority_score` so items can be re-weighted without
+being scored again (see rescore.py).
+
+The code-quality and security-severity components read the post title only,
+unless `body` is set (config `score_post_body`). Reading the body changes most
+posts' scores, so it is opt-in: scores already in seen.json and REVIEW.md stay
+comparable with new ones.
 """
 
-import re
 import time
 
+import numpy as np
 import pandas as pd
 
+from documents import Document, documents
+
 
 # --- Weight profiles ---
 
@@ -20,6 +31,7 @@ _WEIGHTS = {
         "code_quality": 0.15,
         "security_severity": 0.125,
         "recency": 0.15,
+        "relevance": 0.125,
     },
     "security": {
         "severity": 0.50,
@@ -29,30 +41,35 @@ _WEIGHTS = {
     },
 }
 
+# Every profile weighs some of these 0-1 component scores
+COMPONENTS = ("upvotes", "sentiment", "code_quality", "security_severity", "recency", "relevance")
+COMPONENT_COLS = tuple(f"{name}_component" for name in COMPONENTS)
+_ALIASES = {"severity": "security_severity"}
+
 # --- Security keyword tiers ---
 
-_SECURITY_HIGH = [
+_SECURITY_HIGH = (
     "critical", "rce", "zero-day", "remote code execution",
     "arbitrary code", "authentication bypass", "privilege escalation",
-]
-_SECURITY_MEDIUM = [
+)
+_SECURITY_MEDIUM = (
     "vulnerability", "exploit", "injection", "bypass", "leak",
     "disclosure", "unpatched", "cve-",
-]
-_SECURITY_LOW = [
+)
+_SECURITY_LOW = (
     "minor", "edge case", "low severity", "informational", "theoretical",
-]
+)
 
 # --- Code quality signals ---
 
-_CODE_POSITIVE = [
+_CODE_POSITIVE = (
     "try", "except", "error", "validate", "sanitize",
     "auth", "test", "assert", "logging", "import hashlib", "import hmac",
-]
-_CODE_NEGATIVE = [
+)
+_CODE_NEGATIVE = (
     "eval(", "exec(", "shell=True", "nosec", "noqa",
     "TODO", "FIXME", "HACK", "password =", "secret =",
-]
+)
 
 # --- Recency constants ---
 
@@ -71,62 +88,107 @@ def severity_label(score: float) -> str:
     return "LOW"
 
 
-def score_items(df: pd.DataFrame, stream: str = "usecases") -> pd.DataFrame:
-    """Add a `priority_score` column (0-100) to the DataFrame.
+def weight_profile(stream: str = "usecases", config: dict = None) -> dict:
+    """A stream's component weights, with any `scoring_weights` overrides from config.
 
-    Only posts are scored; comments receive 0.
+    Config overrides are keyed by stream, e.g.
+    {"scoring_weights": {"usecases": {"recency": 0.25}}}; a stream name not in
+    the built-in profiles can be defined there in full.
     """
-    if stream not in _WEIGHTS:
+    overrides = ((config or {}).get("scoring_weights") or {}).get(stream)
+    if stream not in _WEIGHTS and not overrides:
         raise ValueError(f"Unknown stream: {stream}. Choose from {list(_WEIGHTS)}")
 
-    max_upvotes = df["score"].max() if "score" in df.columns and len(df) > 0 else 1
-    max_upvotes = max(max_upvotes, 1)  # avoid division by zero
+    weights = {}
+    for name, weight in list(_WEIGHTS.get(stream, {}).items()) + list((overrides or {}).items()):
+        name = _ALIASES.get(name, name)
+        if name not in COMPONENTS:
+            raise ValueError(f"Unknown scoring component: {name}. Choose from {list(COMPONENTS)}")
+        weights[name] = float(weight)
+    return weights
 
-    scorer = _score_usecases if stream == "usecases" else _score_security
 
-    def _calc(row):
-        if row.get("type") != "post":
-            return 0.0
-        text = str(row.get("title", "")) + " " + str(row.get("body", ""))
-        return round(scorer(row, text, max_upvotes), 1)
+def weight_vector(weights: dict) -> np.ndarray:
+    """Weights in COMPONENTS order (missing components weigh 0)."""
+    return np.array([weights.get(name, 0.0) for name in COMPONENTS])
 
-    df["priority_score"] = df.apply(_calc, axis=1)
-    return df
 
+def combine(components: np.ndarray, weights: dict) -> np.ndarray:
+    """Priority scores (0-100) from an (items x COMPONENTS) matrix: one matrix product."""
+    return (components @ weight_vector(weights)) * 100
 
-# --- Stream scorers ---
 
+def recency_scores(created_utc, now: float = None) -> np.ndarray:
+    """Score recency per item: 1.0 within 48h, linear decay to 0 at 30 days (0 when unknown)."""
+    created = np.asarray(created_utc, dtype=float)
+    age_hours = ((time.time() if now is None else now) - created) / 3600
+    decay = 1.0 - (age_hours - _FULL_SCORE_HOURS) / (_DECAY_HOURS - _FULL_SCORE_HOURS)
+    scores = np.clip(decay, 0.0, 1.0)
+    return np.where(np.isnan(created), 0.0, scores)
 
-def _score_usecases(row, text: str, max_upvotes: float) -> float:
-    w = _WEIGHTS["usecases"]
-    upvotes = min(row.get("score", 0) / max_upvotes, 1.0) if max_upvotes else 0
-    sentiment = _sentiment_score(row.get("sentiment"))
-    code = _code_quality_score(text)
-    security = _security_severity_score(text)
-    recency = _recency_score(row.get("created_utc"))
 
-    return (
-        w["upvotes"] * upvotes
-        + w["sentiment"] * sentiment
-        + w["code_quality"] * code
-        + w["security_severity"] * security
-        + w["recency"] * recency
-    ) * 100
+def upvote_scores(upvotes, max_upvotes: float = None) -> np.ndarray:
+    """Upvotes normalised against max_upvotes (default: the largest given), capped at 1."""
+    upvotes = np.nan_to_num(np.asarray(upvotes, dtype=float))
+    if max_upvotes is None:
+        max_upvotes = upvotes.max() if len(upvotes) else 1
+    return np.minimum(upvotes / max(max_upvotes, 1), 1.0)
+
+
+def text_components(docs: list) -> np.ndarray:
+    """(code_quality, security_severity) per document: the text-derived components."""
+    return np.array([(_code_quality_score(doc), _security_severity_score(doc)) for doc in docs],
+                    dtype=float).reshape(len(docs), 2)
+
+
+def component_scores(df: pd.DataFrame, max_upvotes: float = None, now: float = None,
+                     relevance=None, body: bool = False) -> np.ndarray:
+    """The (rows x COMPONENTS) matrix of 0-1 component scores for df's rows.
+
+    `relevance` is a relevance.RelevanceScorer; without one the relevance
+    component is 0. `body` lets the text components read the post body too.
+    """
+    n = len(df)
+    docs = documents(df)
+    matrix = np.empty((n, len(COMPONENTS)))
+    matrix[:, 0] = upvote_scores(df["score"] if "score" in df.columns else np.zeros(n), max_upvotes)
+    matrix[:, 1] = [_sentiment_score(s) for s in (df["sentiment"] if "sentiment" in df.columns else [None] * n)]
+    matrix[:, 2:4] = text_components(docs if body else documents(df, body=False))
+    matrix[:, 4] = recency_scores(df["created_utc"] if "created_utc" in df.columns else np.full(n, np.nan), now)
+    matrix[:, 5] = relevance.scores(docs) if relevance is not None else 0.0
+    return matrix
+
+
+def score_items(df: pd.DataFrame, stream: str = "usecases", max_upvotes: float = None,
+                weights: dict = None, relevance=None, body: bool = False) -> pd.DataFrame:
+    """Add a `priority_score` column (0-100) and the component columns to the DataFrame.
+
+    Only posts are scored; comments receive 0. Upvotes are normalised against
+    the batch maximum unless `max_upvotes` is given (e.g. a running reference
+    when scoring items one at a time). Text is read through the shared
+    `documents` cache, so items already analysed are not re-scanned.
+    `weights` overrides the stream's profile (see `weight_profile`), and
+    `relevance` (a relevance.RelevanceScorer) scores the relevance component,
+    and `body` lets code quality and security severity read the post body.
+
+    The 0-1 component scores are kept as COMPONENT_COLS, so the batch can be
+    re-weighted later with `combine` without scoring it again.
+    """
+    if weights is None:
+        weights = weight_profile(stream)
 
+    if max_upvotes is None:
+        max_upvotes = df["score"].max() if "score" in df.columns and len(df) > 0 else 1
+    max_upvotes = max(max_upvotes, 1)  # avoid division by zero
 
-def _score_security(row, text: str, max_upvotes: float) -> float:
-    w = _WEIGHTS["security"]
-    severity = _security_severity_score(text)
-    upvotes = min(row.get("score", 0) / max_upvotes, 1.0) if max_upvotes else 0
-    sentiment = _sentiment_score(row.get("sentiment"))
-    recency = _recency_score(row.get("created_utc"))
+    is_post = (df["type"] == "post").to_numpy() if "type" in df.columns else np.zeros(len(df), dtype=bool)
+    components = np.zeros((len(df), len(COMPONENTS)))
+    components[is_post] = component_scores(df[is_post], max_upvotes, relevance=relevance, body=body)
 
-    return (
-        w["severity"] * severity
-        + w["upvotes"] * upvotes
-        + w["sentiment"] * sentiment
-        + w["recency"] * recency
-    ) * 100
+    for col, values in zip(COMPONENT_COLS, components.T):
+        df[col] = values
+    df["priority_score"] = np.round(combine(components, weights), 1)
+    return df
 
 
 # --- Component scorers ---
@@ -138,51 +200,34 @@ def _sentiment_score(sentiment) -> float:
     return mapping.get(str(sentiment), 0.5)
 
 
-def _security_severity_score(text: str) -> float:
-    """Score text for security severity based on keyword matching."""
-    lower = text.lower()
-    for kw in _SECURITY_HIGH:
-        if kw in lower:
-            return 1.0
-    for kw in _SECURITY_MEDIUM:
-        if kw in lower:
-            return 0.6
-    for kw in _SECURITY_LOW:
-        if kw in lower:
-            return 0.2
+def _security_severity_score(doc: Document) -> float:
+    """Score text for security severity based on keyword matching.
+
+    The top tier is matched on whole words, so short terms like "rce" don't
+    fire inside "source" or "force".
+    """
+    if doc.word_hits(_SECURITY_HIGH):
+        return 1.0
+    if doc.hits(_SECURITY_MEDIUM):
+        return 0.6
+    if doc.hits(_SECURITY_LOW):
+        return 0.2
     return 0.0
 
 
-def _code_quality_score(text: str) -> float:
+def _code_quality_score(doc: Document) -> float:
     """Score code quality from code blocks in text.
 
     Returns ratio of positive signals / (positive + negative).
     0.5 if no code blocks found.
     """
-    code_blocks = re.findall(r"```[\s\S]*?```", text)
-    if not code_blocks:
+    if not doc.code:
         return 0.5
 
-    code_text = " ".join(code_blocks)
-    positive = sum(1 for sig in _CODE_POSITIVE if sig in code_text)
-    negative = sum(1 for sig in _CODE_NEGATIVE if sig in code_text)
+    positive = len(doc.code_hits(_CODE_POSITIVE))
+    negative = len(doc.code_hits(_CODE_NEGATIVE))
 
     total = positive + negative
     if total == 0:
         return 0.5
     return positive / total
-
-
-def _recency_score(created_utc) -> float:
-    """Score recency: 1.0 within 48h, linear decay to 0 at 30 days."""
-    if created_utc is None or pd.isna(created_utc):
-        return 0.0
-
-    age_hours = (time.time() - float(created_utc)) / 3600
-
-    if age_hours <= _FULL_SCORE_HOURS:
-        return 1.0
-    if age_hours >= _DECAY_HOURS:
-        return 0.0
-
-    return 1.0 - (age_hours - _FULL_SCORE_HOURS) / (_DECAY_HOURS - _FULL_SCORE_HOURS)
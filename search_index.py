@@ -0,0 +1,493 @@
+"""Inverted index over the corpus store for ad-hoc search.
+
+Answers questions like "every post mentioning prompt injection in r/netsec
+last month" from local data, without going back to the Reddit API. Items are
+indexed as they land in the corpus (each run and each backfill batch), with
+their subreddit, date, sentiment and priority score, so those can filter a
+search.
+
+Posting lists are positional and compressed: for each term, a block per
+indexing batch holds varint-encoded doc-id gaps, per-doc occurrence counts
+and per-doc position gaps. Blocks are decoded with numpy, phrase matches are
+a vectorized intersection of (doc, position - offset) keys, and filters are
+applied to in-memory attribute arrays, so a query over millions of items
+takes milliseconds. `compact` merges a term's blocks after many small runs.
+
+Usage:
+    python3 search_index.py '"prompt injection"' --subreddit netsec --since 2026-09-01 --until 2026-09-30
+    python3 search_index.py 'openclaw rce' --sentiment Negative --min-priority 60 --analyze config.json
+    python3 search_index.py --rebuild config.json      # index a topic's existing corpus
+    python3 search_index.py --compact
+"""
+
+import argparse
+import shlex
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import corpus_store
+from documents import TOKEN_RE, prepare, tokens
+from scoring import score_items, weight_profile
+
+SEARCH_INDEX_PATH = Path("output/search_index.db")
+_POSITION_BITS = 32  # phrase keys pack (doc_id, position) into one int64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id   INTEGER PRIMARY KEY,
+    topic    TEXT NOT NULL,
+    item_key TEXT NOT NULL,             -- '<id>_<type>', as in the corpus store
+    UNIQUE (topic, item_key)
+);
+CREATE TABLE IF NOT EXISTS labels (
+    attr  TEXT NOT NULL,                -- topic / type / subreddit / sentiment
+    label TEXT NOT NULL,
+    code  INTEGER NOT NULL,
+    PRIMARY KEY (attr, label)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS attributes (
+    block     INTEGER PRIMARY KEY,      -- first doc_id of the batch; one value per doc below
+    topic     BLOB NOT NULL,            -- int32 label codes
+    type      BLOB NOT NULL,
+    subreddit BLOB NOT NULL,
+    sentiment BLOB NOT NULL,
+    created   BLOB NOT NULL,            -- float64 created_utc
+    priority  BLOB NOT NULL             -- float64 priority score
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term      TEXT NOT NULL,
+    block     INTEGER NOT NULL,         -- first doc_id of the batch that wrote it
+    docs      BLOB NOT NULL,            -- varint doc_id gaps (first one absolute)
+    counts    BLOB NOT NULL,            -- varint occurrences per doc
+    positions BLOB NOT NULL,            -- varint position gaps, restarting at each doc
+    PRIMARY KEY (term, block)
+) WITHOUT ROWID;
+"""
+
+_LABELS = ("topic", "type", "subreddit", "sentiment")
+
+
+def connect(path: Path = None) -> sqlite3.Connection:
+    """Open (and create if needed) the search index."""
+    path = path or SEARCH_INDEX_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+# --- Varint coding ---
+
+
+def _encode(values) -> tuple:
+    """(varint bytes, bytes per value) for non-negative integers."""
+    v = np.asarray(values, dtype=np.uint64)
+    n = np.ones(len(v), dtype=np.int64)
+    if not len(v):
+        return b"", n
+    rest = v >> np.uint64(7)
+    while rest.any():
+        n += rest > 0
+        rest >>= np.uint64(7)
+    k = np.arange(int(n.max()))
+    groups = (v[:, None] >> (np.uint64(7) * k.astype(np.uint64))) & np.uint64(0x7F)
+    groups |= (k[None, :] < (n[:, None] - 1)).astype(np.uint64) << np.uint64(7)
+    return groups[k[None, :] < n[:, None]].astype(np.uint8).tobytes(), n
+
+
+def encode(values) -> bytes:
+    """Unsigned LEB128 varints for a sequence of non-negative integers."""
+    return _encode(values)[0]
+
+
+def decode(data: bytes) -> np.ndarray:
+    """Inverse of `encode`, as an int64 array."""
+    b = np.frombuffer(data, dtype=np.uint8)
+    if not len(b):
+        return np.zeros(0, dtype=np.int64)
+    ends = np.flatnonzero(b < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    shift = (np.arange(len(b)) - np.repeat(starts, ends - starts + 1)) * 7
+    return np.add.reduceat((b & 0x7F).astype(np.int64) << shift, starts)
+
+
+# --- Indexing ---
+
+
+def _label_codes(conn: sqlite3.Connection, attr: str, values: list) -> np.ndarray:
+    """int32 codes for an attribute's labels, adding new labels to `labels`."""
+    codes = dict(conn.execute("SELECT label, code FROM labels WHERE attr = ?", (attr,)).fetchall())
+    new = [(attr, label, len(codes) + i) for i, label in enumerate(dict.fromkeys(v for v in values if v not in codes))]
+    conn.executemany("INSERT INTO labels (attr, label, code) VALUES (?, ?, ?)", new)
+    codes.update((label, code) for _, label, code in new)
+    return np.array([codes[v] for v in values], dtype=np.int32)
+
+
+def _postings_rows(texts: list, first: int) -> list:
+    """(term, block, docs, counts, positions) rows for a batch of docs numbered from `first`.
+
+    All tokens of the batch are sorted by (term, doc, position) once and each
+    stream is varint-encoded in one pass; a term's blob is then a slice.
+    """
+    toks, lengths = [], []
+    for text in texts:
+        doc_toks = TOKEN_RE.findall(text)
+        toks.extend(doc_toks)
+        lengths.append(len(doc_toks))
+    if not toks:
+        return []
+    lengths = np.array(lengths)
+    doc = np.repeat(np.arange(first, first + len(texts)), lengths)
+    pos = np.arange(len(toks)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    term, vocab = pd.factorize(pd.Series(toks, dtype=object), sort=True)
+    order = np.lexsort((pos, doc, term))
+    term, doc, pos = term[order], doc[order], pos[order]
+
+    # One posting per (term, doc) run; position gaps restart at each posting
+    starts = np.flatnonzero(np.r_[True, (term[1:] != term[:-1]) | (doc[1:] != doc[:-1])])
+    counts = np.diff(np.r_[starts, len(toks)])
+    gaps = np.diff(pos, prepend=0)
+    gaps[starts] = pos[starts]
+    # Doc gaps restart at each term
+    p_term, p_doc = term[starts], doc[starts]
+    term_starts = np.flatnonzero(np.r_[True, p_term[1:] != p_term[:-1]])
+    doc_gaps = np.diff(p_doc, prepend=0)
+    doc_gaps[term_starts] = p_doc[term_starts]
+
+    streams = []
+    for values, bounds in ((doc_gaps, term_starts), (counts, term_starts), (gaps, starts[term_starts])):
+        data, n = _encode(values)
+        offsets = np.r_[0, np.cumsum(n)][np.r_[bounds, len(values)]].tolist()
+        streams.append((data, offsets))
+    return [(vocab[i], first, *(data[o[i]:o[i + 1]] for data, o in streams)) for i in range(len(vocab))]
+
+
+def index_frame(df: pd.DataFrame, topic: str, stream: str = "usecases", weights: dict = None,
+                conn: sqlite3.Connection = None, relevance=None, body: bool = False) -> int:
+    """Index analysed rows (with `sentiment`) not indexed yet. Returns how many were added.
+
+    Rows keep the frame's own `priority_score` when it has one. Otherwise the
+    whole frame is scored with the stream's weights (and `relevance` scorer),
+    so upvotes are normalised as they would be for the run, not for just the
+    rows being added.
+    """
+    if df.empty:
+        return 0
+    own = conn is None
+    conn = conn or connect()
+
+    keys = [f"{i}_{t}" for i, t in zip(df["id"], df["type"].astype(str))]
+    indexed = set()
+    for start in range(0, len(keys), 500):
+        batch = keys[start:start + 500]
+        indexed.update(k for (k,) in conn.execute(
+            f"SELECT item_key FROM docs WHERE topic = ? AND item_key IN ({', '.join('?' * len(batch))})",
+            (topic, *batch),
+        ))
+    # A key repeated within the batch is indexed once
+    new = np.array([k not in indexed for k in keys], dtype=bool) & ~pd.Series(keys).duplicated().to_numpy()
+    if not new.any():
+        if own:
+            conn.close()
+        return 0
+
+    cols = [c for c in ("id", "type", "title", "text", "score", "sentiment", "created_utc") if c in df.columns]
+    frame = df[cols].astype({c: str for c in ("type", "sentiment") if c in cols})
+    if "priority_score" in df.columns:
+        frame["priority_score"] = df["priority_score"].to_numpy(dtype=float)
+    else:
+        frame = score_items(frame, stream=stream, weights=weights or weight_profile(stream), relevance=relevance,
+                            body=body)
+    rows = frame[new]
+    new_keys = [k for k, is_new in zip(keys, new) if is_new]
+    n = len(rows)
+    labels = {
+        "topic": [topic] * n,
+        "type": rows["type"].tolist(),
+        "subreddit": (df.loc[new, "subreddit"].fillna("").astype(str).str.lower().tolist()
+                      if "subreddit" in df.columns else [""] * n),
+        "sentiment": rows["sentiment"].fillna("").tolist() if "sentiment" in rows else [""] * n,
+    }
+    texts = [prepare(title, text).lower for title, text in zip(rows["title"], rows["text"])]
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        first = (conn.execute("SELECT MAX(doc_id) FROM docs").fetchone()[0] or 0) + 1
+        conn.executemany("INSERT INTO docs (doc_id, topic, item_key) VALUES (?, ?, ?)",
+                         zip(range(first, first + n), [topic] * n, new_keys))
+        conn.execute(
+            "INSERT INTO attributes (block, topic, type, subreddit, sentiment, created, priority) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (first, *(_label_codes(conn, attr, labels[attr]).tobytes() for attr in _LABELS),
+             pd.to_numeric(rows["created_utc"], errors="coerce").to_numpy(dtype=float, na_value=np.nan).tobytes(),
+             rows["priority_score"].to_numpy(dtype=float).tobytes()),
+        )
+        conn.executemany("INSERT INTO postings (term, block, docs, counts, positions) VALUES (?, ?, ?, ?, ?)",
+                         _postings_rows(texts, first))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        if own:
+            conn.close()
+    return n
+
+
+def compact(conn: sqlite3.Connection = None) -> int:
+    """Merge each term's posting blocks into one. Returns how many terms were merged."""
+    own = conn is None
+    conn = conn or connect()
+    terms = [t for (t,) in conn.execute("SELECT term FROM postings GROUP BY term HAVING COUNT(*) > 1")]
+    with conn:
+        for term in terms:
+            blocks = conn.execute("SELECT block, docs, counts, positions FROM postings WHERE term = ? ORDER BY block",
+                                  (term,)).fetchall()
+            docs = np.concatenate([np.cumsum(decode(b[1])) for b in blocks])
+            # Position gaps restart at every doc, so they concatenate as they are
+            merged = (encode(np.diff(docs, prepend=0)), b"".join(b[2] for b in blocks), b"".join(b[3] for b in blocks))
+            conn.execute("DELETE FROM postings WHERE term = ?", (term,))
+            conn.execute("INSERT INTO postings (term, block, docs, counts, positions) VALUES (?, ?, ?, ?, ?)",
+                         (term, blocks[0][0], *merged))
+    if own:
+        conn.close()
+    return len(terms)
+
+
+# --- Querying ---
+
+
+def parse_query(query: str) -> list:
+    """Query text to a list of phrases (token lists), all of which must match.
+
+    Quoted text is a phrase; an unquoted word that splits into several tokens
+    (e.g. zero-day) is matched as a phrase too.
+    """
+    phrases = []
+    for part in shlex.split(query):
+        toks = tokens(part)
+        if toks:
+            phrases.append(toks)
+    return phrases
+
+
+class SearchIndex:
+    """Query side of the index: posting lists from SQLite, doc attributes cached as arrays."""
+
+    def __init__(self, path: Path = None):
+        self.conn = connect(path)
+        self._loaded = 0  # highest doc_id whose attributes are cached
+        self._codes = {attr: np.full(1, -1, dtype=np.int32) for attr in _LABELS}
+        self._created = np.full(1, np.nan)
+        self._priority = np.zeros(1)
+        self._vocab = {attr: {} for attr in _LABELS}
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _refresh(self) -> None:
+        """Load attributes of docs indexed since the last query (index doc_id = array position)."""
+        blocks = self.conn.execute(
+            "SELECT block, topic, type, subreddit, sentiment, created, priority FROM attributes "
+            "WHERE block > ? ORDER BY block", (self._loaded,)).fetchall()
+        if not blocks:
+            return
+        for i, attr in enumerate(_LABELS, 1):
+            self._codes[attr] = np.concatenate([self._codes[attr]] + [np.frombuffer(b[i], dtype=np.int32) for b in blocks])
+        self._created = np.concatenate([self._created] + [np.frombuffer(b[5]) for b in blocks])
+        self._priority = np.concatenate([self._priority] + [np.frombuffer(b[6]) for b in blocks])
+        self._loaded = len(self._created) - 1
+        for attr, label, code in self.conn.execute("SELECT attr, label, code FROM labels"):
+            self._vocab[attr][label] = code
+
+    def _postings(self, term: str, with_positions: bool) -> tuple:
+        """(doc ids, positions, doc id of each position) for a term; positions None unless asked."""
+        blocks = self.conn.execute("SELECT docs, counts, positions FROM postings WHERE term = ? ORDER BY block",
+                                   (term,)).fetchall()
+        if not blocks:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty
+        docs = np.concatenate([np.cumsum(decode(b[0])) for b in blocks])
+        if not with_positions:
+            return docs, None, None
+        counts = np.concatenate([decode(b[1]) for b in blocks])
+        gaps = np.concatenate([decode(b[2]) for b in blocks])
+        total = np.cumsum(gaps)
+        doc_start = np.cumsum(counts) - counts
+        positions = total - np.repeat(total[doc_start] - gaps[doc_start], counts)
+        return docs, positions, np.repeat(docs, counts)
+
+    def _phrase(self, phrase: list) -> np.ndarray:
+        """Doc ids containing the tokens consecutively."""
+        if len(phrase) == 1:
+            return self._postings(phrase[0], False)[0]
+        lists = [self._postings(tok, True) for tok in phrase]
+        docs = lists[0][0]
+        for other in lists[1:]:
+            docs = np.intersect1d(docs, other[0], assume_unique=True)
+        keys = None
+        for offset, (_docs, positions, owners) in enumerate(lists):
+            keep = np.isin(owners, docs) & (positions >= offset)
+            k = (owners[keep] << _POSITION_BITS) | (positions[keep] - offset)
+            keys = k if keys is None else np.intersect1d(keys, k)
+        return np.unique(keys >> _POSITION_BITS)
+
+    def search(self, query: str = "", topic: str = None, subreddit: str = None, start: float = None,
+               end: float = None, sentiment: str = None, min_priority: float = None, item_type: str = None,
+               limit: int = None) -> list:
+        """Matching items, newest first, as dicts of their indexed attributes.
+
+        Every phrase in `query` must match; `start`/`end` bound created_utc
+        (epoch seconds, end exclusive). An empty query matches every item.
+        """
+        self._refresh()
+        phrases = parse_query(query)
+        if phrases:
+            docs = None
+            for phrase in phrases:
+                found = self._phrase(phrase)
+                docs = found if docs is None else np.intersect1d(docs, found, assume_unique=True)
+        else:
+            docs = np.arange(1, self._loaded + 1)
+        docs = docs[docs <= self._loaded]
+
+        mask = np.ones(len(docs), dtype=bool)
+        for attr, value in (("topic", topic), ("subreddit", subreddit and subreddit.lower()),
+                            ("sentiment", sentiment), ("type", item_type)):
+            if value is not None:
+                mask &= self._codes[attr][docs] == self._vocab[attr].get(value, -2)
+        created = self._created[docs]
+        if start is not None:
+            mask &= created >= start
+        if end is not None:
+            mask &= created < end
+        if min_priority is not None:
+            mask &= self._priority[docs] >= min_priority
+        docs = docs[mask]
+        docs = docs[np.argsort(-np.nan_to_num(self._created[docs]), kind="stable")][:limit]
+
+        names = {attr: {code: label for label, code in vocab.items()} for attr, vocab in self._vocab.items()}
+        keys = {}
+        ids = docs.tolist()
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            keys.update(self.conn.execute(
+                f"SELECT doc_id, item_key FROM docs WHERE doc_id IN ({', '.join('?' * len(batch))})", batch))
+        return [{
+            "topic": names["topic"][self._codes["topic"][d]],
+            "item_key": keys[d],
+            "type": names["type"][self._codes["type"][d]],
+            "subreddit": names["subreddit"][self._codes["subreddit"][d]],
+            "created_utc": float(self._created[d]),
+            "sentiment": names["sentiment"][self._codes["sentiment"][d]],
+            "priority": float(self._priority[d]),
+        } for d in ids]
+
+
+def search(query: str = "", **filters) -> list:
+    """One-off `SearchIndex.search` (opens and closes the index)."""
+    index = SearchIndex()
+    try:
+        return index.search(query, **filters)
+    finally:
+        index.close()
+
+
+def records(results: list, conn: sqlite3.Connection = None) -> list:
+    """The full corpus records of search results, in result order (None if no longer stored)."""
+    own = conn is None
+    conn = conn or corpus_store.connect()
+    by_topic = {}
+    for r in results:
+        by_topic.setdefault(r["topic"], []).append(r["item_key"])
+    found = {}
+    for topic, keys in by_topic.items():
+        for key, record in corpus_store.get_records(topic, keys, conn).items():
+            found[(topic, key)] = record
+    if own:
+        conn.close()
+    return [found.get((r["topic"], r["item_key"])) for r in results]
+
+
+def search_frame(query: str = "", **filters) -> pd.DataFrame:
+    """Search results as a DataFrame of corpus records, ready for `analyze_data`."""
+    return pd.DataFrame([r for r in records(search(query, **filters)) if r is not None])
+
+
+def rebuild(config: dict, conn: sqlite3.Connection = None) -> int:
+    """Index a topic's whole corpus (items already indexed are skipped). Returns how many were added."""
+    from reddit_research import annotate, relevance_scorer, topic_slug
+
+    own = conn is None
+    conn = conn or connect()
+    slug = topic_slug(config["topic"])
+    stream = config.get("scoring_stream", "usecases")
+    weights = weight_profile(stream, config)
+    scorer = relevance_scorer(config)
+    added = 0
+    for item_type in ("post", "comment"):
+        for chunk in corpus_store.iter_chunks(slug, item_type):
+            added += index_frame(annotate(pd.DataFrame(chunk), config), slug, stream, weights, conn, scorer)
+    if own:
+        conn.close()
+    return added
+
+
+def _day(value: str) -> float:
+    return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search the local corpus")
+    parser.add_argument("query", nargs="?", default="", help='words and "quoted phrases", all must match')
+    parser.add_argument("--topic", default=None, help="topic slug (default: all topics)")
+    parser.add_argument("--subreddit", default=None)
+    parser.add_argument("--since", default=None, help="first day, YYYY-MM-DD (UTC)")
+    parser.add_argument("--until", default=None, help="last day, YYYY-MM-DD (UTC, inclusive)")
+    parser.add_argument("--sentiment", choices=["Positive", "Negative", "Neutral"], default=None)
+    parser.add_argument("--min-priority", type=float, default=None)
+    parser.add_argument("--type", choices=["post", "comment"], default=None)
+    parser.add_argument("--limit", type=int, default=20, help="results to list (0 = all)")
+    parser.add_argument("--analyze", metavar="CONFIG", default=None, help="run analyze_data over every match")
+    parser.add_argument("--rebuild", metavar="CONFIG", default=None, help="index a topic's existing corpus")
+    parser.add_argument("--compact", action="store_true", help="merge posting blocks")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        from reddit_research import load_config
+        print(f"Indexed {rebuild(load_config(args.rebuild))} items")
+    if args.compact:
+        print(f"Compacted {compact()} terms")
+    if args.rebuild or args.compact:
+        raise SystemExit
+
+    index = SearchIndex()
+    index._refresh()
+    started = time.perf_counter()
+    results = index.search(args.query, topic=args.topic, subreddit=args.subreddit,
+                           start=_day(args.since) if args.since else None,
+                           end=_day(args.until) + 86400 if args.until else None,
+                           sentiment=args.sentiment, min_priority=args.min_priority, item_type=args.type)
+    elapsed = time.perf_counter() - started
+    index.close()
+    print(f"{len(results)} matches in {elapsed * 1000:.1f} ms")
+
+    shown = results[:args.limit] if args.limit else results
+    for r, record in zip(shown, records(shown)):
+        record = record or {}
+        day = datetime.fromtimestamp(r["created_utc"], tz=timezone.utc).strftime("%Y-%m-%d")
+        title = record.get("title") or record.get("parent_title") or ""
+        print(f"  {day}  [{r['priority']:.0f}] r/{r['subreddit']} {r['type']}: {title[:80]}  {record.get('url', '')}")
+
+    if args.analyze and results:
+        from reddit_research import analyze_data, load_config
+        matches = pd.DataFrame([r for r in records(results) if r is not None])
+        df, analysis = analyze_data(matches, load_config(args.analyze))
+        print(f"\nSentiment: {analysis['sentiment']}")
+        print(f"Entities:  {analysis['entities']}")
+        print(f"Dates:     {analysis['date_range']}")
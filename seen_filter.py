@@ -0,0 +1,195 @@
+"""Scalable Bloom filters in front of the corpus store's seen-ID lookups.
+
+Most candidates a run or backfill stores are already known, and each one
+used to be looked up in the corpus store's items table. A Bloom filter
+answers "definitely new" for most IDs without touching the store; only
+possible hits (known IDs, plus false positives at the target rate) are
+looked up.
+
+A filter is sized from the store's history: its first layer holds twice the
+IDs already stored at the target false-positive rate. When a layer fills, a
+layer twice as large is added at half the rate, so the overall rate stays
+under the target however far the store grows.
+
+A filter may only answer for the exact store contents it was built from, or
+it would report known IDs as new. Each filter carries a stamp of that state:
+a change counter the store maintains. Filters are saved under FILTER_DIR
+with their stamp, and one whose stamp doesn't match the store it is asked
+about (the store was written by another process, or by something that
+bypassed the filter) is rebuilt from the store rather than trusted.
+
+Load and query time, and how many lookups were skipped, go to run_metrics.
+"""
+
+import hashlib
+import io
+import json
+import math
+import threading
+from pathlib import Path
+
+import numpy as np
+
+import run_metrics
+from export_stage import atomic_path
+
+FILTER_DIR = Path("output/filters")
+DEFAULT_FPR = 0.001
+MIN_CAPACITY = 1024
+GROWTH = 2          # each new layer holds this many times the previous one
+TIGHTENING = 0.5    # ...at this fraction of its false-positive rate
+
+_filters = {}       # name -> ScalableBloomFilter, loaded once per process
+_lock = threading.Lock()
+
+
+def _hashes(keys) -> np.ndarray:
+    """Two independent 64-bit hashes per key, as an (n, 2) uint64 array."""
+    digests = b"".join(hashlib.blake2b(str(k).encode(), digest_size=16).digest() for k in keys)
+    return np.frombuffer(digests, dtype=np.uint64).reshape(-1, 2)
+
+
+class _Layer:
+    """One fixed-size Bloom filter."""
+
+    def __init__(self, capacity: int, fpr: float, bits: np.ndarray = None, count: int = 0):
+        self.capacity = capacity
+        self.fpr = fpr
+        m = max(int(math.ceil(-capacity * math.log(fpr) / math.log(2) ** 2)), 64)
+        self.m = (m + 7) // 8 * 8
+        self.k = max(int(round(self.m / capacity * math.log(2))), 1)
+        self.bits = np.zeros(self.m // 8, dtype=np.uint8) if bits is None else bits
+        self.count = count
+
+    def _positions(self, h: np.ndarray) -> np.ndarray:
+        # Double hashing: h1 + i * h2 (mod m), i = 0..k-1
+        i = np.arange(self.k, dtype=np.uint64)
+        return (h[:, :1] + i * h[:, 1:]) % np.uint64(self.m)
+
+    def add(self, h: np.ndarray) -> None:
+        pos = self._positions(h).ravel()
+        np.bitwise_or.at(self.bits, pos >> np.uint64(3), (1 << (pos & np.uint64(7))).astype(np.uint8))
+        self.count += len(h)
+
+    def contains(self, h: np.ndarray) -> np.ndarray:
+        pos = self._positions(h)
+        return ((self.bits[pos >> np.uint64(3)] >> (pos & np.uint64(7)).astype(np.uint8)) & 1).all(axis=1)
+
+
+class ScalableBloomFilter:
+    """Set membership with no false negatives and a bounded false-positive rate."""
+
+    def __init__(self, capacity: int, fpr: float = DEFAULT_FPR):
+        self.fpr = fpr
+        self.layers = [_Layer(max(capacity, MIN_CAPACITY), fpr * (1 - TIGHTENING))]
+        self.stamp = None   # state of the store the filter matches
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return sum(layer.count for layer in self.layers)
+
+    def add(self, keys) -> None:
+        """Add keys (ones not already in the filter: each counts towards len)."""
+        h = _hashes(keys)
+        while len(h):
+            layer = self.layers[-1]
+            room = layer.capacity - layer.count
+            if room <= 0:
+                self.layers.append(_Layer(layer.capacity * GROWTH, layer.fpr * TIGHTENING))
+                continue
+            layer.add(h[:room])
+            h = h[room:]
+            self.dirty = True
+
+    def might_contain(self, keys) -> np.ndarray:
+        """Per key: False if definitely not added, True if possibly added."""
+        h = _hashes(keys)
+        found = np.zeros(len(h), dtype=bool)
+        for layer in self.layers:
+            if len(h):
+                found |= layer.contains(h)
+        return found
+
+    def to_bytes(self) -> bytes:
+        meta = {"fpr": self.fpr, "stamp": self.stamp, "layers": [[l.capacity, l.fpr, l.count] for l in self.layers]}
+        buf = io.BytesIO()
+        np.savez(buf, meta=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8),
+                 **{f"layer{i}": l.bits for i, l in enumerate(self.layers)})
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ScalableBloomFilter":
+        with np.load(io.BytesIO(data)) as arrays:
+            meta = json.loads(arrays["meta"].tobytes())
+            bloom = cls.__new__(cls)
+            bloom.fpr = meta["fpr"]
+            bloom.stamp = meta.get("stamp")
+            bloom.layers = [_Layer(capacity, fpr, arrays[f"layer{i}"], count)
+                            for i, (capacity, fpr, count) in enumerate(meta["layers"])]
+        bloom.dirty = False
+        return bloom
+
+
+def _path(name: str) -> Path:
+    return FILTER_DIR / f"{name}.npz"
+
+
+def get(name: str, stamp, keys, fpr: float = DEFAULT_FPR) -> ScalableBloomFilter:
+    """The filter `name` for a store in state `stamp`, rebuilt from `keys()` unless its stamp matches.
+
+    After adding IDs the caller stores them too and sets `bloom.stamp` to the
+    store's new state before `save`.
+    """
+    stamp = json.loads(json.dumps(stamp))  # as it compares after a save/load round trip
+    with _lock, run_metrics.timed("seen_filter_load"):
+        bloom = _filters.get(name)
+        if bloom is None and _path(name).exists():
+            try:
+                bloom = ScalableBloomFilter.from_bytes(_path(name).read_bytes())
+            except (OSError, ValueError, KeyError) as e:
+                print(f"  ⚠️  Rebuilding seen filter {name}: {e}")
+        if bloom is None or bloom.stamp is None or bloom.stamp != stamp:
+            ids = list(dict.fromkeys(keys()))
+            bloom = ScalableBloomFilter(GROWTH * len(ids), fpr)
+            bloom.add(ids)
+            bloom.stamp = stamp
+            run_metrics.incr("seen_filter_rebuilds")
+        _filters[name] = bloom
+        return bloom
+
+
+def split(bloom: ScalableBloomFilter, keys: list) -> np.ndarray:
+    """Possible-hit mask for keys; the False ones are definitely new and need no store lookup."""
+    with run_metrics.timed("seen_filter_query"):
+        maybe = bloom.might_contain(keys) if keys else np.zeros(0, dtype=bool)
+    run_metrics.incr("seen_filter_checked", len(keys))
+    run_metrics.incr("seen_filter_definitely_new", int((~maybe).sum()))
+    return maybe
+
+
+def false_positives(n: int) -> None:
+    """Record possible hits the store did not hold."""
+    run_metrics.incr("seen_filter_false_positives", n)
+
+
+def save(name: str) -> None:
+    """Write the filter `name` if it changed since it was loaded."""
+    bloom = _filters.get(name)
+    if bloom is None or not bloom.dirty:
+        return
+    with _lock:
+        FILTER_DIR.mkdir(parents=True, exist_ok=True)
+        with atomic_path(_path(name)) as tmp:
+            tmp.write_bytes(bloom.to_bytes())
+        bloom.dirty = False
+
+
+def summary() -> str:
+    """One line of filter metrics for the run summary ('' when no IDs were checked)."""
+    checked = int(run_metrics.get("seen_filter_checked"))
+    if not checked:
+        return ""
+    return (f"{checked} IDs checked, {int(run_metrics.get('seen_filter_definitely_new'))} definitely new "
+            f"(store lookup skipped), {int(run_metrics.get('seen_filter_false_positives'))} false positives; "
+            f"load {run_metrics.get('seen_filter_load_seconds') * 1000:.0f} ms, "
+            f"query {run_metrics.get('seen_filter_query_seconds') * 1000:.0f} ms")
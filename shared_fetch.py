@@ -0,0 +1,116 @@
+"""Shared, deduplicated Reddit fetches for concurrent collections.
+
+A SharedFetcher hands out futures for search listings and comment trees.
+Concurrent callers asking for the same subreddit/term search, or the comments
+of the same post, get the same in-flight fetch instead of each going to
+Reddit. With a TTL, finished fetches are also reused until they expire.
+Searches run on the fetcher's thread pool and comment fetches on the shared
+comment pool; all of them draw from one RateBudget.
+"""
+
+import threading
+import time
+
+import comment_fetch
+import run_metrics
+from rate_limit import listing_requests
+from near_dup import collapse_duplicates
+from reddit_research import (
+    add_unique,
+    fetch_plan,
+    fetch_post_comments,
+    scrape_subreddit,
+    select_comment_targets,
+    topic_slug,
+)
+
+
+class SharedFetcher:
+    """Cache of in-flight and recent fetches keyed by search or post."""
+
+    def __init__(self, reddit, budget, pool, ttl: float = None, comment_limit: int = 0):
+        self.reddit = reddit
+        self.budget = budget
+        self.pool = pool
+        self.ttl = ttl
+        self.comment_limit = comment_limit  # fetch at least this many, so callers can share
+        self.lock = threading.Lock()
+        self._searches = {}   # (sub, term) -> (limit, created, future)
+        self._comments = {}   # (post id, sort, depth) -> (limit, created, future)
+
+    def _fresh(self, entry, limit: int) -> bool:
+        if entry is None or entry[0] < limit:
+            return False
+        return self.ttl is None or time.monotonic() - entry[1] < self.ttl
+
+    def _get(self, cache: dict, key, limit: int, pool, fn, *args):
+        with self.lock:
+            entry = cache.get(key)
+            if self._fresh(entry, limit):
+                run_metrics.incr("shared_fetch_hits")
+                return entry[2]
+            future = pool.submit(fn, *args)
+            cache[key] = (limit, time.monotonic(), future)
+            return future
+
+    def _search(self, subreddit: str, term: str, limit: int) -> list:
+        self.budget.acquire(listing_requests(limit))
+        return scrape_subreddit(self.reddit, subreddit, term, limit, 0)
+
+    def search(self, subreddit: str, term: str, limit: int):
+        """Future of post records for a search (may be longer than `limit`)."""
+        # Reddit treats subreddit names and search terms case-insensitively
+        key = (subreddit.lower(), term.lower())
+        return self._get(self._searches, key, limit, self.pool, self._search, subreddit, term, limit)
+
+    def comments(self, post: dict, limit: int, sort: str = comment_fetch.DEFAULT_SORT,
+                 depth: int = comment_fetch.DEFAULT_DEPTH):
+        """Future of comment records for a post (may be longer than `limit`)."""
+        limit = max(limit, self.comment_limit)
+        return self._get(self._comments, (post["id"], sort, depth), limit, comment_fetch.pool(),
+                         fetch_post_comments, self.reddit, post, limit, self.budget, sort, depth)
+
+    def prefetch(self, configs: list) -> None:
+        """Start every search the configs need, each at its largest limit."""
+        plan = {}
+        for config in configs:
+            for subreddit, term, limit in fetch_plan(config):
+                key = (subreddit.lower(), term.lower())
+                if key not in plan or plan[key][2] < limit:
+                    plan[key] = (subreddit, term, limit)
+        for subreddit, term, limit in plan.values():
+            self.search(subreddit, term, limit)
+
+    def prune(self) -> None:
+        """Drop finished fetches older than the TTL."""
+        if self.ttl is None:
+            return
+        now = time.monotonic()
+        with self.lock:
+            for cache in (self._searches, self._comments):
+                for key in [k for k, e in cache.items() if e[2].done() and now - e[1] >= self.ttl]:
+                    del cache[key]
+
+    def collect(self, config: dict) -> list:
+        """Collect a config's records through the shared fetches (blocking)."""
+        records, seen_ids = [], set()
+        for subreddit, term, limit in fetch_plan(config):
+            # Shared listings may be longer than this config asked for; relevance
+            # order means the first `limit` results match a solo run
+            add_unique(records, seen_ids, self.search(subreddit, term, limit).result()[:limit])
+
+        if config.get("collapse_duplicates", True):
+            records, _collapsed = collapse_duplicates(records, topic_slug(config["topic"]))
+
+        comment_limit = config["limits"]["comments"]
+        if comment_limit <= 0:
+            return records
+
+        posts = [r for r in records if r["type"] == "post"]
+        targets = select_comment_targets(posts, config) if config.get("two_phase") else posts
+        run_metrics.incr("comment_fetches_skipped", len(posts) - len(targets))
+        options = comment_fetch.options(config)
+        futures = [self.comments(post, comment_limit, **options) for post in targets]
+        for future in futures:
+            add_unique(records, seen_ids, future.result()[:comment_limit])
+        return records
@@ -0,0 +1,221 @@
+"""Real-time streaming scanner for the OpenClaw Security stream.
+
+Follows new submissions and comments in the configured subreddits, filters them
+against the search terms locally, scores each matching post with the security
+profile as it arrives, and appends to seen.json and REVIEW.md in micro-batches.
+Any item in the top severity tier (critical / RCE / zero-day wording), or
+scoring CRITICAL overall, triggers an immediate alert digest. A brand-new
+post has almost no upvotes yet, so its priority score alone would rarely
+reach CRITICAL.
+
+The scanner holds only a bounded set of recent IDs; seen.json is read at each
+flush and not kept in memory between flushes. The relevance scorer is
+rebuilt every RELEVANCE_REFRESH_SECONDS, so its term weights follow the
+corpus as other runs add to it.
+
+Usage:
+    python3 stream_scan.py [scan_configs/openclaw_security.json]
+"""
+
+import json
+import sys
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+import pending_index
+from documents import keywords, prepare
+from email_digest import format_digest
+from reddit_research import DEFAULT_CONFIG, document_sentiment, init_reddit, post_record, relevance_scorer
+from review_writer import INTEL_DIR, filter_new_items, load_seen, save_seen, update_review_md
+from scoring import score_items, severity_label, weight_profile
+
+DEFAULT_CONFIG_PATH = "scan_configs/openclaw_security.json"
+ALERT_PATH = INTEL_DIR / "alert_digest.txt"
+
+STREAM = "security"
+STREAM_LABEL = "Security"
+BATCH_SIZE = 25          # flush to seen.json / REVIEW.md after this many items
+FLUSH_SECONDS = 30       # ...or after this long, whichever comes first
+POLL_SECONDS = 5         # idle wait when neither stream has new items
+RECENT_IDS = 5000        # bounded memory of recently handled post IDs
+UPVOTE_FLOOR = 50        # reference upvotes for normalising brand-new posts
+ALERT_SEVERITY = 1.0     # security_severity component that alerts regardless of priority
+RELEVANCE_REFRESH_SECONDS = 3600  # rebuild the relevance scorer (corpus document counts) this often
+
+
+def _term_tokens(search_terms: list) -> list:
+    """Split search terms into lower-cased word lists (all words must match)."""
+    return [term.lower().split() for term in search_terms if term.strip()]
+
+
+def match_term(text: str, term_tokens: list) -> str:
+    """Return the first search term whose words all appear in text, or ''."""
+    return _match_lower(text.lower(), term_tokens)
+
+
+def _match_lower(lower: str, term_tokens: list) -> str:
+    for tokens in term_tokens:
+        if all(tok in lower for tok in tokens):
+            return " ".join(tokens)
+    return ""
+
+
+def _alerting(priority_score: float, severity: float) -> bool:
+    """True for items that trigger an immediate alert."""
+    return severity >= ALERT_SEVERITY or severity_label(priority_score) == "CRITICAL"
+
+
+class StreamScanner:
+    """Micro-batching scorer for items arriving from the Reddit streams."""
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.term_tokens = _term_tokens(config["search_terms"])
+        self.pos_kw = keywords(config.get("keywords_positive", []))
+        self.neg_kw = keywords(config.get("keywords_negative", []))
+        self.weights = weight_profile(STREAM, config)
+        self.relevance = relevance_scorer(config)
+        self.relevance_built = time.monotonic()
+        self.recent = OrderedDict()
+        self.batch = []
+        self.batch_started = None
+        self.max_upvotes = UPVOTE_FLOOR
+
+    def _remember(self, post_id: str) -> bool:
+        """Track a post ID in the bounded recent set. False if already handled."""
+        if post_id in self.recent:
+            return False
+        self.recent[post_id] = True
+        if len(self.recent) > RECENT_IDS:
+            self.recent.popitem(last=False)
+        return True
+
+    def handle_submission(self, submission, term: str = "") -> None:
+        """Score a submission and queue it if it matches the search terms."""
+        record = post_record(submission, "", term)
+        doc = prepare(record["title"], record["text"])
+        term = term or _match_lower(doc.lower, self.term_tokens)
+        if not term or not self._remember(record["id"]):
+            return
+
+        record["search_term"] = term
+        record["sentiment"] = document_sentiment(doc, self.pos_kw, self.neg_kw)
+        record["created_date"] = time.strftime("%Y-%m-%d", time.gmtime(record["created_utc"] or 0))
+        self.max_upvotes = max(self.max_upvotes, record["score"])
+        if time.monotonic() - self.relevance_built > RELEVANCE_REFRESH_SECONDS:
+            self.relevance = relevance_scorer(self.config)
+            self.relevance_built = time.monotonic()
+
+        row = score_items(pd.DataFrame([record]), stream=STREAM, max_upvotes=self.max_upvotes, weights=self.weights,
+                          relevance=self.relevance, body=self.config.get("score_post_body", False))
+        record["priority_score"] = float(row["priority_score"].iloc[0])
+        record["security_severity_component"] = float(row["security_severity_component"].iloc[0])
+
+        if not self.batch:
+            self.batch_started = time.monotonic()
+        self.batch.append(record)
+        print(f"  [{int(record['priority_score'])}] r/{record['subreddit']}: {record['title'][:70]}")
+
+        if _alerting(record["priority_score"], record["security_severity_component"]):
+            new_df = self.flush()
+            self.alert(new_df)
+
+    def handle_comment(self, comment) -> None:
+        """Queue a comment's parent post when the comment matches the search terms."""
+        term = match_term(getattr(comment, "body", "") or "", self.term_tokens)
+        if not term:
+            return
+        submission = comment.submission
+        if submission.id in self.recent:
+            return
+        self.handle_submission(submission, term)
+
+    def due(self) -> bool:
+        """True when the current micro-batch should be flushed."""
+        if not self.batch:
+            return False
+        return len(self.batch) >= BATCH_SIZE or time.monotonic() - self.batch_started >= FLUSH_SECONDS
+
+    def flush(self) -> pd.DataFrame:
+        """Append the micro-batch to seen.json and REVIEW.md. Returns the new items."""
+        if not self.batch:
+            return pd.DataFrame()
+
+        df = pd.DataFrame(self.batch)
+        self.batch = []
+        # Read seen.json afresh: picks up other scanners' saves and holds nothing between flushes
+        new_df, seen = filter_new_items(df, load_seen())
+        save_seen(seen)
+        added = update_review_md(new_df, STREAM_LABEL)
+        print(f"  → flushed {len(df)} items, {added} new in REVIEW.md")
+        return new_df
+
+    def alert(self, new_df: pd.DataFrame) -> None:
+        """Write and print an immediate digest for the alerting items in new_df."""
+        if new_df.empty:
+            return
+        critical = new_df[[_alerting(p, s) for p, s in zip(new_df["priority_score"],
+                                                            new_df["security_severity_component"])]]
+        if critical.empty:
+            return
+
+        items = [
+            {"score": int(row["priority_score"]), "title": str(row["title"])[:100], "subreddit": str(row["subreddit"])}
+            for _, row in critical.sort_values("priority_score", ascending=False).iterrows()
+        ]
+        subject, body = format_digest([], items, *pending_index.stats())
+        subject = subject.replace("OpenClaw Intel", "OpenClaw CRITICAL Alert", 1)
+
+        INTEL_DIR.mkdir(parents=True, exist_ok=True)
+        ALERT_PATH.write_text(f"Subject: {subject}\n\n{body}\n")
+        print()
+        print("!" * 60)
+        print(f"Subject: {subject}")
+        print(body)
+        print("!" * 60)
+
+
+def run_stream(config: dict) -> None:
+    """Follow the configured subreddits until interrupted."""
+    reddit = init_reddit()
+    scanner = StreamScanner(config)
+    multi = reddit.subreddit("+".join(config["subreddits"]))
+
+    # pause_after=-1 yields None as soon as a stream has nothing new, so the
+    # two streams can be interleaved from a single thread
+    submissions = multi.stream.submissions(pause_after=-1, skip_existing=True)
+    comments = multi.stream.comments(pause_after=-1, skip_existing=True)
+
+    print(f"Streaming r/{'+'.join(config['subreddits'])} (Ctrl-C to stop)")
+    try:
+        while True:
+            idle = True
+            for submission in submissions:
+                if submission is None:
+                    break
+                idle = False
+                scanner.handle_submission(submission)
+            for comment in comments:
+                if comment is None:
+                    break
+                idle = False
+                scanner.handle_comment(comment)
+
+            if scanner.due():
+                scanner.flush()
+            if idle:
+                time.sleep(POLL_SECONDS)
+    except KeyboardInterrupt:
+        print("\nStopping stream...")
+    finally:
+        scanner.flush()
+
+
+if __name__ == "__main__":
+    config_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CONFIG_PATH
+    with open(config_path, "r") as f:
+        config = DEFAULT_CONFIG.copy()
+        config.update(json.load(f))
+    run_stream(config)
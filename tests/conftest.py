@@ -0,0 +1,13 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Run each test in its own directory, so output/ stores start empty."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
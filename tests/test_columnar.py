@@ -0,0 +1,20 @@
+import pandas as pd
+import pytest
+
+import columnar
+
+pytest.importorskip("pyarrow")
+
+
+def test_severity_written_for_scored_posts():
+    df = pd.DataFrame({
+        "id": ["a", "b", "c"],
+        "type": ["post", "post", "comment"],
+        "subreddit": "x",
+        "score": 1,
+        "created_utc": [1.76e9, 1.76e9, 1.76e9],
+        "priority_score": [85.0, 42.0, 0.0],
+    })
+    columnar.write_columnar(df, "t", "20260101_000000")
+    loaded = columnar.load("t")
+    assert loaded.column("severity").to_pylist() == ["CRITICAL", "MEDIUM", None]
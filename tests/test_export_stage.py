@@ -0,0 +1,39 @@
+import pytest
+
+from export_stage import atomic_path, run_exports
+
+
+def test_atomic_path_replaces_on_success(workdir):
+    target = workdir / "report.md"
+    target.write_text("old")
+    with atomic_path(target) as tmp:
+        assert tmp != target and tmp.parent == target.parent
+        tmp.write_text("new")
+        assert target.read_text() == "old"
+    assert target.read_text() == "new"
+    assert list(workdir.iterdir()) == [target]
+
+
+def test_atomic_path_keeps_old_file_on_failure(workdir):
+    target = workdir / "report.md"
+    target.write_text("old")
+    with pytest.raises(RuntimeError):
+        with atomic_path(target) as tmp:
+            tmp.write_text("partial")
+            raise RuntimeError("writer failed")
+    assert target.read_text() == "old"
+    assert list(workdir.iterdir()) == [target]
+
+
+def test_failed_writer_leaves_no_output(workdir):
+    def good(result, tmp):
+        tmp.write_text(result)
+
+    def bad(result, tmp):
+        tmp.write_text("partial")
+        raise ValueError("boom")
+
+    timings = run_exports("data", [("md", workdir / "a.md", good), ("xlsx", workdir / "b.xlsx", bad)])
+    assert set(timings) == {"md"}
+    assert (workdir / "a.md").read_text() == "data"
+    assert sorted(p.name for p in workdir.iterdir()) == ["a.md"]
@@ -0,0 +1,30 @@
+import near_dup
+
+
+def _post(post_id, title, subreddit="a", text="", created=1.76e9):
+    return {"id": post_id, "type": "post", "title": title, "text": text, "subreddit": subreddit,
+            "score": 1, "num_comments": 0, "created_utc": created}
+
+
+STORY = "OpenClaw 2.0 released with sandboxed skills and a new permission model for agents"
+
+
+def test_cross_posts_collapse():
+    kept, dropped = near_dup.collapse_posts([_post("p1", STORY, "a"), _post("p2", STORY, "b", created=1.76e9 + 60)],
+                                            "t")
+    assert dropped == {"p2": "p1"}
+    assert kept[0]["crosspost_subreddits"] == "b"
+    assert kept[0]["score"] == 2
+
+
+def test_short_titles_are_not_collapsed():
+    kept, dropped = near_dup.collapse_posts([_post("p1", "Help needed"), _post("p2", "Help wanted")], "t")
+    assert dropped == {}
+    assert len(kept) == 2
+
+
+def test_index_is_per_topic():
+    near_dup.collapse_posts([_post("p1", STORY)], "first")
+    kept, dropped = near_dup.collapse_posts([_post("p2", STORY)], "second")
+    assert dropped == {}
+    assert kept[0]["canonical_id"] == "p2"
@@ -0,0 +1,50 @@
+import random
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import parallel_engine
+from reddit_research import DEFAULT_CONFIG, analyze_data
+from relevance import RelevanceScorer
+from scoring import COMPONENT_COLS, score_items, weight_profile
+
+WORDS = "openclaw agent rce exploit great love hate broken setup tutorial github docker vulnerability".split()
+
+
+def _rows(n=1200):
+    rng = random.Random(1)
+    now = time.time()
+    rows = []
+    for i in range(n):
+        kind = "post" if i % 3 else "comment"
+        rows.append(dict(
+            id=f"x{i}", type=kind, title=" ".join(rng.choices(WORDS, k=6)) if kind == "post" else "",
+            text=" ".join(rng.choices(WORDS, k=20)), subreddit=rng.choice("abc"),
+            score=rng.randint(0, 100), num_comments=rng.randint(0, 50), url=f"u{i}",
+            created_utc=now - rng.randint(0, 40 * 86400),
+        ))
+    return rows
+
+
+@pytest.mark.parametrize("body", [False, True])
+def test_parallel_matches_serial(body, monkeypatch):
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)   # same recency scores on both paths
+    config = dict(DEFAULT_CONFIG, topic="t", search_terms=["openclaw"], subreddits=["a"],
+                  entities_to_track=["openclaw", "docker"], keywords_positive=["love", "great"],
+                  keywords_negative=["hate", "broken"], score_post_body=body)
+    weights = weight_profile("usecases")
+    relevance = RelevanceScorer(["openclaw", "docker"], 100, {"openclaw": 10, "docker": 40})
+
+    serial, serial_analysis = analyze_data(pd.DataFrame(_rows()), config)
+    serial = score_items(serial, "usecases", weights=weights, relevance=relevance, body=body)
+    parallel, parallel_analysis = parallel_engine.analyze(pd.DataFrame(_rows()), config, 2, "usecases",
+                                                          weights, relevance)
+
+    assert parallel_analysis == serial_analysis
+    for col in ("entities_mentioned", "sentiment", "created_date"):
+        assert parallel[col].tolist() == serial[col].tolist()
+    for col in (*COMPONENT_COLS, "priority_score"):
+        np.testing.assert_allclose(parallel[col].to_numpy(dtype=float), serial[col].to_numpy(dtype=float))
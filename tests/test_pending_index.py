@@ -0,0 +1,26 @@
+import pending_index
+
+
+def test_count_follows_updates(workdir):
+    conn = pending_index.connect(workdir / "pending.db")
+    pending_index.update([("l1", 1.0), ("l2", 2.0), ("l1", 3.0)], [], conn)
+    assert pending_index.count(conn) == 3
+    assert pending_index.oldest(conn) == 1.0
+
+    pending_index.update([], ["l1"], conn)   # one entry per review
+    assert pending_index.count(conn) == 2
+    assert pending_index.oldest(conn) == 2.0
+
+    pending_index.rebuild(["l2", "l3"], {}, conn)
+    assert pending_index.count(conn) == 2
+    assert pending_index.oldest(conn) == 2.0   # l2 keeps its indexed age
+    conn.close()
+
+
+def test_rebuild_dates_new_links_from_seen(workdir):
+    conn = pending_index.connect(workdir / "pending.db")
+    seen = {"abc12": {"first_seen": "2026-01-01T00:00:00"}}
+    pending_index.rebuild(["https://reddit.com/r/x/comments/abc12/title/"], seen, conn)
+    assert pending_index.count(conn) == 1
+    assert pending_index.oldest(conn) == 1767225600.0
+    conn.close()
@@ -0,0 +1,25 @@
+import pytest
+
+from research_service import ResearchService, config_hash, normalize_config
+
+
+def test_normalize_keeps_search_term_order():
+    terms = ["zeta", "alpha", "mu", "beta", "gamma", "delta", "alpha"]
+    config = normalize_config({"topic": "t", "search_terms": terms, "subreddits": ["b", "a"]})
+    assert config["search_terms"] == ["zeta", "alpha", "mu", "beta", "gamma", "delta"]
+    assert config["subreddits"] == ["b", "a"]
+
+
+def test_hash_ignores_order_only_where_it_does_not_matter():
+    base = {"topic": "t", "search_terms": ["x", "y"], "subreddits": ["a", "b"]}
+    same = dict(base, subreddits=["b", "a", "a"])
+    reordered = dict(base, search_terms=["y", "x"])
+    assert config_hash(normalize_config(base)) == config_hash(normalize_config(same))
+    assert config_hash(normalize_config(base)) != config_hash(normalize_config(reordered))
+
+
+@pytest.mark.parametrize("body", [["topic"], "topic", 3, None])
+def test_submit_rejects_non_object_bodies(body):
+    service = ResearchService.__new__(ResearchService)   # no Reddit client needed to validate
+    with pytest.raises(ValueError):
+        service.submit(body)
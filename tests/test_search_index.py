@@ -0,0 +1,49 @@
+import pandas as pd
+
+import search_index
+
+
+def test_varint_round_trip():
+    values = [0, 1, 127, 128, 255, 300, 16383, 16384, 2**32, 2**62]
+    data = search_index.encode(values)
+    assert search_index.decode(data).tolist() == values
+    assert search_index.encode([127]) == b"\x7f"
+    assert search_index.encode([300]) == b"\xac\x02"
+    assert search_index.decode(b"").tolist() == []
+
+
+def _frame(texts):
+    return pd.DataFrame({
+        "id": [f"p{i}" for i in range(len(texts))],
+        "type": "post",
+        "title": "",
+        "text": texts,
+        "score": 1,
+        "sentiment": "Neutral",
+        "subreddit": "netsec",
+        "created_utc": [1.7e9 + i for i in range(len(texts))],
+        "priority_score": 50.0,
+    })
+
+
+def test_phrase_search():
+    texts = [
+        "a prompt injection in the agent",
+        "injection of a prompt",
+        "prompt then injection",
+        "another prompt injection report",
+    ]
+    assert search_index.index_frame(_frame(texts), "t") == len(texts)
+
+    found = search_index.search('"prompt injection"', topic="t")
+    assert [r["item_key"] for r in found] == ["p3_post", "p0_post"]   # newest first
+    assert {r["item_key"] for r in search_index.search("prompt injection", topic="t")} == {
+        "p0_post", "p1_post", "p2_post", "p3_post"}
+    assert search_index.search('"injection prompt"', topic="t") == []
+
+
+def test_index_frame_skips_indexed_rows():
+    frame = _frame(["one", "two"])
+    assert search_index.index_frame(frame, "t") == 2
+    assert search_index.index_frame(frame, "t") == 0
+    assert len(search_index.search("", topic="t")) == 2
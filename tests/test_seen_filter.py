@@ -0,0 +1,28 @@
+import seen_filter
+
+
+def test_no_false_negatives_across_layers():
+    bloom = seen_filter.ScalableBloomFilter(seen_filter.MIN_CAPACITY)
+    keys = [f"t3_{i:x}" for i in range(10 * seen_filter.MIN_CAPACITY)]
+    for start in range(0, len(keys), 997):
+        bloom.add(keys[start:start + 997])
+    assert len(bloom.layers) > 1
+    assert bloom.might_contain(keys).all()
+
+    restored = seen_filter.ScalableBloomFilter.from_bytes(bloom.to_bytes())
+    assert restored.might_contain(keys).all()
+
+
+def test_false_positive_rate_within_target():
+    bloom = seen_filter.ScalableBloomFilter(5000, fpr=0.01)
+    bloom.add([f"in{i}" for i in range(5000)])
+    rate = bloom.might_contain([f"out{i}" for i in range(20000)]).mean()
+    assert rate < 0.02
+
+
+def test_get_rebuilds_on_stamp_change():
+    bloom = seen_filter.get("test", [1], lambda: ["a", "b"])
+    assert bloom.might_contain(["a", "b"]).all()
+    bloom = seen_filter.get("test", [2], lambda: ["a", "b", "c"])
+    assert bloom.stamp == [2]
+    assert bloom.might_contain(["c"]).all()
@@ -0,0 +1,34 @@
+import time
+
+import pandas as pd
+
+import stream_scan
+from scoring import score_items, weight_profile
+
+
+def _posts(titles):
+    return pd.DataFrame({
+        "id": [f"p{i}" for i in range(len(titles))],
+        "type": "post",
+        "title": titles,
+        "text": "",
+        "score": 1,
+        "sentiment": "Neutral",
+        "created_utc": time.time(),
+    })
+
+
+def test_benign_titles_do_not_alert():
+    titles = ["Open source OpenClaw skill", "Brute force login", "Resource usage of OpenClaw agents",
+              "Critically acclaimed OpenClaw plugin"]
+    df = score_items(_posts(titles), "security", weights=weight_profile("security"))
+    assert not any(stream_scan._alerting(p, s) for p, s in zip(df["priority_score"],
+                                                                df["security_severity_component"]))
+
+
+def test_top_tier_titles_alert():
+    titles = ["RCE in the OpenClaw gateway", "OpenClaw zero-day exploited", "Critical: authentication bypass"]
+    df = score_items(_posts(titles), "security", weights=weight_profile("security"))
+    assert (df["security_severity_component"] == 1.0).all()
+    assert all(stream_scan._alerting(p, s) for p, s in zip(df["priority_score"],
+                                                            df["security_severity_component"]))
@@ -0,0 +1,24 @@
+import time
+
+from reddit_research import DEFAULT_CONFIG, select_comment_targets
+from relevance import RelevanceScorer
+
+
+def _post(i, score, title):
+    return dict(id=f"p{i}", type="post", title=title, text="", subreddit="a", score=score,
+                num_comments=10, created_utc=time.time(), url=f"u{i}")
+
+
+def test_select_comment_targets_threshold_and_top_k():
+    posts = [_post(0, 5, "meh"), _post(1, 900, "great openclaw setup"), _post(2, 1000, "love openclaw"),
+             _post(3, 0, "nothing")]
+    config = dict(DEFAULT_CONFIG, search_terms=["openclaw"], keywords_positive=["great", "love"],
+                  comment_min_priority=40, comment_top_k=0)
+    scorer = RelevanceScorer(["openclaw"], 10, {"openclaw": 2})
+
+    selected = select_comment_targets(posts, config, scorer)
+    assert [p["id"] for p in selected] == ["p2", "p1"]   # above the threshold, highest first
+
+    config["comment_top_k"] = 1
+    assert [p["id"] for p in select_comment_targets(posts, config, scorer)] == ["p2"]
+    assert select_comment_targets([], config, scorer) == []
@@ -0,0 +1,208 @@
+"""Time-bucketed entity mention and sentiment series.
+
+Per-topic, per-entity, per-subreddit mention counts and sentiment splits are
+kept in a small SQLite store at three granularities. Rollups happen at write
+time: each item increments its hourly, daily and weekly bucket once (items are
+keyed by topic, so re-collected posts are never double counted within a topic
+and an item found by two topics counts in both). Retention then prunes the
+fine granularities, so the store stays compact while weekly history is kept.
+
+The counted keys are pruned with the daily buckets. Items created before that
+horizon could no longer be deduplicated, so they are not recorded.
+
+Range queries hit the (topic, granularity, entity, bucket) primary key and
+return in milliseconds.
+"""
+
+import sqlite3
+import time
+from pathlib import Path
+
+TS_PATH = Path("output/timeseries.db")
+
+HOUR = 3600
+DAY = 86400
+WEEK = 7 * DAY
+
+# Granularity -> retention in seconds (None = keep forever)
+RETENTION = {
+    "hourly": 14 * DAY,
+    "daily": 400 * DAY,
+    "weekly": None,
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    topic       TEXT NOT NULL,
+    granularity TEXT NOT NULL,
+    entity      TEXT NOT NULL,
+    bucket      INTEGER NOT NULL,
+    subreddit   TEXT NOT NULL,
+    mentions    INTEGER NOT NULL DEFAULT 0,
+    positive    INTEGER NOT NULL DEFAULT 0,
+    negative    INTEGER NOT NULL DEFAULT 0,
+    neutral     INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (topic, granularity, entity, bucket, subreddit)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS counted (
+    topic    TEXT NOT NULL,
+    item_key TEXT NOT NULL,
+    created  INTEGER NOT NULL,          -- item's created_utc, for retention
+    PRIMARY KEY (topic, item_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS counted_created ON counted (created);
+"""
+
+# Keys of counted items are kept as long as the finest granularity that has them
+COUNTED_RETENTION = max(keep for keep in RETENTION.values() if keep is not None)
+
+
+def connect(path: Path = None) -> sqlite3.Connection:
+    """Open (and create if needed) the time-series store."""
+    path = path or TS_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def bucket_start(ts: float, granularity: str) -> int:
+    """Start (epoch seconds, UTC) of the bucket containing ts. Weeks start Monday."""
+    ts = int(ts)
+    if granularity == "hourly":
+        return ts - ts % HOUR
+    day = ts - ts % DAY
+    if granularity == "daily":
+        return day
+    if granularity == "weekly":
+        # 1970-01-01 was a Thursday; shift back to the preceding Monday
+        return day - ((day // DAY + 3) % 7) * DAY
+    raise ValueError(f"Unknown granularity: {granularity}. Choose from {list(RETENTION)}")
+
+
+def record_mentions(df, topic: str, conn: sqlite3.Connection = None) -> int:
+    """Add a topic's entity mentions from an analysed DataFrame. Returns items newly counted.
+
+    Expects `entities_mentioned` and `sentiment` columns from `analyze_data`.
+    """
+    if df.empty or "entities_mentioned" not in df.columns:
+        return 0
+
+    own = conn is None
+    conn = conn or connect()
+    sentiment_cols = {"Positive": "positive", "Negative": "negative", "Neutral": "neutral"}
+    added = 0
+    horizon = time.time() - COUNTED_RETENTION
+
+    with conn:
+        for row in df[df["entities_mentioned"] != ""].to_dict("records"):
+            ts = float(row.get("created_utc") or 0)
+            if ts < horizon:
+                continue
+            key = f"{row['id']}_{row.get('type', 'post')}"
+            if conn.execute("INSERT OR IGNORE INTO counted VALUES (?, ?, ?)", (topic, key, int(ts))).rowcount == 0:
+                continue
+            added += 1
+
+            col = sentiment_cols.get(row.get("sentiment"), "neutral")
+            for entity in row["entities_mentioned"].split(", "):
+                for granularity in RETENTION:
+                    conn.execute(
+                        f"""INSERT INTO series (topic, granularity, entity, bucket, subreddit, mentions, {col})
+                            VALUES (?, ?, ?, ?, ?, 1, 1)
+                            ON CONFLICT (topic, granularity, entity, bucket, subreddit)
+                            DO UPDATE SET mentions = mentions + 1, {col} = {col} + 1""",
+                        (topic, granularity, entity, bucket_start(ts, granularity), str(row.get("subreddit", ""))),
+                    )
+
+    apply_retention(conn)
+    if own:
+        conn.close()
+    return added
+
+
+def apply_retention(conn: sqlite3.Connection, now: float = None) -> None:
+    """Drop buckets older than each granularity's retention window, and counted keys past COUNTED_RETENTION."""
+    now = now or time.time()
+    with conn:
+        for granularity, keep in RETENTION.items():
+            if keep is not None:
+                conn.execute(
+                    "DELETE FROM series WHERE granularity = ? AND bucket < ?",
+                    (granularity, bucket_start(now - keep, granularity)),
+                )
+        conn.execute("DELETE FROM counted WHERE created < ?", (int(now - COUNTED_RETENTION),))
+
+
+def query_series(topic: str, entity: str, start: float, end: float, granularity: str = "daily",
+                 subreddit: str = None, conn: sqlite3.Connection = None) -> list:
+    """Mentions and sentiment per bucket for a topic's entity over [start, end).
+
+    Sums across subreddits unless one is given. Returns a list of dicts with
+    bucket, mentions, positive, negative, neutral and negative_share.
+    """
+    own = conn is None
+    conn = conn or connect()
+
+    sql = """SELECT bucket, SUM(mentions), SUM(positive), SUM(negative), SUM(neutral)
+             FROM series WHERE topic = ? AND granularity = ? AND entity = ? AND bucket >= ? AND bucket < ?"""
+    params = [topic, granularity, entity, bucket_start(start, granularity), int(end)]
+    if subreddit:
+        sql += " AND subreddit = ?"
+        params.append(subreddit)
+    sql += " GROUP BY bucket ORDER BY bucket"
+
+    rows = conn.execute(sql, params).fetchall()
+    if own:
+        conn.close()
+
+    return [
+        {
+            "bucket": bucket,
+            "mentions": mentions,
+            "positive": pos,
+            "negative": neg,
+            "neutral": neu,
+            "negative_share": round(neg / mentions, 3) if mentions else 0.0,
+        }
+        for bucket, mentions, pos, neg, neu in rows
+    ]
+
+
+def entity_trends(topic: str, entities: list, weeks: int = 12, conn: sqlite3.Connection = None) -> dict:
+    """Weekly series for each of a topic's entities over the last `weeks` weeks, gaps filled with zeros.
+
+    Returns {entity: [{'week': 'YYYY-MM-DD', 'mentions', 'negative', 'negative_share'}, ...]}.
+    """
+    own = conn is None
+    conn = conn or connect()
+    end = time.time()
+    first = bucket_start(end, "weekly") - (weeks - 1) * WEEK
+
+    trends = {}
+    for entity in entities:
+        by_bucket = {r["bucket"]: r for r in query_series(topic, entity, first, end + WEEK, "weekly", conn=conn)}
+        series = []
+        for i in range(weeks):
+            b = first + i * WEEK
+            r = by_bucket.get(b, {"mentions": 0, "negative": 0, "negative_share": 0.0})
+            series.append({
+                "week": time.strftime("%Y-%m-%d", time.gmtime(b)),
+                "mentions": r["mentions"],
+                "negative": r["negative"],
+                "negative_share": r["negative_share"],
+            })
+        trends[entity] = series
+
+    if own:
+        conn.close()
+    return trends
+
+
+def sparkline(values: list) -> str:
+    """Render a list of numbers as a unicode sparkline."""
+    bars = "▁▂▃▄▅▆▇█"
+    peak = max(values) if values else 0
+    if peak <= 0:
+        return bars[0] * len(values)
+    return "".join(bars[min(int(v / peak * (len(bars) - 1)), len(bars) - 1)] for v in values)